@@ -10,6 +10,9 @@ import customtkinter as ctk
 from tkinter import messagebox
 import pyperclip
 
+import credential_codec
+import perf_trace
+
 # Set cyberpunk theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -48,6 +51,7 @@ class KantechCalculator(ctk.CTk):
         self.create_input_section()
         self.create_results_section()
         self.create_footer()
+        perf_trace.install_toggle(self, "KANTECH")
         
     def create_header(self):
         """Create cyberpunk header"""
@@ -270,18 +274,7 @@ class KantechCalculator(ctk.CTk):
         
         try:
             # Parse input
-            if combined_str:
-                if ':' in combined_str:
-                    parts = combined_str.split(':')
-                    site_code = int(parts[0])
-                    card_number = int(parts[1])
-                else:
-                    raise ValueError("Combined format should be SITE:CARD (e.g., 8020:11485)")
-            elif site_str and card_str:
-                site_code = int(site_str)
-                card_number = int(card_str)
-            else:
-                raise ValueError("Enter Site Code + Card Number, or Combined format")
+            site_code, card_number = self.parse_input(site_str, card_str, combined_str)
                 
             # Calculate results
             self.results = self.compute_values(site_code, card_number)
@@ -292,39 +285,30 @@ class KantechCalculator(ctk.CTk):
         except ValueError as e:
             messagebox.showerror("Input Error", str(e))
             
+    @perf_trace.timed("kantech.parse")
+    def parse_input(self, site_str, card_str, combined_str):
+        """Parse separate or combined input into (site_code, card_number)"""
+        if combined_str:
+            if ':' in combined_str:
+                parts = combined_str.split(':')
+                site_code = int(parts[0])
+                card_number = int(parts[1])
+            else:
+                raise ValueError("Combined format should be SITE:CARD (e.g., 8020:11485)")
+        elif site_str and card_str:
+            site_code = int(site_str)
+            card_number = int(card_str)
+        else:
+            raise ValueError("Enter Site Code + Card Number, or Combined format")
+            
+        return site_code, card_number
+            
+    @perf_trace.timed("kantech.compute")
     def compute_values(self, site_code, card_number):
         """Compute all credential representations"""
-        results = {}
-        
-        # Basic hex
-        results['site_hex'] = format(site_code, '04X')
-        results['card_hex'] = format(card_number, '04X')
-        results['card_hex_32'] = format(card_number, '08X')
-        
-        # Binary
-        results['site_bin'] = format(site_code, '016b')
-        results['card_bin'] = format(card_number, '016b')
-        
-        # Combined formats
-        results['combined_32'] = format((site_code << 16) | card_number, '08X')
-        results['combined_48'] = format((site_code << 32) | card_number, '012X')
-        
-        # Byte patterns
-        results['site_be'] = f"{format((site_code >> 8) & 0xFF, '02X')} {format(site_code & 0xFF, '02X')}"
-        results['site_le'] = f"{format(site_code & 0xFF, '02X')} {format((site_code >> 8) & 0xFF, '02X')}"
-        results['card_be'] = f"{format((card_number >> 8) & 0xFF, '02X')} {format(card_number & 0xFF, '02X')}"
-        results['card_le'] = f"{format(card_number & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')}"
-        
-        # Full sequences
-        results['full_be'] = f"{format((site_code >> 8) & 0xFF, '02X')} {format(site_code & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')} {format(card_number & 0xFF, '02X')}"
-        results['full_le'] = f"{format(card_number & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')} {format(site_code & 0xFF, '02X')} {format((site_code >> 8) & 0xFF, '02X')}"
-        
-        # Checksums
-        results['xor'] = format(site_code ^ card_number, '04X')
-        results['sum'] = format((site_code + card_number) & 0xFFFF, '04X')
-        
-        return results
+        return credential_codec.kantech_values(site_code, card_number)
         
+    @perf_trace.timed("kantech.render")
     def display_results(self, site_code, card_number):
         """Display calculated results"""
         # Clear previous results
@@ -441,11 +425,12 @@ class KantechCalculator(ctk.CTk):
             
     def copy_value(self, value):
         """Copy single value to clipboard"""
-        try:
-            pyperclip.copy(value)
-        except:
-            self.clipboard_clear()
-            self.clipboard_append(value)
+        with perf_trace.stage("kantech.clipboard"):
+            try:
+                pyperclip.copy(value)
+            except:
+                self.clipboard_clear()
+                self.clipboard_append(value)
             
     def copy_all(self, site_code, card_number):
         """Copy all results to clipboard"""
@@ -470,13 +455,16 @@ CHECKSUMS:
 {'='*50}
 Generated by Kobe's Keys RFID Tools
 """
-        try:
-            pyperclip.copy(text)
-            messagebox.showinfo("Copied", "All results copied to clipboard!")
-        except:
-            self.clipboard_clear()
-            self.clipboard_append(text)
-            messagebox.showinfo("Copied", "All results copied to clipboard!")
+        with perf_trace.stage("kantech.clipboard"):
+            try:
+                pyperclip.copy(text)
+                copied = True
+            except:
+                copied = False
+            if not copied:
+                self.clipboard_clear()
+                self.clipboard_append(text)
+        messagebox.showinfo("Copied", "All results copied to clipboard!")
             
     def clear_all(self):
         """Clear all inputs and results"""
@@ -13,6 +13,9 @@ import customtkinter as ctk
 from tkinter import messagebox
 import pyperclip
 
+import credential_codec
+import perf_trace
+
 # Set cyberpunk theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -51,6 +54,7 @@ class RBHCalculator(ctk.CTk):
         self.create_input_section()
         self.create_results_section()
         self.create_footer()
+        perf_trace.install_toggle(self, "RBH")
         
     def create_header(self):
         """Create cyberpunk header"""
@@ -290,11 +294,7 @@ class RBHCalculator(ctk.CTk):
         
     def calculate_parity(self, bits, even=True):
         """Calculate parity bit"""
-        count = bits.count('1')
-        if even:
-            return '0' if count % 2 == 0 else '1'
-        else:
-            return '1' if count % 2 == 0 else '0'
+        return credential_codec.calculate_parity(bits, even)
     
     def calculate(self):
         """Calculate and display results"""
@@ -305,27 +305,7 @@ class RBHCalculator(ctk.CTk):
         
         try:
             # Parse input
-            if combined_str:
-                # Try different separators
-                for sep in [':', '-', ' ']:
-                    if sep in combined_str:
-                        parts = combined_str.split(sep)
-                        site_code = int(parts[0])
-                        card_number = int(parts[1])
-                        break
-                else:
-                    raise ValueError("Format should be SITE:CARD or SITE-CARD (e.g., 4000:12345)")
-            elif site_str and card_str:
-                site_code = int(site_str)
-                card_number = int(card_str)
-            else:
-                raise ValueError("Enter Site Code + Card Number, or Combined format")
-            
-            # Validate ranges
-            if site_code > 65535:
-                raise ValueError("Site Code must be 0-65535 (16-bit)")
-            if card_number > 4294967295:
-                raise ValueError("Card Number must be 0-4294967295 (32-bit)")
+            site_code, card_number = self.parse_input(site_str, card_str, combined_str)
                 
             # Calculate results
             self.results = self.compute_values(site_code, card_number)
@@ -336,77 +316,39 @@ class RBHCalculator(ctk.CTk):
         except ValueError as e:
             messagebox.showerror("Input Error", str(e))
             
+    @perf_trace.timed("rbh.parse")
+    def parse_input(self, site_str, card_str, combined_str):
+        """Parse separate or card-back input into (site_code, card_number)"""
+        if combined_str:
+            # Try different separators
+            for sep in [':', '-', ' ']:
+                if sep in combined_str:
+                    parts = combined_str.split(sep)
+                    site_code = int(parts[0])
+                    card_number = int(parts[1])
+                    break
+            else:
+                raise ValueError("Format should be SITE:CARD or SITE-CARD (e.g., 4000:12345)")
+        elif site_str and card_str:
+            site_code = int(site_str)
+            card_number = int(card_str)
+        else:
+            raise ValueError("Enter Site Code + Card Number, or Combined format")
+        
+        # Validate ranges
+        if site_code > 65535:
+            raise ValueError("Site Code must be 0-65535 (16-bit)")
+        if card_number > 4294967295:
+            raise ValueError("Card Number must be 0-4294967295 (32-bit)")
+            
+        return site_code, card_number
+            
+    @perf_trace.timed("rbh.compute")
     def compute_values(self, site_code, card_number):
         """Compute all credential representations for RBH 50-bit"""
-        results = {}
-        
-        # Basic values
-        results['site_dec'] = site_code
-        results['card_dec'] = card_number
-        
-        # Hexadecimal
-        results['site_hex'] = format(site_code, '04X')
-        results['card_hex'] = format(card_number, '08X')
-        
-        # Binary
-        results['site_bin'] = format(site_code, '016b')
-        results['card_bin'] = format(card_number, '032b')
-        
-        # Build 50-bit credential
-        # Structure: [P1 (1-bit)] [Site (16-bit)] [Card (32-bit)] [P2 (1-bit)]
-        
-        # First half for parity 1 (site code, first 16 bits)
-        site_bits = format(site_code, '016b')
-        
-        # Second half for parity 2 (card number, 32 bits)
-        card_bits = format(card_number, '032b')
-        
-        # Calculate parities (even parity is common)
-        # P1 covers first 24 bits (site + first 8 bits of card typically)
-        # P2 covers last 24 bits (last 24 bits of card typically)
-        # This varies by implementation - showing common patterns
-        
-        p1_even = self.calculate_parity(site_bits, even=True)
-        p2_even = self.calculate_parity(card_bits, even=True)
-        
-        # Full 50-bit binary (most common structure)
-        full_50bit = p1_even + site_bits + card_bits + p2_even
-        results['full_50bit_bin'] = full_50bit
-        
-        # Convert to hex (50 bits = 13 hex chars, padded)
-        full_50bit_int = int(full_50bit, 2)
-        results['full_50bit_hex'] = format(full_50bit_int, '013X')
-        results['full_50bit_dec'] = str(full_50bit_int)
-        
-        # Alternative: without parity (48-bit data only)
-        data_48bit = site_bits + card_bits
-        results['data_48bit_bin'] = data_48bit
-        results['data_48bit_hex'] = format(int(data_48bit, 2), '012X')
-        
-        # Byte patterns for searching dumps
-        # Site code bytes
-        results['site_be'] = f"{format((site_code >> 8) & 0xFF, '02X')} {format(site_code & 0xFF, '02X')}"
-        results['site_le'] = f"{format(site_code & 0xFF, '02X')} {format((site_code >> 8) & 0xFF, '02X')}"
-        
-        # Card number bytes (32-bit = 4 bytes)
-        results['card_be'] = f"{format((card_number >> 24) & 0xFF, '02X')} {format((card_number >> 16) & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')} {format(card_number & 0xFF, '02X')}"
-        results['card_le'] = f"{format(card_number & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')} {format((card_number >> 16) & 0xFF, '02X')} {format((card_number >> 24) & 0xFF, '02X')}"
-        
-        # Full sequence (Site + Card)
-        results['full_be'] = results['site_be'] + " " + results['card_be']
-        results['full_le'] = results['card_le'] + " " + results['site_le']
-        
-        # Wiegand-style output (what reader sends to controller)
-        # 50-bit Wiegand: typically the raw 50-bit value
-        results['wiegand_hex'] = results['full_50bit_hex']
-        results['wiegand_bin'] = results['full_50bit_bin']
-        
-        # Checksums
-        results['xor'] = format(site_code ^ card_number, '08X')
-        results['sum'] = format((site_code + card_number) & 0xFFFFFFFF, '08X')
-        
-        return results
+        return credential_codec.rbh_values(site_code, card_number)
         
+    @perf_trace.timed("rbh.render")
     def display_results(self, site_code, card_number):
         """Display calculated results"""
         # Clear previous results
@@ -534,11 +476,12 @@ class RBHCalculator(ctk.CTk):
             
     def copy_value(self, value):
         """Copy single value to clipboard"""
-        try:
-            pyperclip.copy(value)
-        except:
-            self.clipboard_clear()
-            self.clipboard_append(value)
+        with perf_trace.stage("rbh.clipboard"):
+            try:
+                pyperclip.copy(value)
+            except:
+                self.clipboard_clear()
+                self.clipboard_append(value)
             
     def copy_all(self, site_code, card_number):
         """Copy all results to clipboard"""
@@ -572,13 +515,16 @@ WIEGAND OUTPUT:
 {'='*60}
 Generated by Kobe's Keys RFID Tools
 """
-        try:
-            pyperclip.copy(text)
-            messagebox.showinfo("Copied", "All results copied to clipboard!")
-        except:
-            self.clipboard_clear()
-            self.clipboard_append(text)
-            messagebox.showinfo("Copied", "All results copied to clipboard!")
+        with perf_trace.stage("rbh.clipboard"):
+            try:
+                pyperclip.copy(text)
+                copied = True
+            except:
+                copied = False
+            if not copied:
+                self.clipboard_clear()
+                self.clipboard_append(text)
+        messagebox.showinfo("Copied", "All results copied to clipboard!")
             
     def show_reverse_dialog(self):
         """Show dialog to reverse 50-bit hex back to site/card"""
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Salto DESFire Calculator - Kobe's Keys Edition
+Cyberpunk GUI Tool for RFID Research
+
+AN10922 card keys, data-file decoding and Proxmark3 commands for Salto
+DESFire cards; the batch button runs whole card lists through salto_keys.
+
+Requirements: pip install customtkinter pyperclip pycryptodome (or cryptography)
+"""
+
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+import pyperclip
+
+import desfire_keys
+import perf_trace
+import salto_keys
+
+# Set cyberpunk theme
+ctk.set_appearance_mode("dark")
+ctk.set_default_color_theme("blue")
+
+# Cyberpunk color scheme
+COLORS = {
+    'bg_dark': '#0a0a0f',
+    'bg_medium': '#12121a',
+    'bg_light': '#1a1a2e',
+    'accent_cyan': '#00fff9',
+    'accent_magenta': '#ff00ff',
+    'accent_yellow': '#f0ff00',
+    'accent_orange': '#ff6b00',
+    'text_primary': '#ffffff',
+    'text_secondary': '#00fff9',
+    'success': '#00ff88',
+    'border': '#00fff9'
+}
+
+
+class SaltoCalculator(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+
+        # Window setup
+        self.title("⚡ SALTO DESFIRE CALCULATOR - Kobe's Keys ⚡")
+        self.geometry("900x1000")
+        self.configure(fg_color=COLORS['bg_dark'])
+        self.resizable(True, True)
+
+        # Store results for copying
+        self.results = {}
+
+        # Build UI
+        self.create_header()
+        self.create_input_section()
+        self.create_results_section()
+        self.create_footer()
+        perf_trace.install_toggle(self, "SALTO")
+
+    def create_header(self):
+        """Create cyberpunk header"""
+        header_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_medium'], corner_radius=0)
+        header_frame.pack(fill="x", padx=0, pady=0)
+
+        title = ctk.CTkLabel(
+            header_frame,
+            text="◢◤ SALTO DESFIRE CALCULATOR ◢◤",
+            font=("Consolas", 28, "bold"),
+            text_color=COLORS['accent_cyan']
+        )
+        title.pack(pady=(20, 5))
+
+        subtitle = ctk.CTkLabel(
+            header_frame,
+            text="[ AN10922 KDF - KOBE'S KEYS EDITION ]",
+            font=("Consolas", 14),
+            text_color=COLORS['accent_magenta']
+        )
+        subtitle.pack(pady=(0, 5))
+
+        line = ctk.CTkLabel(
+            header_frame,
+            text="═" * 65,
+            font=("Consolas", 12),
+            text_color=COLORS['accent_cyan']
+        )
+        line.pack(pady=(5, 15))
+
+    def _entry_row(self, parent, label_text, placeholder, border, width=400):
+        row = ctk.CTkFrame(parent, fg_color="transparent")
+        row.pack(fill="x", pady=8)
+
+        label = ctk.CTkLabel(
+            row,
+            text=label_text,
+            font=("Consolas", 14),
+            text_color=COLORS['text_secondary'],
+            width=240,
+            anchor="w"
+        )
+        label.pack(side="left", padx=(0, 10))
+
+        entry = ctk.CTkEntry(
+            row,
+            font=("Consolas", 16),
+            fg_color=COLORS['bg_dark'],
+            border_color=border,
+            text_color=COLORS['text_primary'],
+            placeholder_text=placeholder,
+            width=width,
+            height=40
+        )
+        entry.pack(side="left")
+        return row, entry
+
+    def create_input_section(self):
+        """Create input fields"""
+        input_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_light'], corner_radius=10)
+        input_frame.pack(fill="x", padx=20, pady=10)
+
+        header = ctk.CTkLabel(
+            input_frame,
+            text="◈ INPUT MASTER KEY, UID & APPLICATION ◈",
+            font=("Consolas", 16, "bold"),
+            text_color=COLORS['accent_yellow']
+        )
+        header.pack(pady=(15, 10))
+
+        container = ctk.CTkFrame(input_frame, fg_color="transparent")
+        container.pack(fill="x", padx=20, pady=10)
+
+        _, self.master_entry = self._entry_row(
+            container, "AES MASTER KEY (32 hex):",
+            "e.g. 00112233445566778899AABBCCDDEEFF", COLORS['accent_cyan'])
+        _, self.uid_entry = self._entry_row(
+            container, "CARD UID (hex):", "e.g. 04782E21801D80", COLORS['accent_magenta'])
+
+        aid_row, self.aid_entry = self._entry_row(
+            container, "AID (F4B1xx / F5xxxx):", salto_keys.DEFAULT_AID,
+            COLORS['accent_yellow'], width=140)
+        self.aid_entry.insert(0, salto_keys.DEFAULT_AID)
+
+        self.with_aid_var = ctk.BooleanVar(value=False)
+        with_aid = ctk.CTkCheckBox(
+            aid_row,
+            text="AID in KDF input",
+            variable=self.with_aid_var,
+            font=("Consolas", 12),
+            text_color=COLORS['text_secondary'],
+            fg_color=COLORS['accent_cyan'],
+            hover_color=COLORS['accent_magenta']
+        )
+        with_aid.pack(side="left", padx=20)
+
+        _, self.system_entry = self._entry_row(
+            container, "SYSTEM ID (hex, optional):", "e.g. 4E585020416275",
+            COLORS['accent_cyan'])
+
+        _, self.payload_entry = self._entry_row(
+            container, "FILE 01 DATA (hex, optional):", "32-byte payload from hf mfdes read",
+            COLORS['accent_magenta'], width=300)
+
+        # Buttons
+        button_frame = ctk.CTkFrame(input_frame, fg_color="transparent")
+        button_frame.pack(fill="x", padx=20, pady=20)
+
+        self.calc_button = ctk.CTkButton(
+            button_frame,
+            text="⚡ CALCULATE ⚡",
+            font=("Consolas", 16, "bold"),
+            fg_color=COLORS['accent_cyan'],
+            hover_color=COLORS['accent_magenta'],
+            text_color=COLORS['bg_dark'],
+            width=200,
+            height=50,
+            command=self.calculate
+        )
+        self.calc_button.pack(side="left", padx=15)
+
+        self.batch_button = ctk.CTkButton(
+            button_frame,
+            text="▤ BATCH CARD LIST",
+            font=("Consolas", 14),
+            fg_color=COLORS['bg_medium'],
+            hover_color=COLORS['accent_magenta'],
+            text_color=COLORS['text_primary'],
+            border_color=COLORS['accent_magenta'],
+            border_width=2,
+            width=200,
+            height=50,
+            command=self.run_batch
+        )
+        self.batch_button.pack(side="left", padx=15)
+
+        self.clear_button = ctk.CTkButton(
+            button_frame,
+            text="◼ CLEAR ALL",
+            font=("Consolas", 14),
+            fg_color=COLORS['bg_medium'],
+            hover_color=COLORS['accent_orange'],
+            text_color=COLORS['text_primary'],
+            border_color=COLORS['accent_orange'],
+            border_width=2,
+            width=140,
+            height=50,
+            command=self.clear_all
+        )
+        self.clear_button.pack(side="left", padx=15)
+
+    def create_results_section(self):
+        """Create scrollable results area"""
+        self.results_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_light'], corner_radius=10)
+        self.results_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        header = ctk.CTkLabel(
+            self.results_frame,
+            text="◈ SALTO CARD KEY & DATA ◈",
+            font=("Consolas", 16, "bold"),
+            text_color=COLORS['accent_yellow']
+        )
+        header.pack(pady=(15, 10))
+
+        self.results_scroll = ctk.CTkScrollableFrame(
+            self.results_frame,
+            fg_color=COLORS['bg_dark'],
+            corner_radius=5
+        )
+        self.results_scroll.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+        self.show_placeholder()
+
+    def show_placeholder(self):
+        self.placeholder = ctk.CTkLabel(
+            self.results_scroll,
+            text="[ ENTER MASTER KEY AND UID → PRESS CALCULATE ]",
+            font=("Consolas", 14),
+            text_color=COLORS['accent_cyan']
+        )
+        self.placeholder.pack(pady=60)
+
+    def create_footer(self):
+        """Create footer"""
+        footer_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_medium'], corner_radius=0, height=50)
+        footer_frame.pack(fill="x", side="bottom")
+
+        footer_text = ctk.CTkLabel(
+            footer_frame,
+            text="◢ KOBE'S KEYS © 2026 | SALTO MODULE - MAMBA FOREVER ◤",
+            font=("Consolas", 11),
+            text_color=COLORS['accent_magenta']
+        )
+        footer_text.pack(pady=10)
+
+    @perf_trace.timed("salto.parse")
+    def parse_input(self, need_uid=True):
+        """Entries -> (master, uid, aid_hex, aid, system_id, payload)"""
+        clean = lambda entry: entry.get().strip().replace(" ", "").upper()
+        master = desfire_keys.parse_master(clean(self.master_entry))
+        uid_hex = clean(self.uid_entry)
+        if need_uid and not uid_hex:
+            raise ValueError("UID cannot be empty")
+        aid_hex = clean(self.aid_entry) or salto_keys.DEFAULT_AID
+        aid = salto_keys.parse_aid(aid_hex)
+        system_id = bytes.fromhex(clean(self.system_entry))
+        payload = bytes.fromhex(clean(self.payload_entry))
+        return master, bytes.fromhex(uid_hex), aid_hex, aid, system_id, payload
+
+    def calculate(self):
+        try:
+            master, uid, aid_hex, aid, system_id, payload = self.parse_input()
+            kdf_aid = aid if self.with_aid_var.get() else None
+            self.results = self.compute_values(master, uid, aid_hex, kdf_aid, system_id,
+                                               payload)
+            self.display_results()
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+
+    @perf_trace.timed("salto.compute")
+    def compute_values(self, master, uid, aid_hex, kdf_aid, system_id, payload):
+        kdf_input = salto_keys.an10922_input(uid, kdf_aid, system_id)
+        key = salto_keys.derive_keys(master, [uid], kdf_aid, system_id)
+        master_hex = master.hex().upper()
+        key_hex = key.hex().upper()
+        kdf_hex = kdf_input.hex().upper()
+        return {
+            "master": master_hex,
+            "uid": uid.hex().upper(),
+            "aid": aid_hex,
+            "kdf_input": kdf_hex,
+            "key": key_hex,
+            "payload": payload,
+            "commands": salto_keys.pm3_commands(aid_hex, master_hex, key_hex, kdf_hex)
+        }
+
+    @perf_trace.timed("salto.render")
+    def display_results(self):
+        for widget in self.results_scroll.winfo_children():
+            widget.destroy()
+
+        r = self.results
+        cmds = r['commands']
+        message = "01" + r['kdf_input']
+        if len(r['kdf_input']) < 2 * salto_keys.MAX_INPUT:
+            message += " + 80 00.. pad"
+        sections = [
+            ("INPUT", [
+                ("Master Key (AES)", r['master']),
+                ("Card UID", r['uid']),
+                ("Application ID", r['aid'])
+            ]),
+            ("AN10922 DIVERSIFICATION", [
+                ("KDF Input (-i)", r['kdf_input']),
+                ("CMAC Message", message),
+                ("AES Card Key", r['key'])
+            ])
+        ]
+        if r['payload']:
+            payload = r['payload']
+            text = payload.decode('ascii', errors='replace') if payload.isascii() else "-"
+            sections.append((f"FILE {salto_keys.DATA_FILE:02X} (PLAIN)", [
+                ("Payload", payload.hex().upper()),
+                ("ASCII", text),
+                ("Length", f"{len(payload)} bytes")
+            ]))
+        sections.append(("PROXMARK3 COMMAND READY", [
+            ("Check keys (KDF 1)", cmds['check']),
+            ("Auth with master + KDF", cmds['auth_kdf']),
+            ("Auth with card key", cmds['auth']),
+            ("Dump application", cmds['dump']),
+            ("Read data file", cmds['read'])
+        ]))
+
+        for section_name, items in sections:
+            self.add_section(section_name, items)
+
+        # Copy all button
+        copy_frame = ctk.CTkFrame(self.results_scroll, fg_color="transparent")
+        copy_frame.pack(fill="x", pady=20)
+
+        copy_btn = ctk.CTkButton(
+            copy_frame,
+            text="📋 COPY CARD KEY + COMMANDS",
+            font=("Consolas", 12),
+            fg_color=COLORS['accent_magenta'],
+            hover_color=COLORS['accent_cyan'],
+            text_color=COLORS['bg_dark'],
+            width=300,
+            height=40,
+            command=self.copy_all
+        )
+        copy_btn.pack()
+
+    def add_section(self, title, items):
+        """Add a section of results"""
+        header = ctk.CTkLabel(
+            self.results_scroll,
+            text=f"┌─ {title} ─┐",
+            font=("Consolas", 13, "bold"),
+            text_color=COLORS['accent_yellow'],
+            anchor="w"
+        )
+        header.pack(fill="x", padx=10, pady=(15, 5))
+
+        for label, value in items:
+            item_frame = ctk.CTkFrame(self.results_scroll, fg_color="transparent")
+            item_frame.pack(fill="x", padx=20, pady=3)
+
+            lbl = ctk.CTkLabel(
+                item_frame,
+                text=f"{label}:",
+                font=("Consolas", 11),
+                text_color=COLORS['text_secondary'],
+                width=220,
+                anchor="w"
+            )
+            lbl.pack(side="left")
+
+            val = ctk.CTkLabel(
+                item_frame,
+                text=value,
+                font=("Consolas", 12, "bold"),
+                text_color=COLORS['success'],
+                anchor="w",
+                wraplength=520,
+                justify="left"
+            )
+            val.pack(side="left", padx=10)
+
+            copy_btn = ctk.CTkButton(
+                item_frame,
+                text="📋",
+                font=("Consolas", 10),
+                fg_color="transparent",
+                hover_color=COLORS['bg_light'],
+                text_color=COLORS['accent_cyan'],
+                width=30,
+                height=25,
+                command=lambda v=value: self.copy_value(v)
+            )
+            copy_btn.pack(side="right", padx=5)
+
+    def run_batch(self):
+        """Derive keys for a whole card list (payloads passed through) into a CSV"""
+        try:
+            master, _, _, aid, system_id, _ = self.parse_input(need_uid=False)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        source = filedialog.askopenfilename(
+            title="Card list (UID[,payload] per line)",
+            filetypes=[("Text", "*.txt *.csv"), ("All files", "*.*")])
+        if not source:
+            return
+        target = filedialog.asksaveasfilename(
+            title="Save keys as", defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if not target:
+            return
+        try:
+            with perf_trace.stage("salto.batch"):
+                with open(source, encoding='utf-8') as f:
+                    uids, payloads = salto_keys.read_cards(f)
+                kdf_aid = aid if self.with_aid_var.get() else None
+                keys = salto_keys.derive_keys(master, uids, kdf_aid, system_id)
+                with open(target, 'w', encoding='ascii', newline='') as out:
+                    salto_keys.write_csv(out, uids, keys, payloads)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Batch done", f"{len(uids)} card keys written to {target}")
+
+    def copy_value(self, value):
+        """Copy single value to clipboard"""
+        with perf_trace.stage("salto.clipboard"):
+            pyperclip.copy(value)
+
+    def copy_all(self):
+        """Copy card key and commands to clipboard"""
+        r = self.results
+        cmds = r['commands']
+        text = f"""SALTO DESFIRE CARD KEY - Kobe's Keys
+{'='*60}
+Master Key : {r['master']}
+Card UID   : {r['uid']}
+AID        : {r['aid']}
+KDF Input  : {r['kdf_input']}
+Card Key   : {r['key']}
+
+Proxmark3 Commands:
+{cmds['check']}
+{cmds['auth_kdf']}
+{cmds['auth']}
+{cmds['dump']}
+{cmds['read']}
+
+{'='*60}
+Generated by Kobe's Keys - Mamba Mentality
+"""
+        with perf_trace.stage("salto.clipboard"):
+            pyperclip.copy(text)
+        messagebox.showinfo("Copied!", "Card key + PM3 commands copied to clipboard!")
+
+    def clear_all(self):
+        """Clear all inputs and results"""
+        for entry in (self.master_entry, self.uid_entry, self.system_entry, self.payload_entry):
+            entry.delete(0, 'end')
+        self.aid_entry.delete(0, 'end')
+        self.aid_entry.insert(0, salto_keys.DEFAULT_AID)
+
+        for widget in self.results_scroll.winfo_children():
+            widget.destroy()
+        self.show_placeholder()
+
+
+def main():
+    app = SaltoCalculator()
+    app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
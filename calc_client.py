@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Calculator Daemon Client - Kobe's Keys Edition
+Thin client for calculator_daemon.py (standard library only, fast startup)
+
+Usage:
+    python calc_client.py kantech 8020 11485
+    python calc_client.py rbh 4000 4897846
+    python calc_client.py reverse 01F400095786C
+    python calc_client.py diversify 0102030405060708090A0B0C0D0E0F10 040C6FFA1D2090
+    python calc_client.py stdin < requests.ndjson    # pipelined NDJSON passthrough
+    python calc_client.py bench 100000               # pipelined throughput test
+
+Requirements: none (standard library only)
+"""
+
+import json
+import os
+import socket
+import sys
+
+# Requests sent before reading replies; keeps both socket buffers bounded
+PIPELINE_WINDOW = 512
+
+
+def socket_path():
+    """Socket path from KOBE_CALC_SOCKET, else a per-user runtime path"""
+    path = os.environ.get("KOBE_CALC_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "kobe-calc.sock")
+    return f"/tmp/kobe-calc-{os.getuid()}.sock"
+
+
+class CalcClient:
+    """Newline-delimited JSON client with pipelining"""
+
+    def __init__(self, path=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path or socket_path())
+        self.reader = self.sock.makefile("rb")
+        self.next_id = 0
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, op, **params):
+        """Send one request and return its result (raises on error)"""
+        reply = self.pipeline([dict(params, op=op)])[0]
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "request failed"))
+        return reply["result"]
+
+    def pipeline(self, requests):
+        """Send many requests back to back; returns replies in order"""
+        lines = []
+        for req in requests:
+            if "id" not in req:
+                req = dict(req, id=self.next_id)
+                self.next_id += 1
+            lines.append(json.dumps(req, separators=(",", ":")).encode())
+        return [json.loads(reply) for reply in self.pipeline_raw(lines)]
+
+    def pipeline_raw(self, lines):
+        """Send pre-encoded request lines; returns raw reply lines in order"""
+        replies = []
+        for start in range(0, len(lines), PIPELINE_WINDOW):
+            window = lines[start:start + PIPELINE_WINDOW]
+            self.sock.sendall(b"\n".join(window) + b"\n")
+            for _ in window:
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("daemon closed the connection")
+                replies.append(line)
+        return replies
+
+
+def _bench(client, total):
+    import time
+
+    requests = [{"op": "kantech", "site": i & 0xFFFF, "card": (i * 7) & 0xFFFF}
+                for i in range(total)]
+    start = time.perf_counter()
+    client.pipeline(requests)
+    elapsed = time.perf_counter() - start
+    print(f"{total} requests in {elapsed:.3f}s = {total / elapsed:,.0f} req/s "
+          f"({elapsed / total * 1e6:.1f} us/request)")
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    command = args.pop(0)
+    try:
+        client = CalcClient()
+    except OSError as e:
+        print(f"Cannot reach calculator daemon at {socket_path()}: {e}", file=sys.stderr)
+        return 1
+
+    with client:
+        if command == "stdin":
+            lines = [line.strip() for line in sys.stdin.buffer if line.strip()]
+            sys.stdout.buffer.writelines(client.pipeline_raw(lines))
+            return 0
+        if command == "bench":
+            _bench(client, int(args[0]) if args else 100000)
+            return 0
+
+        if command in ("kantech", "rbh"):
+            request = {"op": command, "site": int(args[0]), "card": int(args[1])}
+        elif command == "reverse":
+            request = {"op": "rbh_reverse", "value": args[0]}
+        elif command == "diversify":
+            request = {"op": "diversify", "master": args[0], "uid": args[1]}
+        elif command == "ping":
+            request = {"op": "ping"}
+        else:
+            print(f"Unknown command: {command}", file=sys.stderr)
+            return 2
+
+        reply = client.pipeline([request])[0]
+        print(json.dumps(reply.get("result", reply), indent=2))
+        return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
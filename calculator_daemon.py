@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Calculator Daemon - Kobe's Keys Edition
+Keeps the Kantech, RBH and DESFire engines warm behind a Unix socket
+
+Protocol: one JSON object per line in, one JSON reply per line out, in order.
+Clients may pipeline any number of requests without waiting.
+
+    {"id": 1, "op": "kantech", "site": 8020, "card": 11485}
+    {"id": 2, "op": "rbh", "site": 4000, "card": 4897846}
+    {"id": 3, "op": "rbh_reverse", "value": "01F400095786C"}
+    {"id": 4, "op": "diversify", "master": "<32 hex>", "uid": "040C6FFA1D2090"}
+    {"id": 5, "op": "diversify_batch", "master": "<32 hex>", "uids": ["04..", ...]}
+        (diversify ops also take "key_type": AES|DES|2K3DES|3K3DES and "key_version")
+    {"id": 6, "op": "batch", "requests": [{...}, {...}]}    (no batch ops inside)
+    {"id": 7, "op": "format", "name": "kantech", "site": 8020, "card": 11485}
+    {"id": 8, "op": "derive", "name": "an10922", "master": "<32 hex>", "uid": "04..",
+     "options": {"aid_hex": "F4B101"}}
+    {"id": 9, "op": "plugins"}
+        (format / derive run any plugin from plugins.py; modules load on first use)
+
+Replies: {"id": 1, "ok": true, "result": {...}} or {"id": 1, "ok": false, "error": "..."}
+
+Usage:
+    python calculator_daemon.py [--socket PATH]
+    python calc_client.py kantech 8020 11485
+
+Requirements: pycryptodome or cryptography for the diversify / derive ops
+(others need nothing extra)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+import credential_codec
+import desfire_keys
+import plugins
+from calc_client import socket_path
+
+_TYPE_NAMES = {str: "a string", int: "an integer", list: "a list", dict: "an object"}
+
+
+def _field(req, name, kind, default=None):
+    """req[name] checked against a JSON type; optional when a default is given"""
+    value = req[name] if default is None else req.get(name, default)
+    # type() rather than isinstance(): true / false are not integers here
+    if type(value) is not kind:
+        raise TypeError(f"{name} must be {_TYPE_NAMES[kind]}")
+    return value
+
+
+def _key_version(req):
+    version = req.get("key_version")
+    if version is not None and type(version) is not int:
+        raise TypeError("key_version must be an integer")
+    return version
+
+
+def _site_card(req, card_max):
+    site, card = _field(req, "site", int), _field(req, "card", int)
+    if not 0 <= site <= 0xFFFF:
+        raise ValueError("Site Code must be 0-65535 (16-bit)")
+    if not 0 <= card <= card_max:
+        raise ValueError(f"Card Number must be 0-{card_max}")
+    return site, card
+
+
+def op_kantech(req):
+    return credential_codec.kantech_values(*_site_card(req, credential_codec.KANTECH_CARD_MAX))
+
+
+def op_rbh(req):
+    return credential_codec.rbh_values(*_site_card(req, credential_codec.RBH_CARD_MAX))
+
+
+def op_rbh_reverse(req):
+    value = req["value"]
+    if isinstance(value, str):
+        value = int(value.replace(" ", ""), 16)
+    elif type(value) is not int:
+        raise TypeError("value must be a hex string or an integer")
+    site, card, p1, p2 = credential_codec.rbh_decode_50bit(value)
+    return {"site": site, "card": card, "p1": p1, "p2": p2}
+
+
+def _crypto(call, *args, **kwargs):
+    """Run a cipher-backed call; the backend is only imported on first use"""
+    try:
+        return call(*args, **kwargs)
+    except ImportError:
+        raise ValueError("crypto library not installed on the daemon host "
+                         "(pip install pycryptodome or cryptography)") from None
+
+
+def op_diversify(req):
+    return _crypto(desfire_keys.diversify_key, _field(req, "master", str),
+                   _field(req, "uid", str), _field(req, "key_type", str, "AES"),
+                   _key_version(req))
+
+
+def op_diversify_batch(req):
+    uids = _field(req, "uids", list)
+    if not all(type(uid) is str for uid in uids):
+        raise TypeError("uids must be a list of strings")
+    return _crypto(desfire_keys.diversify_batch, _field(req, "master", str), uids,
+                   _field(req, "key_type", str, "AES"), _key_version(req))
+
+
+def _plugin(req, kind):
+    plugin = plugins.registry().get(_field(req, "name", str), kind)
+    try:
+        return plugin.load()
+    except ImportError as e:
+        raise ValueError(f"{plugin.name}: missing dependency on the daemon host: "
+                         f"{e.name or e}") from None
+
+
+def op_format(req):
+    return _plugin(req, 'format')(_field(req, "site", int), _field(req, "card", int))
+
+
+def op_derive(req):
+    derive = _plugin(req, 'diversifier')
+    return _crypto(derive, _field(req, "master", str), _field(req, "uid", str),
+                   **_field(req, "options", dict, {}))
+
+
+def op_plugins(req):
+    registry = plugins.registry()
+    return {kind: registry.names(kind) for kind in plugins.KINDS}
+
+
+def op_ping(req):
+    return "pong"
+
+
+def op_batch(req):
+    # One level only: nested batches would recurse until RecursionError
+    return [{"id": sub.get("id"), "ok": False, "error": "batch ops cannot be nested"}
+            if isinstance(sub, dict) and sub.get("op") == "batch" else handle_request(sub)
+            for sub in req["requests"]]
+
+
+OPS = {
+    "kantech": op_kantech,
+    "rbh": op_rbh,
+    "rbh_reverse": op_rbh_reverse,
+    "diversify": op_diversify,
+    "diversify_batch": op_diversify_batch,
+    "format": op_format,
+    "derive": op_derive,
+    "plugins": op_plugins,
+    "ping": op_ping,
+    "batch": op_batch,
+}
+
+
+def handle_request(req):
+    """Run one decoded request; never raises"""
+    req_id = req.get("id") if isinstance(req, dict) else None
+    try:
+        handler = OPS.get(req["op"])
+        if handler is None:
+            return {"id": req_id, "ok": False, "error": f"unknown op: {req['op']}"}
+        return {"id": req_id, "ok": True, "result": handler(req)}
+    except KeyError as e:
+        return {"id": req_id, "ok": False, "error": f"missing or unknown field: {e}"}
+    except (ValueError, TypeError) as e:
+        return {"id": req_id, "ok": False, "error": str(e)}
+    except Exception as e:
+        # A failing handler must not take the connection and its pipelined replies down
+        return {"id": req_id, "ok": False, "error": f"internal error: {type(e).__name__}: {e}"}
+
+
+def handle_line(line):
+    try:
+        req = json.loads(line)
+    except (ValueError, RecursionError) as e:
+        # RecursionError: arrays / objects nested too deeply to decode
+        reply = {"id": None, "ok": False, "error": f"bad JSON: {e}"}
+    else:
+        reply = handle_request(req)
+    try:
+        text = json.dumps(reply, separators=(",", ":"))
+    except (TypeError, ValueError) as e:
+        # A plugin result JSON cannot hold
+        text = json.dumps({"id": reply["id"], "ok": False, "error": f"unserializable result: {e}"},
+                          separators=(",", ":"))
+    return text.encode() + b"\n"
+
+
+class CalcProtocol(asyncio.Protocol):
+    """Answers every complete line in a read with one write"""
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = bytearray()
+
+    def data_received(self, data):
+        self.buffer += data
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            return
+        chunk = bytes(self.buffer[:end])
+        del self.buffer[:end + 1]
+        self.transport.write(b"".join(
+            handle_line(line) for line in chunk.split(b"\n") if line.strip()))
+
+    # Stop reading from a client that is not draining its replies
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+
+async def serve(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    loop = asyncio.get_running_loop()
+    server = await loop.create_unix_server(CalcProtocol, path)
+    os.chmod(path, 0o600)
+
+    stop = loop.create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set_result, None)
+
+    print(f"Calculator daemon listening on {path}", file=sys.stderr)
+    try:
+        async with server:
+            await stop
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kantech / RBH / DESFire calculator daemon")
+    parser.add_argument("--socket", default=socket_path(), help="Unix socket path")
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Cipher Backends - CyberNinja Edition
+Block-cipher / CMAC primitives for diversification, with backend selection
+
+AES for the AES path; DES / 2K3DES / 3K3DES (EDE) for legacy EV1 keys.
+
+Backends:
+    pycryptodome   Crypto.Cipher / Crypto.Hash.CMAC
+    cryptography   OpenSSL via the `cryptography` package
+
+Selection: KOBE_CRYPTO_BACKEND=<name> forces a backend; otherwise a short
+micro-benchmark on first use picks the fastest one installed.
+
+Usage:
+    python cipher_backends.py      # benchmark + cross-check every backend
+
+Requirements: pip install pycryptodome and/or cryptography
+"""
+
+import os
+import sys
+import time
+
+_BACKEND_CLASSES = {}
+_active = None
+
+
+def _register(cls):
+    _BACKEND_CLASSES[cls.name] = cls
+    return cls
+
+
+@_register
+class PycryptodomeBackend:
+    name = 'pycryptodome'
+
+    def __init__(self):
+        from Crypto.Cipher import AES, DES, DES3
+        from Crypto.Hash import CMAC
+        self._AES = AES
+        self._DES = DES
+        self._DES3 = DES3
+        self._CMAC = CMAC
+
+    def ecb(self, key):
+        """Reusable ECB object with encrypt()/decrypt()"""
+        return self._AES.new(key, self._AES.MODE_ECB)
+
+    def des_ecb(self, key):
+        """DES (8-byte key) or 3DES EDE (16/24-byte key) ECB object"""
+        if len(key) == 8:
+            return self._DES.new(key, self._DES.MODE_ECB)
+        try:
+            return self._DES3.new(key, self._DES3.MODE_ECB)
+        except ValueError:
+            # pycryptodome refuses keys that collapse to single DES
+            return self._DES.new(_single_des_key(key), self._DES.MODE_ECB)
+
+    def cbc_encrypt(self, key, iv, data):
+        return self._AES.new(key, self._AES.MODE_CBC, iv=iv).encrypt(data)
+
+    def cbc_decrypt(self, key, iv, data):
+        return self._AES.new(key, self._AES.MODE_CBC, iv=iv).decrypt(data)
+
+    def cmac(self, key, data):
+        return self._CMAC.new(key, msg=data, ciphermod=self._AES).digest()
+
+
+def _single_des_key(key):
+    """The effective DES key of a degenerate 3DES EDE key"""
+    k1, k2 = key[:8], key[8:16]
+    k3 = key[16:24] or k1
+    strip = lambda k: bytes(b & 0xFE for b in k)
+    # E_K3(D_K2(E_K1(x))) is E_K3(x) when K1 == K2 and E_K1(x) when K2 == K3
+    return k3 if strip(k1) == strip(k2) else k1
+
+
+class _OpenSSLEcb:
+    """ECB contexts are stateless between update() calls, so keep one each way"""
+
+    __slots__ = ('_enc', '_dec')
+
+    def __init__(self, cipher):
+        self._enc = cipher.encryptor()
+        self._dec = cipher.decryptor()
+
+    def encrypt(self, data):
+        return self._enc.update(data)
+
+    def decrypt(self, data):
+        return self._dec.update(data)
+
+
+@_register
+class CryptographyBackend:
+    name = 'cryptography'
+
+    def __init__(self):
+        from cryptography.hazmat.primitives import cmac
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+        try:
+            from cryptography.hazmat.decrepit.ciphers.algorithms import TripleDES
+        except ImportError:  # cryptography < 43
+            TripleDES = algorithms.TripleDES
+        self._Cipher = Cipher
+        self._algorithms = algorithms
+        self._TripleDES = TripleDES
+        self._modes = modes
+        self._cmac = cmac
+
+    def ecb(self, key):
+        return _OpenSSLEcb(self._Cipher(self._algorithms.AES(key), self._modes.ECB()))
+
+    def des_ecb(self, key):
+        # Always hand OpenSSL a 3-key bundle: K1K1K1 is single DES, K1K2K1 is 2K3DES
+        if len(key) == 8:
+            key = key * 3
+        elif len(key) == 16:
+            key = key + key[:8]
+        return _OpenSSLEcb(self._Cipher(self._TripleDES(key), self._modes.ECB()))
+
+    def cbc_encrypt(self, key, iv, data):
+        enc = self._Cipher(self._algorithms.AES(key), self._modes.CBC(iv)).encryptor()
+        return enc.update(data) + enc.finalize()
+
+    def cbc_decrypt(self, key, iv, data):
+        dec = self._Cipher(self._algorithms.AES(key), self._modes.CBC(iv)).decryptor()
+        return dec.update(data) + dec.finalize()
+
+    def cmac(self, key, data):
+        mac = self._cmac.CMAC(self._algorithms.AES(key))
+        mac.update(data)
+        return mac.finalize()
+
+
+def available():
+    """Instances of every backend whose library imports"""
+    backends = []
+    for cls in _BACKEND_CLASSES.values():
+        try:
+            backends.append(cls())
+        except ImportError:
+            continue
+    return backends
+
+
+def benchmark(backend, rounds=3):
+    """Seconds for a mix of single-block and bulk ECB work (lower is better)"""
+    key = bytes(range(16))
+    single = bytes(16)
+    bulk = bytes(16 * 4096)
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(500):
+            backend.ecb(key).encrypt(single)
+        cipher = backend.ecb(key)
+        for _ in range(16):
+            cipher.encrypt(bulk)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def select_backend(name=None):
+    """Pick a backend by name, KOBE_CRYPTO_BACKEND, or micro-benchmark"""
+    name = name or os.environ.get('KOBE_CRYPTO_BACKEND')
+    if name:
+        cls = _BACKEND_CLASSES.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown crypto backend: {name}")
+        return cls()
+    backends = available()
+    if not backends:
+        raise ImportError("Install pycryptodome or cryptography")
+    if len(backends) == 1:
+        return backends[0]
+    return min(backends, key=benchmark)
+
+
+def get_backend():
+    """The process-wide backend, selected on first use"""
+    global _active
+    if _active is None:
+        _active = select_backend()
+    return _active
+
+
+def set_backend(name):
+    global _active
+    _active = select_backend(name)
+    return _active
+
+
+# ─── Cross-check ───
+
+# FIPS-197 C.1 and RFC 4493 example 2
+_AES_VECTOR = ('000102030405060708090a0b0c0d0e0f', '00112233445566778899aabbccddeeff',
+               '69c4e0d86a7b0430d8cdb78070b4c55a')
+# Classic DES worked example and the NIST SP 800-67 TDEA example
+_DES_VECTOR = ('133457799bbcdff1', '0123456789abcdef', '85e813540f0ab405')
+_TDEA_VECTOR = ('0123456789abcdef23456789abcdef01456789abcdef0123',
+                '5468652071756663' '6b2062726f776e20' '666f78206a756d70',
+                'a826fd8ce53b855f' 'cce21c8112256fe6' '68d5c05dd9b6b900')
+_CMAC_VECTOR = ('2b7e151628aed2a6abf7158809cf4f3c', '6bc1bee22e409f96e93d7e117393172a',
+                '070a16b46b4d4144f79bdd9dd04a287c')
+
+
+def _check_diversification(backend):
+    """Known-answer checks of the diversified keys themselves, run on one backend"""
+    global _active
+    # Imported here: both modules import this one
+    import desfire_keys
+    import salto_keys
+
+    previous, _active = _active, backend
+    try:
+        return [f"{backend.name}: {problem}"
+                for problem in salto_keys.check_vectors() + desfire_keys.check_vectors()]
+    finally:
+        _active = previous
+
+
+def cross_check(backends=None, samples=256):
+    """Verify every backend against known vectors and against each other
+
+    Besides the cipher primitives this checks the diversified keys: the NXP
+    AN10922 examples and the ECB / CBC scheme's regression vectors.
+    Returns a list of problem descriptions (empty when all agree).
+    """
+    backends = backends or available()
+    problems = []
+    key, plain, expected = (bytes.fromhex(x) for x in _AES_VECTOR)
+    mac_key, msg, mac = (bytes.fromhex(x) for x in _CMAC_VECTOR)
+    iv = bytes(range(16))
+    data = bytes(range(256)) * 2
+    master = bytes.fromhex('0102030405060708090A0B0C0D0E0F10')
+    uids = b''.join(i.to_bytes(7, 'big') + bytes(9) for i in range(samples))
+
+    reference = None
+    for backend in backends:
+        if backend.ecb(key).encrypt(plain) != expected:
+            problems.append(f"{backend.name}: AES ECB vector mismatch")
+        if backend.cmac(mac_key, msg) != mac:
+            problems.append(f"{backend.name}: CMAC vector mismatch")
+        if backend.cbc_decrypt(key, iv, backend.cbc_encrypt(key, iv, data)) != data:
+            problems.append(f"{backend.name}: CBC round trip failed")
+        for label, vector in (('DES', _DES_VECTOR), ('3K3DES', _TDEA_VECTOR)):
+            des_key, des_plain, des_expected = (bytes.fromhex(x) for x in vector)
+            if backend.des_ecb(des_key).encrypt(des_plain) != des_expected:
+                problems.append(f"{backend.name}: {label} vector mismatch")
+        # A 2K3DES key with K1 == K2 must behave as single DES
+        des_key, des_plain, des_expected = (bytes.fromhex(x) for x in _DES_VECTOR)
+        if backend.des_ecb(des_key * 2).encrypt(des_plain) != des_expected:
+            problems.append(f"{backend.name}: degenerate 2K3DES mismatch")
+        problems.extend(_check_diversification(backend))
+        derived = backend.ecb(master).encrypt(uids)
+        if reference is None:
+            reference = (backend.name, derived)
+        elif derived != reference[1]:
+            problems.append(f"{backend.name}: derived keys differ from {reference[0]}")
+    return problems
+
+
+def main():
+    backends = available()
+    if not backends:
+        print("No crypto backend installed (pip install pycryptodome or cryptography)")
+        return 1
+    for backend in backends:
+        print(f"{backend.name:14} {benchmark(backend) * 1000:8.2f} ms")
+    print(f"Selected: {get_backend().name}")
+    problems = cross_check(backends)
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    if not problems:
+        print(f"Cross-check OK ({', '.join(b.name for b in backends)})")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
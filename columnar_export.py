@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Columnar Export - Kobe's Keys Edition
+Kantech / RBH / diversification batch results as Arrow IPC or Parquet
+
+Rows are computed with NumPy a batch at a time and written as typed record
+batches, so memory stays bounded by one batch whatever the input size:
+
+    kantech   site u16, card u16, combined_32 u32, combined_48 u64,
+              full_be / full_le binary(4), xor u16, sum u16
+    rbh       site u16, card u32, full_50bit binary(7) (big-endian, parity
+              included), full_be / full_le binary(6), xor u32, sum u32
+    diversify uid binary, site u32 (null without a label), key binary(16/24),
+              kcv binary(3); master KCV, key type and KDF in schema metadata
+
+Byte columns hold raw bytes (fixed-size binary), not repeated hex strings.
+--dictionary site dictionary-encodes the site column (site labels repeat
+across a fleet); --compression picks lz4 / zstd (Arrow) or snappy / zstd /
+gzip / none (Parquet).
+
+Formats (from the extension or --format):
+    .arrow / .feather   Arrow IPC file (pyarrow.feather.read_table, random access)
+    .arrows             Arrow IPC stream
+    .parquet / .pq      Parquet
+
+Input:
+    kantech / rbh   SITE:CARD lines (as for credential_inventory.py), or
+                    --site S --cards FIRST-LAST
+    diversify       fleet file, one UID[,SITE] per line (as for pm3_dictionary.py)
+
+Usage:
+    python columnar_export.py kantech --site 8020 --cards 1-65535 -o kantech.parquet
+    python columnar_export.py rbh cards.txt -o rbh.arrow --compression zstd
+    python columnar_export.py diversify fleet.txt --master <hex> -o keys.parquet --dictionary site
+    python columnar_export.py --bench 1000000
+
+Requirements: pip install numpy pyarrow pycryptodome (or cryptography)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import credential_codec
+import desfire_keys
+import salto_keys
+from key_check import kcv_batch
+from pm3_dictionary import NO_SITE, read_fleet
+
+# Rows per record batch (one Parquet row group each)
+BATCH_ROWS = 1 << 17
+
+KANTECH_SCHEMA = pa.schema([
+    ('site', pa.uint16()), ('card', pa.uint16()),
+    ('combined_32', pa.uint32()), ('combined_48', pa.uint64()),
+    ('full_be', pa.binary(4)), ('full_le', pa.binary(4)),
+    ('xor', pa.uint16()), ('sum', pa.uint16()),
+])
+RBH_SCHEMA = pa.schema([
+    ('site', pa.uint16()), ('card', pa.uint32()), ('full_50bit', pa.binary(7)),
+    ('full_be', pa.binary(6)), ('full_le', pa.binary(6)),
+    ('xor', pa.uint32()), ('sum', pa.uint32()),
+])
+KDFS = ('ecb', 'an10922')
+FORMATS = {'.arrow': 'arrow', '.feather': 'arrow', '.arrows': 'arrows',
+           '.parquet': 'parquet', '.pq': 'parquet'}
+# Arrow IPC file format magic (streams have none)
+ARROW_MAGIC = b'ARROW1'
+
+
+def diversify_schema(key_type='AES'):
+    return pa.schema([
+        ('uid', pa.binary()), ('site', pa.uint32()),
+        ('key', pa.binary(desfire_keys.key_length(key_type))), ('kcv', pa.binary(3)),
+    ])
+
+
+# ─── Column builders ───
+
+def _pack(*fields):
+    """Row-wise packed bytes of (dtype, values) fields, e.g. ('>u2', site)"""
+    dtype = np.dtype([(f'f{i}', code) for i, (code, _) in enumerate(fields)])
+    out = np.empty(len(fields[0][1]), dtype)
+    for i, (_, values) in enumerate(fields):
+        out[f'f{i}'] = values
+    return out.view(np.uint8)
+
+
+def _binary(width, data):
+    """FixedSizeBinaryArray over a contiguous uint8 buffer of `width`-byte rows"""
+    data = np.ascontiguousarray(data)
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(width), data.size // width,
+                                                [None, pa.py_buffer(data)])
+
+
+def _parity(x):
+    """Even-parity bit of every uint64 (XOR folding)"""
+    for s in (16, 8, 4, 2, 1):
+        x = x ^ (x >> np.uint64(s))
+    return x & np.uint64(1)
+
+
+def kantech_batch(sites, cards):
+    """Record batch of Kantech encodings for site / card arrays"""
+    site = np.asarray(sites, dtype=np.uint64)
+    card = np.asarray(cards, dtype=np.uint64)
+    if len(site) and (site.max() > credential_codec.KANTECH_SITE_MAX
+                      or card.max() > credential_codec.KANTECH_CARD_MAX):
+        raise ValueError("Kantech site code and card number must be 0-65535 (16-bit)")
+    return pa.RecordBatch.from_arrays([
+        pa.array(site.astype(np.uint16)), pa.array(card.astype(np.uint16)),
+        pa.array(((site << np.uint64(16)) | card).astype(np.uint32)),
+        pa.array((site << np.uint64(32)) | card),
+        _binary(4, _pack(('>u2', site), ('>u2', card))),
+        _binary(4, _pack(('<u2', card), ('<u2', site))),
+        pa.array((site ^ card).astype(np.uint16)),
+        pa.array(((site + card) & np.uint64(0xFFFF)).astype(np.uint16)),
+    ], schema=KANTECH_SCHEMA)
+
+
+def rbh_batch(sites, cards):
+    """Record batch of RBH 50-bit encodings for site / card arrays"""
+    site = np.asarray(sites, dtype=np.uint64)
+    card = np.asarray(cards, dtype=np.uint64)
+    if len(site) and (site.max() > credential_codec.RBH_SITE_MAX
+                      or card.max() > credential_codec.RBH_CARD_MAX):
+        raise ValueError("RBH site code must be 16-bit and card number 32-bit")
+    value = ((_parity(site) << np.uint64(49)) | (site << np.uint64(33))
+             | (card << np.uint64(1)) | _parity(card))
+    # 50 bits fit in the low 7 bytes of the big-endian u64
+    full_50bit = _pack(('>u8', value)).reshape(-1, 8)[:, 1:]
+    return pa.RecordBatch.from_arrays([
+        pa.array(site.astype(np.uint16)), pa.array(card.astype(np.uint32)),
+        _binary(7, full_50bit),
+        _binary(6, _pack(('>u2', site), ('>u4', card))),
+        _binary(6, _pack(('<u4', card), ('<u2', site))),
+        pa.array((site ^ card).astype(np.uint32)),
+        pa.array(((site + card) & np.uint64(0xFFFFFFFF)).astype(np.uint32)),
+    ], schema=RBH_SCHEMA)
+
+
+def diversify_batch(master, uids, sites, key_type='AES', key_version=None, kdf='ecb',
+                    schema=None):
+    """Record batch of diversified keys and their KCVs for raw UIDs"""
+    if kdf == 'an10922':
+        keys = salto_keys.derive_keys(master, uids, key_type=key_type)
+        if key_version is not None and key_type != 'AES':
+            keys = bytes(desfire_keys.set_key_version_batch(bytearray(keys), key_version,
+                                                            key_type))
+    else:
+        keys = desfire_keys.diversify_batch_bytes(master, uids, key_type, key_version)
+    length = desfire_keys.key_length(key_type)
+    site = np.asarray(sites, dtype=np.uint32)
+    return pa.RecordBatch.from_arrays([
+        pa.array(uids, pa.binary()),
+        pa.array(site, mask=site == NO_SITE),
+        _binary(length, np.frombuffer(keys, np.uint8)),
+        _binary(3, np.frombuffer(kcv_batch(keys, key_type), np.uint8)),
+    ], schema=schema or diversify_schema(key_type))
+
+
+# ─── Sources ───
+
+def credential_range(site, first, last, batch=BATCH_ROWS):
+    """(sites, cards) arrays for cards first..last of one site"""
+    for start in range(first, last + 1, batch):
+        cards = np.arange(start, min(start + batch, last + 1), dtype=np.uint64)
+        yield np.full(len(cards), site, dtype=np.uint64), cards
+
+
+def read_credentials(path, batch=BATCH_ROWS):
+    """(sites, cards) arrays from SITE:CARD[,label] lines (labels are ignored)"""
+    sites, cards = [], []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            value = line.partition(',')[0]
+            for sep in (':', '-', ' '):
+                if sep in value:
+                    site, _, card = value.partition(sep)
+                    break
+            else:
+                site = card = ''
+            try:
+                site, card = int(site), int(card)
+                if site < 0 or card < 0 or max(site, card) >> 64:
+                    raise ValueError
+            except ValueError:
+                raise ValueError(f"{path}:{lineno}: expected SITE:CARD: {line}") from None
+            sites.append(site)
+            cards.append(card)
+            if len(sites) >= batch:
+                yield np.array(sites, dtype=np.uint64), np.array(cards, dtype=np.uint64)
+                sites, cards = [], []
+    if sites:
+        yield np.array(sites, dtype=np.uint64), np.array(cards, dtype=np.uint64)
+
+
+# ─── Writers ───
+
+def _encode(batch, schema, dictionary, known=None):
+    """Dictionary-encode columns: a new dictionary per batch, or with `known`
+    one growing dictionary per column (new values appended, written as deltas)"""
+    if not dictionary:
+        return batch
+    columns = []
+    for i, name in enumerate(batch.schema.names):
+        column = batch.column(i)
+        if name in dictionary:
+            if known is None:
+                column = column.dictionary_encode()
+            else:
+                values = known.get(name)
+                new = pc.unique(column.drop_null())
+                if values is not None:
+                    new = new.filter(pc.invert(pc.is_in(new, value_set=values)))
+                    new = pa.concat_arrays([values, new])
+                known[name] = values = new
+                indices = pc.index_in(column, value_set=values, skip_nulls=True)
+                column = pa.DictionaryArray.from_arrays(indices.cast(pa.int32()), values)
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def write_batches(batches, schema, path, fmt=None, compression=None, dictionary=()):
+    """Stream record batches to an Arrow IPC file / stream or a Parquet file; returns rows
+
+    For Arrow, `dictionary` columns are dictionary-encoded: per batch in a
+    stream (it allows a new dictionary per batch), as one growing dictionary
+    written in deltas in a file (it allows no replacement). Parquet
+    dictionary encoding is limited to those columns (or disabled when empty).
+    A failed write leaves no output or temporary file behind.
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ('arrow', 'arrows', 'parquet'):
+        raise ValueError(f"{path}: unknown output format (use .arrow, .arrows or .parquet)")
+    dictionary = set(dictionary)
+    unknown = dictionary - set(schema.names)
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(sorted(unknown))}")
+    rows = 0
+    tmp = path + '.tmp'
+    try:
+        if fmt == 'parquet':
+            with pq.ParquetWriter(tmp, schema, compression=compression or 'snappy',
+                                  use_dictionary=sorted(dictionary) or False) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        else:
+            out_schema = pa.schema([
+                pa.field(f.name, pa.dictionary(pa.int32(), f.type))
+                if f.name in dictionary else f for f in schema], metadata=schema.metadata)
+            options = pa.ipc.IpcWriteOptions(compression=compression,
+                                             emit_dictionary_deltas=fmt == 'arrow')
+            known = {} if fmt == 'arrow' else None
+            new_writer = pa.ipc.new_file if fmt == 'arrow' else pa.ipc.new_stream
+            with pa.OSFile(tmp, 'wb') as sink, \
+                    new_writer(sink, out_schema, options=options) as writer:
+                for batch in batches:
+                    writer.write_batch(_encode(batch, out_schema, dictionary, known))
+                    rows += batch.num_rows
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    os.replace(tmp, path)
+    return rows
+
+
+def read_table(path):
+    """Read an export back (Arrow IPC file or stream, or Parquet)"""
+    if FORMATS.get(os.path.splitext(path)[1].lower()) == 'parquet':
+        return pq.read_table(path)
+    with pa.OSFile(path, 'rb') as source:
+        if source.read(len(ARROW_MAGIC)) == ARROW_MAGIC:
+            return pa.ipc.open_file(source).read_all()
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+
+# ─── CSV baseline ───
+
+def _csv_rows(kind, sites, cards):
+    compute = credential_codec.kantech_values if kind == 'kantech' else credential_codec.rbh_values
+    for site, card in zip(sites.tolist(), cards.tolist()):
+        values = compute(site, card)
+        yield ','.join(str(v) for v in values.values())
+
+
+def write_csv(kind, sources, path):
+    """Per-row hex-string CSV, as the calculators' value dicts render today"""
+    header = credential_codec.kantech_values(0, 0) if kind == 'kantech' \
+        else credential_codec.rbh_values(0, 0)
+    rows = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(header) + '\n')
+        for sites, cards in sources:
+            f.write('\n'.join(_csv_rows(kind, sites, cards)) + '\n')
+            rows += len(sites)
+    return rows
+
+
+def _bench(count):
+    import tempfile
+
+    rng = np.random.default_rng(3)
+    sites = rng.integers(0, 1 << 8, count, dtype=np.uint64)
+    card_max = {'kantech': 0xFFFF, 'rbh': 0xFFFFFFFF}
+    with tempfile.TemporaryDirectory() as root:
+        for kind, build, schema in (('kantech', kantech_batch, KANTECH_SCHEMA),
+                                    ('rbh', rbh_batch, RBH_SCHEMA)):
+            cards = rng.integers(0, card_max[kind] + 1, count, dtype=np.uint64)
+
+            def sources():
+                for i in range(0, count, BATCH_ROWS):
+                    yield sites[i:i + BATCH_ROWS], cards[i:i + BATCH_ROWS]
+
+            print(f"{kind}: {count:,} rows")
+            runs = [('csv (hex strings)', 'out.csv', None, None, ()),
+                    ('arrow', 'out.arrow', 'arrow', None, ()),
+                    ('arrow lz4, dict site', 'out_d.arrow', 'arrow', 'lz4', ('site',)),
+                    ('arrow stream, dict site', 'out_d.arrows', 'arrows', None, ('site',)),
+                    ('parquet snappy', 'out.parquet', 'parquet', 'snappy', ()),
+                    ('parquet zstd, dict site', 'out_z.parquet', 'parquet', 'zstd', ('site',))]
+            for label, name, fmt, compression, dictionary in runs:
+                path = os.path.join(root, name)
+                start = time.perf_counter()
+                if fmt is None:
+                    write_csv(kind, sources(), path)
+                else:
+                    write_batches((build(s, c) for s, c in sources()), schema, path, fmt,
+                                  compression, dictionary)
+                elapsed = time.perf_counter() - start
+                print(f"  {label:26} {os.path.getsize(path) / 1e6:8.1f} MB  {elapsed:7.2f}s  "
+                      f"{count / elapsed:>12,.0f} rows/s")
+            for name in ('out_z.parquet', 'out_d.arrow', 'out_d.arrows'):
+                table = read_table(os.path.join(root, name))
+                row = table.slice(count // 2, 1).to_pylist()[0]
+                expected = (credential_codec.kantech_values if kind == 'kantech'
+                            else credential_codec.rbh_values)(row['site'], row['card'])
+                if (row['full_be'].hex(' ').upper() != expected['full_be']
+                        or table.num_rows != count):
+                    raise SystemExit(f"{kind}: {name} read-back mismatch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arrow / Parquet export of batch results")
+    parser.add_argument('kind', nargs='?', choices=('kantech', 'rbh', 'diversify'))
+    parser.add_argument('input', nargs='?', help="SITE:CARD list, or fleet file for diversify")
+    parser.add_argument('-o', '--output', help="output file (.arrow, .arrows or .parquet)")
+    parser.add_argument('--format', choices=('arrow', 'arrows', 'parquet'),
+                        help="output format (default: from the extension)")
+    parser.add_argument('--compression', help="lz4 / zstd (arrow), snappy / zstd / gzip / none")
+    parser.add_argument('--dictionary', action='append', default=[], metavar='COLUMN',
+                        help="dictionary-encode a column (repeatable)")
+    parser.add_argument('--site', type=int, help="site code for a --cards range")
+    parser.add_argument('--cards', help="card range FIRST-LAST")
+    parser.add_argument('--master', help="master key hex (diversify)")
+    parser.add_argument('--type', default='AES', choices=list(desfire_keys.KEY_TYPES))
+    parser.add_argument('--version', type=int, help="key version (DES-family keys)")
+    parser.add_argument('--kdf', default='ecb', choices=KDFS)
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help="CSV vs Arrow / Parquet size and speed on N rows")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    if not args.kind or not args.output:
+        parser.error("kind and -o required")
+
+    start = time.perf_counter()
+    compression = None if args.compression == 'none' else args.compression
+    try:
+        if args.kind == 'diversify':
+            if not args.input or not args.master:
+                parser.error("diversify needs a fleet file and --master")
+            master = desfire_keys.parse_master(args.master, args.type)
+            schema = diversify_schema(args.type).with_metadata({
+                'key_type': args.type, 'kdf': args.kdf,
+                'master_kcv': desfire_keys.kcv(master, args.type).hex().upper()})
+            batches = (diversify_batch(master, uids, sites, args.type, args.version,
+                                       args.kdf, schema)
+                       for uids, sites in read_fleet(args.input, BATCH_ROWS))
+        else:
+            if args.input:
+                sources = read_credentials(args.input)
+            elif args.site is not None and args.cards:
+                first, _, last = args.cards.partition('-')
+                sources = credential_range(args.site, int(first), int(last or first))
+            else:
+                parser.error("SITE:CARD list or --site / --cards required")
+            build = kantech_batch if args.kind == 'kantech' else rbh_batch
+            schema = KANTECH_SCHEMA if args.kind == 'kantech' else RBH_SCHEMA
+            batches = (build(sites, cards) for sites, cards in sources)
+        rows = write_batches(batches, schema, args.output, args.format, compression,
+                             args.dictionary)
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"{rows} rows -> {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB) "
+          f"in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Credential Codec - Kobe's Keys Edition
+GUI-free Kantech / RBH encodings shared by the calculators and batch tools
+
+Kantech: [Site (16-bit)][Card (16-bit)]
+RBH 50-bit: [P1 (1-bit)][Site (16-bit)][Card (32-bit)][P2 (1-bit)]
+
+Requirements: none (standard library only)
+"""
+
+import struct
+
+from hex_format import bin_column, byte_pattern, hex_column
+
+KANTECH_SITE_MAX = 0xFFFF
+KANTECH_CARD_MAX = 0xFFFF
+RBH_SITE_MAX = 0xFFFF
+RBH_CARD_MAX = 0xFFFFFFFF
+
+
+def calculate_parity(bits, even=True):
+    """Calculate parity bit"""
+    count = bits.count('1')
+    if even:
+        return '0' if count % 2 == 0 else '1'
+    else:
+        return '1' if count % 2 == 0 else '0'
+
+
+def kantech_values(site_code, card_number):
+    """Compute all Kantech credential representations"""
+    results = {}
+
+    # Basic hex
+    results['site_hex'] = format(site_code, '04X')
+    results['card_hex'] = format(card_number, '04X')
+    results['card_hex_32'] = format(card_number, '08X')
+
+    # Binary
+    results['site_bin'] = format(site_code, '016b')
+    results['card_bin'] = format(card_number, '016b')
+
+    # Combined formats
+    results['combined_32'] = format((site_code << 16) | card_number, '08X')
+    results['combined_48'] = format((site_code << 32) | card_number, '012X')
+
+    # Byte patterns
+    results['site_be'] = byte_pattern(site_code, 2)
+    results['site_le'] = byte_pattern(site_code, 2, 'little')
+    results['card_be'] = byte_pattern(card_number, 2)
+    results['card_le'] = byte_pattern(card_number, 2, 'little')
+
+    # Full sequences
+    results['full_be'] = f"{results['site_be']} {results['card_be']}"
+    results['full_le'] = f"{results['card_le']} {results['site_le']}"
+
+    # Checksums
+    results['xor'] = format(site_code ^ card_number, '04X')
+    results['sum'] = format((site_code + card_number) & 0xFFFF, '04X')
+
+    return results
+
+
+def rbh_values(site_code, card_number):
+    """Compute all credential representations for RBH 50-bit"""
+    results = {}
+
+    # Basic values
+    results['site_dec'] = site_code
+    results['card_dec'] = card_number
+
+    # Hexadecimal
+    results['site_hex'] = format(site_code, '04X')
+    results['card_hex'] = format(card_number, '08X')
+
+    # Binary
+    results['site_bin'] = format(site_code, '016b')
+    results['card_bin'] = format(card_number, '032b')
+
+    # Build 50-bit credential
+    # Structure: [P1 (1-bit)] [Site (16-bit)] [Card (32-bit)] [P2 (1-bit)]
+
+    # First half for parity 1 (site code, first 16 bits)
+    site_bits = format(site_code, '016b')
+
+    # Second half for parity 2 (card number, 32 bits)
+    card_bits = format(card_number, '032b')
+
+    # Calculate parities (even parity is common)
+    # P1 covers first 24 bits (site + first 8 bits of card typically)
+    # P2 covers last 24 bits (last 24 bits of card typically)
+    # This varies by implementation - showing common patterns
+
+    p1_even = calculate_parity(site_bits, even=True)
+    p2_even = calculate_parity(card_bits, even=True)
+
+    # Full 50-bit binary (most common structure)
+    full_50bit = p1_even + site_bits + card_bits + p2_even
+    results['full_50bit_bin'] = full_50bit
+
+    # Convert to hex (50 bits = 13 hex chars, padded)
+    full_50bit_int = int(full_50bit, 2)
+    results['full_50bit_hex'] = format(full_50bit_int, '013X')
+    results['full_50bit_dec'] = str(full_50bit_int)
+
+    # Alternative: without parity (48-bit data only)
+    data_48bit = site_bits + card_bits
+    results['data_48bit_bin'] = data_48bit
+    results['data_48bit_hex'] = format(int(data_48bit, 2), '012X')
+
+    # Byte patterns for searching dumps
+    # Site code bytes
+    results['site_be'] = byte_pattern(site_code, 2)
+    results['site_le'] = byte_pattern(site_code, 2, 'little')
+
+    # Card number bytes (32-bit = 4 bytes)
+    results['card_be'] = byte_pattern(card_number, 4)
+    results['card_le'] = byte_pattern(card_number, 4, 'little')
+
+    # Full sequence (Site + Card)
+    results['full_be'] = results['site_be'] + " " + results['card_be']
+    results['full_le'] = results['card_le'] + " " + results['site_le']
+
+    # Wiegand-style output (what reader sends to controller)
+    # 50-bit Wiegand: typically the raw 50-bit value
+    results['wiegand_hex'] = results['full_50bit_hex']
+    results['wiegand_bin'] = results['full_50bit_bin']
+
+    # Checksums
+    results['xor'] = format(site_code ^ card_number, '08X')
+    results['sum'] = format((site_code + card_number) & 0xFFFFFFFF, '08X')
+
+    return results
+
+
+# ─── Integer / raw-byte forms for bulk tools ───
+# These mirror the string dicts above without the formatting cost.
+
+def kantech_bytes(site_code, card_number):
+    """Return (full_be, full_le) as raw bytes"""
+    return (struct.pack('>HH', site_code, card_number),
+            struct.pack('<HH', card_number, site_code))
+
+
+def kantech_combined_32(site_code, card_number):
+    return (site_code << 16) | card_number
+
+
+def kantech_combined_48(site_code, card_number):
+    return (site_code << 32) | card_number
+
+
+def rbh_bytes(site_code, card_number):
+    """Return (full_be, full_le) as raw bytes"""
+    return (struct.pack('>HI', site_code, card_number),
+            struct.pack('<IH', card_number, site_code))
+
+
+def rbh_50bit(site_code, card_number):
+    """Return the 50-bit credential (even parity on site / card) as an int"""
+    p1 = bin(site_code).count('1') & 1
+    p2 = bin(card_number).count('1') & 1
+    return (p1 << 49) | (site_code << 33) | (card_number << 1) | p2
+
+
+def rbh_decode_50bit(value):
+    """Split a 50-bit value into (site_code, card_number, p1, p2)"""
+    return ((value >> 33) & 0xFFFF, (value >> 1) & 0xFFFFFFFF,
+            (value >> 49) & 1, value & 1)
+
+
+# ─── Batch string forms ───
+# Column-wise versions of the dicts above for bulk output: each column is
+# packed with struct and rendered in one pass (hex_format), one list per key.
+
+def _join(sep, left, right):
+    return [f"{a}{sep}{b}" for a, b in zip(left, right)]
+
+
+def kantech_patterns(sites, cards):
+    """site / card / full byte patterns (BE and LE) for many Kantech credentials"""
+    site_be = hex_column('>H', sites, ' ')
+    site_le = hex_column('<H', sites, ' ')
+    card_be = hex_column('>H', cards, ' ')
+    card_le = hex_column('<H', cards, ' ')
+    return {'site_be': site_be, 'site_le': site_le, 'card_be': card_be, 'card_le': card_le,
+            'full_be': _join(' ', site_be, card_be), 'full_le': _join(' ', card_le, site_le)}
+
+
+def rbh_patterns(sites, cards):
+    """site / card / full byte patterns (BE and LE) for many RBH credentials"""
+    site_be = hex_column('>H', sites, ' ')
+    site_le = hex_column('<H', sites, ' ')
+    card_be = hex_column('>I', cards, ' ')
+    card_le = hex_column('<I', cards, ' ')
+    return {'site_be': site_be, 'site_le': site_le, 'card_be': card_be, 'card_le': card_le,
+            'full_be': _join(' ', site_be, card_be), 'full_le': _join(' ', card_le, site_le)}
+
+
+def kantech_columns(sites, cards):
+    """kantech_values() for many credentials, as one list per key"""
+    sites = list(sites)
+    cards = list(cards)
+    site_hex = hex_column('>H', sites)
+    card_hex = hex_column('>H', cards)
+    patterns = kantech_patterns(sites, cards)
+    return {
+        'site_hex': site_hex,
+        'card_hex': card_hex,
+        'card_hex_32': ['0000' + h for h in card_hex],
+        'site_bin': bin_column('>H', sites),
+        'card_bin': bin_column('>H', cards),
+        'combined_32': _join('', site_hex, card_hex),
+        'combined_48': _join('0000', site_hex, card_hex),
+        **patterns,
+        'xor': hex_column('>H', [s ^ c for s, c in zip(sites, cards)]),
+        'sum': hex_column('>H', [(s + c) & 0xFFFF for s, c in zip(sites, cards)]),
+    }
+
+
+def rbh_columns(sites, cards):
+    """rbh_values() for many credentials, as one list per key"""
+    sites = list(sites)
+    cards = list(cards)
+    site_hex = hex_column('>H', sites)
+    card_hex = hex_column('>I', cards)
+    site_bin = bin_column('>H', sites)
+    card_bin = bin_column('>I', cards)
+    # Even parity, as rbh_50bit()
+    p1 = [b.count('1') & 1 for b in site_bin]
+    p2 = [b.count('1') & 1 for b in card_bin]
+    values = [(a << 49) | (s << 33) | (c << 1) | b for a, s, c, b in zip(p1, sites, cards, p2)]
+    # 50 bits = the low 13 hex digits of a u64
+    full_hex = [h[3:] for h in hex_column('>Q', values)]
+    full_bin = [f"{a}{s}{c}{b}" for a, s, c, b in zip(p1, site_bin, card_bin, p2)]
+    patterns = rbh_patterns(sites, cards)
+    return {
+        'site_dec': sites,
+        'card_dec': cards,
+        'site_hex': site_hex,
+        'card_hex': card_hex,
+        'site_bin': site_bin,
+        'card_bin': card_bin,
+        'full_50bit_bin': full_bin,
+        'full_50bit_hex': full_hex,
+        'full_50bit_dec': list(map(str, values)),
+        'data_48bit_bin': _join('', site_bin, card_bin),
+        'data_48bit_hex': _join('', site_hex, card_hex),
+        **patterns,
+        'wiegand_hex': full_hex,
+        'wiegand_bin': full_bin,
+        'xor': hex_column('>I', [s ^ c for s, c in zip(sites, cards)]),
+        'sum': hex_column('>I', [(s + c) & 0xFFFFFFFF for s, c in zip(sites, cards)]),
+    }
\ No newline at end of file
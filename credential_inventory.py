@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Credential Inventory - Kobe's Keys Edition
+SQLite store of known Kantech / RBH credentials with byte-pattern indexes
+
+Answers "which known credential produces this byte sequence / 50-bit
+value / hex fragment?" with indexed exact and prefix lookups.
+
+Usage:
+    python credential_inventory.py inventory.db import kantech cards.txt --label "Site A"
+    python credential_inventory.py inventory.db find-bytes "1F 54 2C DD"
+    python credential_inventory.py inventory.db find-bytes "1F 54" --prefix
+    python credential_inventory.py inventory.db find-hex 1F40 --prefix
+    python credential_inventory.py inventory.db find-value 0x1F542CDD
+
+Import files hold one SITE:CARD (or SITE-CARD) per line, optionally
+followed by a comma and a label (cardholder, door, ...).
+
+Requirements: none (standard library only)
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+import credential_codec
+
+SYSTEMS = ('kantech', 'rbh')
+
+# Rows per executemany() call inside the import transaction
+BATCH_SIZE = 50_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    id          INTEGER PRIMARY KEY,
+    system      TEXT    NOT NULL,
+    site        INTEGER NOT NULL,
+    card        INTEGER NOT NULL,
+    label       TEXT,
+    full_be     BLOB    NOT NULL,
+    full_le     BLOB    NOT NULL,
+    combined_32 INTEGER,
+    combined_48 INTEGER NOT NULL,
+    full_50bit  INTEGER,
+    full_50bit_hex TEXT,
+    UNIQUE (system, site, card)
+);
+"""
+
+INDEXES = {
+    'idx_full_be': 'credentials (full_be)',
+    'idx_full_le': 'credentials (full_le)',
+    'idx_combined_32': 'credentials (combined_32)',
+    'idx_combined_48': 'credentials (combined_48)',
+    'idx_full_50bit': 'credentials (full_50bit)',
+    'idx_full_50bit_hex': 'credentials (full_50bit_hex)',
+}
+
+COLUMNS = ('system', 'site', 'card', 'label', 'full_be', 'full_le',
+           'combined_32', 'combined_48', 'full_50bit', 'full_50bit_hex')
+
+
+def kantech_row(site_code, card_number, label=None):
+    """Build an inventory row from the Kantech encodings"""
+    if not 0 <= site_code <= credential_codec.KANTECH_SITE_MAX:
+        raise ValueError("Site Code must be 0-65535 (16-bit)")
+    if not 0 <= card_number <= credential_codec.KANTECH_CARD_MAX:
+        raise ValueError("Card Number must be 0-65535 (16-bit)")
+    be, le = credential_codec.kantech_bytes(site_code, card_number)
+    return ('kantech', site_code, card_number, label, be, le,
+            credential_codec.kantech_combined_32(site_code, card_number),
+            credential_codec.kantech_combined_48(site_code, card_number),
+            None, None)
+
+
+def rbh_row(site_code, card_number, label=None):
+    """Build an inventory row from the RBH 50-bit encodings"""
+    if not 0 <= site_code <= credential_codec.RBH_SITE_MAX:
+        raise ValueError("Site Code must be 0-65535 (16-bit)")
+    if not 0 <= card_number <= credential_codec.RBH_CARD_MAX:
+        raise ValueError("Card Number must be 0-4294967295 (32-bit)")
+    be, le = credential_codec.rbh_bytes(site_code, card_number)
+    value = credential_codec.rbh_50bit(site_code, card_number)
+    return ('rbh', site_code, card_number, label, be, le,
+            None, (site_code << 32) | card_number,
+            value, format(value, '013X'))
+
+
+ROW_BUILDERS = {'kantech': kantech_row, 'rbh': rbh_row}
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest value greater than every string/bytes starting with prefix"""
+    if isinstance(prefix, str):
+        return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+    trimmed = bytes(prefix).rstrip(b'\xff')
+    if not trimmed:
+        return None
+    return trimmed[:-1] + bytes([trimmed[-1] + 1])
+
+
+def parse_pattern(text):
+    """Parse "1F 54 2C DD" / "1F542CDD" into bytes"""
+    return bytes.fromhex(text.replace(' ', '').replace(':', ''))
+
+
+class CredentialInventory:
+    """SQLite-backed inventory of credentials and their encodings"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.executescript(SCHEMA)
+        self.create_indexes()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def create_indexes(self):
+        for name, target in INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+        self.conn.commit()
+
+    def drop_indexes(self):
+        for name in INDEXES:
+            self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+        self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM credentials").fetchone()[0]
+
+    # ─── Import ───
+
+    def import_rows(self, rows):
+        """Insert prebuilt rows in batched transactions; returns rows added
+
+        Indexes are dropped while loading an empty table and rebuilt
+        once at the end, which is much faster than maintaining them.
+        """
+        rebuild = self.count() == 0
+        if rebuild:
+            self.drop_indexes()
+
+        sql = (f"INSERT OR IGNORE INTO credentials ({', '.join(COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(COLUMNS))})")
+        before = self.conn.total_changes
+        batch = []
+        try:
+            with self.conn:
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= BATCH_SIZE:
+                        self.conn.executemany(sql, batch)
+                        batch.clear()
+                if batch:
+                    self.conn.executemany(sql, batch)
+        finally:
+            if rebuild:
+                self.create_indexes()
+        return self.conn.total_changes - before
+
+    def import_credentials(self, system, credentials, label=None, errors=None):
+        """Import (site, card) or (site, card, label) tuples for one system
+
+        Out-of-range tuples go to `errors` when given (the rest still import);
+        otherwise the ValueError aborts the whole import.
+        """
+        build = ROW_BUILDERS[system]
+
+        def rows():
+            for item in credentials:
+                row_label = item[2] if len(item) > 2 and item[2] else label
+                try:
+                    row = build(item[0], item[1], row_label)
+                except ValueError:
+                    if errors is None:
+                        raise
+                    errors.append(item)
+                    continue
+                yield row
+
+        return self.import_rows(rows())
+
+    def import_file(self, system, path, label=None, errors=None):
+        """Import a SITE:CARD[,label] list; bad or out-of-range lines go to `errors`"""
+        build = ROW_BUILDERS[system]
+
+        def rows():
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for lineno, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    value, _, row_label = line.partition(',')
+                    for sep in (':', '-', ' '):
+                        if sep in value:
+                            site, _, card = value.partition(sep)
+                            break
+                    else:
+                        site = card = ''
+                    try:
+                        row = build(int(site), int(card), row_label.strip() or label)
+                    except ValueError:
+                        if errors is not None:
+                            errors.append((lineno, line))
+                        continue
+                    yield row
+
+        return self.import_rows(rows())
+
+    # ─── Queries ───
+
+    def _select(self, where, params):
+        cur = self.conn.execute(
+            f"SELECT system, site, card, label, full_50bit_hex FROM credentials WHERE {where}",
+            params)
+        return [dict(zip(('system', 'site', 'card', 'label', 'full_50bit_hex'), row))
+                for row in cur]
+
+    def _match(self, column, value, prefix):
+        if not prefix:
+            return self._select(f"{column} = ?", (value,))
+        upper = _prefix_upper_bound(value)
+        if upper is None:
+            return self._select(f"{column} >= ?", (value,))
+        return self._select(f"{column} >= ? AND {column} < ?", (value, upper))
+
+    def find_bytes(self, pattern, prefix=False):
+        """Credentials whose BE or LE full sequence equals / starts with pattern"""
+        pattern = bytes(pattern)
+        hits = []
+        for column, order in (('full_be', 'BE'), ('full_le', 'LE')):
+            for row in self._match(column, pattern, prefix):
+                row['match'] = order
+                hits.append(row)
+        return hits
+
+    def find_hex(self, fragment, prefix=False):
+        """RBH credentials whose 50-bit hex equals / starts with fragment"""
+        fragment = fragment.replace(' ', '').upper()
+        if not prefix:
+            fragment = fragment.zfill(13)
+        return self._match('full_50bit_hex', fragment, prefix)
+
+    def iter_encodings(self, system=None):
+        """Yield (system, site, card, label, combined_32, combined_48, full_50bit_hex)"""
+        query = ("SELECT system, site, card, label, combined_32, combined_48, full_50bit_hex "
+                 "FROM credentials")
+        if system is None:
+            yield from self.conn.execute(query)
+        else:
+            yield from self.conn.execute(query + " WHERE system = ?", (system,))
+
+    def find_value(self, value):
+        """Credentials whose 32-bit, 48-bit or 50-bit integer form equals value"""
+        hits = []
+        for column in ('combined_32', 'combined_48', 'full_50bit'):
+            for row in self._select(f"{column} = ?", (value,)):
+                row['match'] = column
+                hits.append(row)
+        return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kantech / RBH credential inventory")
+    parser.add_argument('database')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('import', help="bulk import a SITE:CARD list")
+    p.add_argument('system', choices=SYSTEMS)
+    p.add_argument('file')
+    p.add_argument('--label', help="label for rows without one")
+
+    p = sub.add_parser('find-bytes', help="search BE/LE byte sequences")
+    p.add_argument('pattern')
+    p.add_argument('--prefix', action='store_true')
+
+    p = sub.add_parser('find-hex', help="search RBH 50-bit hex")
+    p.add_argument('fragment')
+    p.add_argument('--prefix', action='store_true')
+
+    p = sub.add_parser('find-value', help="search 32/48/50-bit integer values")
+    p.add_argument('value', help="decimal or 0x-prefixed hex")
+
+    sub.add_parser('stats', help="row count")
+
+    args = parser.parse_args()
+    with CredentialInventory(args.database) as inv:
+        start = time.perf_counter()
+        if args.command == 'import':
+            errors = []
+            added = inv.import_file(args.system, args.file, args.label, errors)
+            elapsed = time.perf_counter() - start
+            print(f"Imported {added} rows in {elapsed:.2f}s ({len(errors)} bad lines)")
+            for lineno, line in errors[:20]:
+                print(f"  line {lineno}: {line}", file=sys.stderr)
+            return
+        if args.command == 'stats':
+            print(f"{inv.count()} credentials")
+            return
+        if args.command == 'find-bytes':
+            hits = inv.find_bytes(parse_pattern(args.pattern), args.prefix)
+        elif args.command == 'find-hex':
+            hits = inv.find_hex(args.fragment, args.prefix)
+        else:
+            hits = inv.find_value(int(args.value, 0))
+        elapsed = time.perf_counter() - start
+        for hit in hits:
+            label = f"  [{hit['label']}]" if hit['label'] else ""
+            match = f"  ({hit['match']})" if 'match' in hit else ""
+            print(f"{hit['system'].upper():8} {hit['site']}:{hit['card']}{match}{label}")
+        print(f"{len(hits)} match(es) in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Streaming Credential Parser - Kobe's Keys Edition
+Bulk SITE:CARD parsing for controller exports (millions of lines)
+
+Accepted line forms (mixed freely within one file):
+    4000:12345   4000-12345   4000 12345   4000,12345   4000;12345
+    1F542CDD / 0x1F542CDD       raw hex (Kantech 32-bit combined)
+    01F400095786C / 0FA0004ABC36  raw hex (RBH 50-bit / 48-bit data)
+Blank lines and lines starting with '#' are skipped.
+
+Each chunk is classified with one precompiled multi-line regex pass;
+per-line problems are collected as (line, reason, text) tuples instead
+of raising, and good rows land in compact integer arrays. Chunks of valid
+pairs and hex values (any mix) are converted column-wise with map() over
+int, without Python code per decimal row; only chunks with bad lines take
+a row-by-row path for their non-decimal lines.
+
+Usage:
+    python credential_parser.py rbh export.txt
+    python credential_parser.py kantech export.csv --csv 2 3 --header
+
+Requirements: none (standard library only)
+"""
+
+import argparse
+import re
+import sys
+import time
+from array import array
+from itertools import compress, repeat
+from operator import itemgetter, not_
+
+import credential_codec
+
+# Site code is 16-bit for both systems; card is 16-bit (Kantech) or 32-bit (RBH)
+CARD_MAX = {
+    'kantech': credential_codec.KANTECH_CARD_MAX,
+    'rbh': credential_codec.RBH_CARD_MAX,
+}
+SITE_MAX = 0xFFFF
+
+CHUNK_SIZE = 1 << 22
+
+# Clean decimal pair; used first because most exports are nothing else
+_PAIR = re.compile(r'^[ \t]*(\d+)[ \t]*[:\-,;\t ][ \t]*(\d+)[ \t]*\r?$', re.M)
+
+# One match per line: (site, value, other). A pair is site + decimal card in
+# value, a raw hex line has no site; the shared value group keeps the tuples
+# small. Pair values are hex-class here and checked as decimal on conversion.
+_LINE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:(\d+)[ \t]*[:\-,;\t ][ \t]*|(?:0[xX])?)([0-9A-Fa-f]+)'
+    r'|(.*?)'
+    r')[ \t]*\r?$',
+    re.M,
+)
+
+# Typecodes with the exact widths we need on this platform
+_U32 = 'I' if array('I').itemsize == 4 else 'L'
+
+# Hex digits -> (site shift, card shift); sites / cards are then masked
+_HEX_LAYOUTS = {
+    'kantech': {8: (16, 0)},
+    'rbh': {12: (32, 0), 13: (33, 1)},
+}
+# Head of a chunk tried against the clean-pair pattern before the whole chunk
+_SAMPLE = 4096
+
+
+class ParseResult:
+    """Parsed rows as parallel arrays plus per-line errors"""
+
+    __slots__ = ('sites', 'cards', 'errors', 'lines')
+
+    def __init__(self):
+        self.sites = array('H')
+        self.cards = array(_U32)
+        self.errors = []
+        self.lines = 0
+
+    def __len__(self):
+        return len(self.sites)
+
+    def extend(self, other):
+        self.sites.extend(other.sites)
+        self.cards.extend(other.cards)
+        self.errors.extend(other.errors)
+        self.lines += other.lines
+
+
+def _decode_hex(text, system):
+    """Raw hex value -> (site, card) or an error reason string"""
+    value = int(text, 16)
+    if system == 'kantech':
+        if len(text) != 8:
+            return "hex value must be 8 digits (32-bit combined)"
+        return value >> 16, value & 0xFFFF
+    if len(text) == 13 and value >> 50 == 0:
+        site, card, _, _ = credential_codec.rbh_decode_50bit(value)
+        return site, card
+    if len(text) == 12:
+        return value >> 32, value & 0xFFFFFFFF
+    return "hex value must be 12 (48-bit) or 13 (50-bit) digits"
+
+
+def parse_text(text, system='rbh', first_line=1):
+    """Parse a block of complete lines; returns a ParseResult"""
+    card_max = CARD_MAX[system]
+    result = ParseResult()
+
+    # Fast path: every line is a clean decimal pair. The array constructors
+    # double as the range check (OverflowError past 16 / 32 bits). A mixed
+    # chunk nearly always shows in its head and skips the whole-chunk try.
+    line_count = text.count('\n') + (not text.endswith('\n'))
+    head = text[:text.rfind('\n', 0, _SAMPLE) + 1]
+    pairs = None
+    if len(_PAIR.findall(head)) == head.count('\n'):
+        pairs = _PAIR.findall(text)
+    if pairs and len(pairs) == line_count:
+        try:
+            result.sites = array('H', map(int, map(itemgetter(0), pairs)))
+            result.cards = array(_U32, map(int, map(itemgetter(1), pairs)))
+        except OverflowError:
+            pass
+        else:
+            if card_max >= 0xFFFFFFFF or max(result.cards) <= card_max:
+                result.lines = line_count
+                return result
+            result = ParseResult()
+
+    matches = _LINE.findall(text)
+    if text.endswith('\n'):
+        # The empty "line" after the final newline is not a line
+        matches.pop()
+    result.lines = len(matches)
+
+    rows = _parse_columns(matches, system)
+    if rows is not None:
+        result.sites, result.cards = rows
+        return result
+
+    # Chunk with bad lines: decimal pairs column-wise, other rows one by one
+    decimal = list(map(bool, map(itemgetter(0), matches)))
+    if sum(decimal) * 2 < len(decimal):
+        return _parse_slow(matches, system, first_line)
+    pairs = list(compress(matches, decimal))
+    if not all(map(str.isdigit, map(itemgetter(1), pairs))):
+        return _parse_slow(matches, system, first_line)
+    sites = list(map(int, map(itemgetter(0), pairs)))
+    if sites and max(sites) > SITE_MAX:
+        return _parse_slow(matches, system, first_line)
+    cards = list(map(int, map(itemgetter(1), pairs)))
+    if cards and max(cards) > card_max:
+        return _parse_slow(matches, system, first_line)
+    others = list(compress(range(len(decimal)), map(not_, decimal)))
+
+    # Splice the other rows back in at their line positions
+    out_sites = []
+    out_cards = []
+    pos = 0
+    taken = 0
+    for i in others:
+        run = i - pos
+        out_sites.extend(sites[taken:taken + run])
+        out_cards.extend(cards[taken:taken + run])
+        taken += run
+        pos = i + 1
+        row = _parse_other(matches[i], system, card_max)
+        if row is None:
+            continue
+        if isinstance(row, str):
+            result.errors.append((first_line + i, row, _line_text(matches[i])))
+            continue
+        out_sites.append(row[0])
+        out_cards.append(row[1])
+    out_sites.extend(sites[taken:])
+    out_cards.extend(cards[taken:])
+    result.sites = array('H', out_sites)
+    result.cards = array(_U32, out_cards)
+    return result
+
+
+def _parse_columns(matches, system):
+    """(sites, cards) arrays for a chunk of only valid pairs, hex values, blank and
+    comment lines; None when any line needs the row path
+
+    Every value is converted in one map(int, values, bases) pass in line
+    order, so nothing has to be spliced; hex rows are then split in place.
+    """
+    site_col = list(map(itemgetter(0), matches))
+    value_col = list(map(itemgetter(1), matches))
+    if not all(value_col):
+        # Only blank and comment lines may lack a value
+        for _, _, other in compress(matches, map(not_, value_col)):
+            if other and not other.startswith('#'):
+                return None
+        keep = list(map(bool, value_col))
+        site_col = list(compress(site_col, keep))
+        value_col = list(compress(value_col, keep))
+    decimal = list(map(bool, site_col))
+    try:
+        # Base 10 for pairs (rejects hex digits in a card), 16 for hex rows
+        values = list(map(int, value_col, map((16, 10).__getitem__, decimal)))
+    except ValueError:
+        return None
+    # '' -> '0': hex rows get their site below
+    sites = list(map(int, map(str.zfill, site_col, repeat(1))))
+    card_max = CARD_MAX[system]
+    if not all(decimal):
+        layout = _HEX_LAYOUTS[system]
+        for i in compress(range(len(decimal)), map(not_, decimal)):
+            value = values[i]
+            shifts = layout.get(len(value_col[i]))
+            if shifts is None or value >> 50:
+                return None
+            sites[i] = (value >> shifts[0]) & SITE_MAX
+            values[i] = (value >> shifts[1]) & card_max
+    if sites and (max(sites) > SITE_MAX or max(values) > card_max):
+        return None
+    return array('H', sites), array(_U32, values)
+
+
+def _line_text(match):
+    site_s, value_s, other = match
+    return other or (f"{site_s}:{value_s}" if site_s else value_s)
+
+
+def _parse_other(match, system, card_max):
+    """Non-decimal row -> (site, card), error reason, or None to skip"""
+    site_s, value_s, other = match
+    if site_s:
+        if not value_s.isdigit():
+            return "unrecognised format"
+        site, card = int(site_s), int(value_s)
+    elif value_s:
+        row = _decode_hex(value_s, system)
+        if isinstance(row, str):
+            return row
+        site, card = row
+    elif not other or other.startswith('#'):
+        return None
+    else:
+        return "unrecognised format"
+    if site > SITE_MAX:
+        return "Site Code must be 0-65535 (16-bit)"
+    if card > card_max:
+        return f"Card Number must be 0-{card_max}"
+    return site, card
+
+
+def _parse_slow(matches, system, first_line):
+    """Row-by-row path for chunks with many non-decimal or invalid rows"""
+    card_max = CARD_MAX[system]
+    result = ParseResult()
+    result.lines = len(matches)
+    sites = result.sites
+    cards = result.cards
+    for i, match in enumerate(matches):
+        row = _parse_other(match, system, card_max)
+        if row is None:
+            continue
+        if isinstance(row, str):
+            result.errors.append((first_line + i, row, _line_text(match)))
+            continue
+        sites.append(row[0])
+        cards.append(row[1])
+    return result
+
+
+def iter_chunks(stream, system='rbh', chunk_size=CHUNK_SIZE):
+    """Yield a ParseResult per chunk of a text stream (bounded memory)"""
+    line_no = 1
+    tail = ''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        block = tail + block
+        cut = block.rfind('\n') + 1
+        if not cut:
+            tail = block
+            continue
+        tail = block[cut:]
+        chunk = parse_text(block[:cut], system, line_no)
+        line_no += chunk.lines
+        yield chunk
+    if tail:
+        yield parse_text(tail, system, line_no)
+
+
+def parse_stream(stream, system='rbh', chunk_size=CHUNK_SIZE):
+    """Parse a whole text stream into one ParseResult"""
+    result = ParseResult()
+    for chunk in iter_chunks(stream, system, chunk_size):
+        result.extend(chunk)
+    return result
+
+
+def parse_file(path, system='rbh'):
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        return parse_stream(f, system)
+
+
+def parse_csv(stream, site_col, card_col, system='rbh', delimiter=',', header=False):
+    """Parse site/card from CSV columns (0-based indexes)"""
+    card_max = CARD_MAX[system]
+    result = ParseResult()
+    sites = result.sites
+    cards = result.cards
+    need = max(site_col, card_col) + 1
+    for line_no, line in enumerate(stream, 1):
+        result.lines += 1
+        if header and line_no == 1:
+            continue
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        cols = line.split(delimiter)
+        if len(cols) < need:
+            result.errors.append((line_no, "missing columns", line))
+            continue
+        site_s = cols[site_col].strip().strip('"')
+        card_s = cols[card_col].strip().strip('"')
+        if not (site_s.isdigit() and card_s.isdigit()):
+            result.errors.append((line_no, "non-numeric site/card", line))
+            continue
+        site, card = int(site_s), int(card_s)
+        if site > SITE_MAX:
+            result.errors.append((line_no, "Site Code must be 0-65535 (16-bit)", line))
+        elif card > card_max:
+            result.errors.append((line_no, f"Card Number must be 0-{card_max}", line))
+        else:
+            sites.append(site)
+            cards.append(card)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk Kantech / RBH credential parser")
+    parser.add_argument('system', choices=sorted(CARD_MAX))
+    parser.add_argument('file')
+    parser.add_argument('--csv', nargs=2, type=int, metavar=('SITE_COL', 'CARD_COL'),
+                        help="read site/card from 1-based CSV columns")
+    parser.add_argument('--delimiter', default=',')
+    parser.add_argument('--header', action='store_true', help="skip the first CSV line")
+    parser.add_argument('--errors', type=int, default=20, help="errors to print")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.csv:
+        with open(args.file, encoding='utf-8', errors='replace') as f:
+            result = parse_csv(f, args.csv[0] - 1, args.csv[1] - 1, args.system,
+                               args.delimiter, args.header)
+    else:
+        result = parse_file(args.file, args.system)
+    elapsed = time.perf_counter() - start
+
+    rate = result.lines / elapsed if elapsed else 0
+    print(f"{result.lines} lines, {len(result)} credentials, {len(result.errors)} errors "
+          f"in {elapsed:.3f}s ({rate:,.0f} lines/s)")
+    for line_no, reason, text in result.errors[:args.errors]:
+        print(f"  line {line_no}: {reason}: {text}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,15 @@
 DESFire Key Diversification Calculator - CyberNinja Edition
 Kobe's Keys - RFID Research Tool
 
-Requirements: pip install customtkinter pyperclip pycryptodome
+Requirements: pip install customtkinter pyperclip pycryptodome (or cryptography)
 """
 
 import customtkinter as ctk
 from tkinter import messagebox
 import pyperclip
-from Crypto.Cipher import AES
-from binascii import unhexlify, hexlify
+
+import desfire_keys
+import perf_trace
 
 # CyberNinja Color Scheme (matching your Kantech tool)
 COLORS = {
@@ -42,6 +43,7 @@ class DesfireDiversifier(ctk.CTk):
         self.create_input_section()
         self.create_results_section()
         self.create_footer()
+        perf_trace.install_toggle(self, "DESFIRE")
         
     def create_header(self):
         header_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_medium'], corner_radius=0)
@@ -86,11 +88,62 @@ class DesfireDiversifier(ctk.CTk):
         container = ctk.CTkFrame(input_frame, fg_color="transparent")
         container.pack(fill="x", padx=20, pady=10)
         
+        # Key Type + Key Version
+        type_frame = ctk.CTkFrame(container, fg_color="transparent")
+        type_frame.pack(fill="x", pady=8)
+        
+        type_label = ctk.CTkLabel(
+            type_frame,
+            text="KEY TYPE:",
+            font=("Consolas", 14),
+            text_color=COLORS['text_secondary'],
+            width=220,
+            anchor="w"
+        )
+        type_label.pack(side="left", padx=(0, 10))
+        
+        self.key_type_var = ctk.StringVar(value="AES")
+        self.key_type_menu = ctk.CTkOptionMenu(
+            type_frame,
+            values=list(desfire_keys.KEY_TYPES),
+            variable=self.key_type_var,
+            font=("Consolas", 14),
+            fg_color=COLORS['bg_dark'],
+            button_color=COLORS['accent_cyan'],
+            button_hover_color=COLORS['accent_magenta'],
+            text_color=COLORS['text_primary'],
+            width=140,
+            height=40,
+            command=self.on_key_type
+        )
+        self.key_type_menu.pack(side="left")
+        
+        version_label = ctk.CTkLabel(
+            type_frame,
+            text="KEY VER (hex):",
+            font=("Consolas", 14),
+            text_color=COLORS['text_secondary']
+        )
+        version_label.pack(side="left", padx=(20, 10))
+        
+        self.version_entry = ctk.CTkEntry(
+            type_frame,
+            font=("Consolas", 16),
+            fg_color=COLORS['bg_dark'],
+            border_color=COLORS['accent_yellow'],
+            text_color=COLORS['text_primary'],
+            placeholder_text="DES only",
+            width=110,
+            height=40,
+            state="disabled"
+        )
+        self.version_entry.pack(side="left")
+        
         # Master Key Input
         master_frame = ctk.CTkFrame(container, fg_color="transparent")
         master_frame.pack(fill="x", pady=8)
         
-        master_label = ctk.CTkLabel(
+        self.master_label = ctk.CTkLabel(
             master_frame,
             text="MASTER KEY (32 hex chars):",
             font=("Consolas", 14),
@@ -98,7 +151,7 @@ class DesfireDiversifier(ctk.CTk):
             width=220,
             anchor="w"
         )
-        master_label.pack(side="left", padx=(0, 10))
+        self.master_label.pack(side="left", padx=(0, 10))
         
         self.master_entry = ctk.CTkEntry(
             master_frame,
@@ -170,6 +223,11 @@ class DesfireDiversifier(ctk.CTk):
         )
         self.clear_button.pack(side="left", padx=15)
         
+    def on_key_type(self, key_type):
+        length = desfire_keys.KEY_TYPES[key_type]
+        self.master_label.configure(text=f"MASTER KEY ({length * 2} hex chars):")
+        self.version_entry.configure(state="disabled" if key_type == "AES" else "normal")
+        
     def create_results_section(self):
         self.results_frame = ctk.CTkFrame(self, fg_color=COLORS['bg_light'], corner_radius=10)
         self.results_frame.pack(fill="both", expand=True, padx=20, pady=10)
@@ -212,58 +270,68 @@ class DesfireDiversifier(ctk.CTk):
     def calculate(self):
         master_hex = self.master_entry.get().strip().replace(" ", "").upper()
         uid_hex = self.uid_entry.get().strip().replace(" ", "").upper()
+        version_hex = self.version_entry.get().strip()
+        key_type = self.key_type_var.get()
         
         try:
-            if len(master_hex) != 32:
-                raise ValueError("Master key must be 32 hex characters (16 bytes AES)")
-            if not uid_hex:
-                raise ValueError("UID cannot be empty")
+            with perf_trace.stage("desfire.parse"):
+                length = desfire_keys.KEY_TYPES[key_type]
+                if len(master_hex) != length * 2:
+                    raise ValueError(f"Master key must be {length * 2} hex characters "
+                                     f"({length} bytes {key_type})")
+                if not uid_hex:
+                    raise ValueError("UID cannot be empty")
+                key_version = None
+                if version_hex and key_type != "AES":
+                    key_version = int(version_hex, 16)
+                    if not 0 <= key_version <= 0xFF:
+                        raise ValueError("Key version must be 00-FF")
                 
-            derived_key = self.diversify_key(master_hex, uid_hex)
+            derived_key = self.diversify_key(master_hex, uid_hex, key_type, key_version)
             self.results = {
                 "master": master_hex,
                 "uid": uid_hex,
-                "derived": derived_key
+                "key_type": key_type,
+                "derived": derived_key,
+                "version": desfire_keys.get_key_version(bytes.fromhex(derived_key)),
+                "master_kcv": desfire_keys.kcv(bytes.fromhex(master_hex), key_type).hex().upper(),
+                "derived_kcv": desfire_keys.kcv(bytes.fromhex(derived_key), key_type).hex().upper()
             }
             self.display_results()
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
             
-    def diversify_key(self, master_hex: str, uid_hex: str) -> str:
-        """Simple AES-ECB diversification: K_card = AES_ECB(K_master, UID || 00...)"""
-        uid_bytes = unhexlify(uid_hex)
-        if len(uid_bytes) > 16:
-            raise ValueError("UID too long (>16 bytes)")
-            
-        # Pad UID with zeros to 16 bytes
-        data = uid_bytes + b'\x00' * (16 - len(uid_bytes))
-        
-        master_key = unhexlify(master_hex)
-        cipher = AES.new(master_key, AES.MODE_ECB)
-        derived = cipher.encrypt(data)
-        
-        return hexlify(derived).decode().upper()
+    @perf_trace.timed("desfire.compute")
+    def diversify_key(self, master_hex: str, uid_hex: str, key_type: str = "AES",
+                      key_version: int = None) -> str:
+        """K_card = E_CBC(K_master, IV 00.., UID || 00...)"""
+        return desfire_keys.diversify_key(master_hex, uid_hex, key_type, key_version)
         
+    @perf_trace.timed("desfire.render")
     def display_results(self):
         for widget in self.results_scroll.winfo_children():
             widget.destroy()
             
         r = self.results
+        key_type = r['key_type']
+        derived_items = [(f"{key_type} Key ({len(r['derived'])} hex)", r['derived']),
+                         ("KCV", r['derived_kcv'])]
+        if key_type != "AES":
+            derived_items.append(("Key Version (parity bits)", f"{r['version']:02X}"))
+        change_cmd, auth_cmd = self.pm3_commands()
         
         sections = [
             ("INPUT", [
+                ("Key Type", key_type),
                 ("Master Key", r['master']),
+                ("Master KCV", r['master_kcv']),
                 ("Card UID", r['uid'])
             ]),
-            ("DERIVED CARD KEY", [
-                ("AES Key (32 hex)", r['derived'])
-            ]),
+            ("DERIVED CARD KEY", derived_items),
             ("PROXMARK3 COMMAND READY", [
-                ("Change Master Key (example)", 
-                 f"hf mfdes changekey --aid 010203 --keyno 0 --oldkey 00000000000000000000000000000000 --newkey {r['derived']}"),
-                ("Auth with derived key (example)", 
-                 f"hf mfdes auth --aid 010203 -n 0 -t aes -k {r['derived']}")
+                ("Change Master Key (example)", change_cmd),
+                ("Auth with derived key (example)", auth_cmd)
             ])
         ]
         
@@ -329,31 +397,48 @@ class DesfireDiversifier(ctk.CTk):
                 text_color=COLORS['accent_cyan'],
                 width=30,
                 height=25,
-                command=lambda v=value: pyperclip.copy(v)
+                command=lambda v=value: self.copy_value(v)
             )
             copy_btn.pack(side="right", padx=5)
             
+    def pm3_commands(self):
+        r = self.results
+        pm3_type = desfire_keys.PM3_KEY_TYPES[r['key_type']]
+        old_key = "00" * desfire_keys.KEY_TYPES[r['key_type']]
+        return (
+            f"hf mfdes changekey --aid 010203 --keyno 0 -t {pm3_type} --oldkey {old_key} --newkey {r['derived']}",
+            f"hf mfdes auth --aid 010203 -n 0 -t {pm3_type} -k {r['derived']}"
+        )
+        
+    def copy_value(self, value):
+        with perf_trace.stage("desfire.clipboard"):
+            pyperclip.copy(value)
+            
     def copy_all(self):
         r = self.results
+        change_cmd, auth_cmd = self.pm3_commands()
         text = f"""DESFIRE DERIVED KEY - CyberNinja Tool
 {'='*60}
-Master Key : {r['master']}
+Key Type   : {r['key_type']}
+Master Key : {r['master']}  (KCV {r['master_kcv']})
 Card UID   : {r['uid']}
-Derived Key: {r['derived']}
+Derived Key: {r['derived']}  (KCV {r['derived_kcv']})
 
 Proxmark3 Commands:
-hf mfdes changekey --aid 010203 --keyno 0 --oldkey 00000000000000000000000000000000 --newkey {r['derived']}
-hf mfdes auth --aid 010203 -n 0 -t aes -k {r['derived']}
+{change_cmd}
+{auth_cmd}
 
 {'='*60}
 Generated by Kobe's Keys - Mamba Mentality
 """
-        pyperclip.copy(text)
+        with perf_trace.stage("desfire.clipboard"):
+            pyperclip.copy(text)
         messagebox.showinfo("Copied!", "Derived key + PM3 commands copied to clipboard!")
         
     def clear_all(self):
         self.master_entry.delete(0, 'end')
         self.uid_entry.delete(0, 'end')
+        self.version_entry.delete(0, 'end')
         
         for widget in self.results_scroll.winfo_children():
             widget.destroy()
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+DESFire Card Emulator - CyberNinja Edition
+Software EV1/EV2 AES cards and a reader harness for pipeline throughput tests
+
+Simulated cards answer native DESFire frames (command byte + data ->
+status byte + data):
+
+    5A SelectApplication    AA AuthenticateEV1 (AES)    71 AuthenticateEV2First
+    AF AdditionalFrame      C4 ChangeKey                BD ReadData
+    6F GetFileIDs
+
+Files are read in plain, MAC or full (enciphered) communication mode. The
+reader side is written as generators that yield command frames and receive
+responses, so the same code runs synchronously or as asyncio tasks.
+
+The harness provisions cards with the default all-zero key and runs the flow
+the diversifier's PM3 commands describe, for every card:
+
+    select AID -> authenticate (old key) -> ChangeKey to the diversified key
+    -> authenticate (new key) -> ReadData
+
+Cards run as asyncio tasks (--concurrency at a time, optional --rf-delay per
+frame) in --jobs worker processes. Authentications/s and latency percentiles
+are reported. Everything is local; no reader is touched.
+
+Usage:
+    python desfire_emulator.py --cards 5000 --master <hex> [--ev2] [--comm full]
+    python desfire_emulator.py --cards 20000 --concurrency 1000 --rf-delay 2 --jobs 4
+
+Requirements: pip install pycryptodome (or cryptography)
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import desfire_keys
+from desfire_session import (BLOCK, CMD_ADDITIONAL_FRAME, CMD_AUTH_EV1, CMD_AUTH_EV2_FIRST,
+                             ZERO_IV, AesKey, Ev1Session, Ev2Session, crc32,
+                             ev2_session_keys, random_block, rotl, strip_crc, xor, zero_pad)
+
+PICC_AID = b'\x00\x00\x00'
+COMM_MODES = ('plain', 'mac', 'full')
+
+CMD_SELECT = 0x5A
+CMD_CHANGE_KEY = 0xC4
+CMD_READ_DATA = 0xBD
+CMD_GET_FILE_IDS = 0x6F
+
+OK = 0x00
+ADDITIONAL_FRAME = 0xAF
+STATUS_NAMES = {
+    0x00: 'OK',
+    0x1C: 'ILLEGAL_COMMAND',
+    0x1E: 'INTEGRITY_ERROR',
+    0x40: 'NO_SUCH_KEY',
+    0x7E: 'LENGTH_ERROR',
+    0x9D: 'PERMISSION_DENIED',
+    0x9E: 'PARAMETER_ERROR',
+    0xA0: 'APPLICATION_NOT_FOUND',
+    0xAE: 'AUTHENTICATION_ERROR',
+    0xAF: 'ADDITIONAL_FRAME',
+    0xBE: 'BOUNDARY_ERROR',
+    0xF0: 'FILE_NOT_FOUND',
+}
+_STATUS = {name: code for code, name in STATUS_NAMES.items()}
+
+
+class DesfireError(Exception):
+    """A card answered with an error status (or a response failed to verify)"""
+
+    def __init__(self, status, where):
+        self.status = status
+        super().__init__(f"{where}: {STATUS_NAMES.get(status, f'status {status:02X}')}")
+
+
+# ─── Card ───
+
+class Application:
+    """AES keys and files (number -> (comm mode, bytes)) of one application"""
+
+    def __init__(self, keys, files=None):
+        self.keys = [bytes(k) for k in keys]
+        self.versions = [0] * len(self.keys)
+        self.files = dict(files or {})
+
+
+def _status(name, data=b''):
+    return bytes([_STATUS[name]]) + data
+
+
+class SimulatedCard:
+    """One DESFire card: applications, the selected one and the open session"""
+
+    def __init__(self, uid, applications=None):
+        self.uid = bytes(uid)
+        self.apps = {PICC_AID: Application([bytes(BLOCK)])}
+        self.apps.update(applications or {})
+        self._app = self.apps[PICC_AID]
+        self._key_no = None
+        self._session = None
+        self._pending = None
+
+    def _reset_auth(self):
+        self._key_no = None
+        self._session = None
+
+    def transceive(self, frame: bytes) -> bytes:
+        cmd, data = frame[0], frame[1:]
+        pending, self._pending = self._pending, None
+        if cmd == CMD_ADDITIONAL_FRAME:
+            return pending(data) if pending else _status('ILLEGAL_COMMAND')
+        handler = self._HANDLERS.get(cmd)
+        if handler is None:
+            self._reset_auth()
+            return _status('ILLEGAL_COMMAND')
+        return handler(self, frame, data)
+
+    def _select(self, frame, data):
+        if len(data) != 3:
+            return _status('LENGTH_ERROR')
+        app = self.apps.get(data[::-1])
+        if app is None:
+            return _status('APPLICATION_NOT_FOUND')
+        self._app = app
+        self._reset_auth()
+        return _status('OK')
+
+    def _authenticate(self, frame, data):
+        ev2 = frame[0] == CMD_AUTH_EV2_FIRST
+        self._reset_auth()
+        if not data:
+            return _status('LENGTH_ERROR')
+        key_no = data[0]
+        if key_no >= len(self._app.keys):
+            return _status('NO_SUCH_KEY')
+        key = AesKey(self._app.keys[key_no])
+        rnd_b = random_block()
+        enc_rnd_b = key.cbc_encrypt(rnd_b)
+
+        def finish(msg):
+            if len(msg) != 2 * BLOCK:
+                return _status('LENGTH_ERROR')
+            plain = key.cbc_decrypt(msg, ZERO_IV if ev2 else enc_rnd_b)
+            if plain[BLOCK:] != rotl(rnd_b):
+                return _status('AUTHENTICATION_ERROR')
+            rnd_a = plain[:BLOCK]
+            self._key_no = key_no
+            if ev2:
+                ti = os.urandom(4)
+                self._session = Ev2Session(*ev2_session_keys(key, rnd_a, rnd_b), ti)
+                return _status('OK', key.cbc_encrypt(ti + rotl(rnd_a) + bytes(12)))
+            self._session = Ev1Session(rnd_a, rnd_b)
+            return _status('OK', key.cbc_encrypt(rotl(rnd_a), msg[-BLOCK:]))
+
+        self._pending = finish
+        return _status('ADDITIONAL_FRAME', enc_rnd_b)
+
+    def _change_key(self, frame, data):
+        session = self._session
+        if session is None:
+            return _status('PERMISSION_DENIED')
+        key_no, crypt = data[0], data[1:]
+        if key_no >= len(self._app.keys):
+            return _status('NO_SUCH_KEY')
+        same = key_no == self._key_no
+        if not same and self._key_no != 0:
+            return _status('PERMISSION_DENIED')
+        header = frame[:2]
+        if session.ev2:
+            enc, mac = crypt[:-8], crypt[-8:]
+            if mac != session.command_mac(CMD_CHANGE_KEY, header[1:], enc):
+                return _status('INTEGRITY_ERROR')
+            try:
+                plain = session.decrypt_command(enc)
+            except ValueError:
+                return _status('INTEGRITY_ERROR')
+            new_crc = plain[17:21]
+        else:
+            if len(crypt) != 2 * BLOCK:
+                return _status('LENGTH_ERROR')
+            plain = session.decrypt(crypt)
+            if plain[17:21] != crc32(header + plain[:17]):
+                return _status('INTEGRITY_ERROR')
+            new_crc = plain[21:25]
+        body, version = plain[:BLOCK], plain[BLOCK]
+        new_key = body if same else xor(body, self._app.keys[key_no])
+        if not same and new_crc != crc32(new_key):
+            return _status('INTEGRITY_ERROR')
+        self._app.keys[key_no] = new_key
+        self._app.versions[key_no] = version
+        if same:
+            # Changing the authenticated key ends the session
+            self._reset_auth()
+            return _status('OK')
+        if session.ev2:
+            session.step()
+            return _status('OK', session.response_mac(OK))
+        return _status('OK', session.mac(b'\x00'))
+
+    def _read_data(self, frame, data):
+        if len(data) < 7:
+            return _status('LENGTH_ERROR')
+        entry = self._app.files.get(data[0])
+        if entry is None:
+            return _status('FILE_NOT_FOUND')
+        comm, content = entry
+        session = self._session
+        if comm != 'plain' and session is None:
+            return _status('PERMISSION_DENIED')
+        offset = int.from_bytes(data[1:4], 'little')
+        length = int.from_bytes(data[4:7], 'little') or max(0, len(content) - offset)
+        if offset + length > len(content):
+            return _status('BOUNDARY_ERROR')
+        chunk = bytes(content[offset:offset + length])
+        if session is None:
+            return _status('OK', chunk)
+        if session.ev2:
+            if comm != 'plain' and data[7:15] != session.command_mac(CMD_READ_DATA, data[:7]):
+                return _status('INTEGRITY_ERROR')
+            session.step()
+            if comm == 'plain':
+                return _status('OK', chunk)
+            if comm == 'full':
+                chunk = session.encrypt_response(chunk)
+            return _status('OK', chunk + session.response_mac(OK, chunk))
+        session.mac(frame[:8])
+        if comm == 'full':
+            return _status('OK', session.encrypt(zero_pad(chunk + crc32(chunk + b'\x00'))))
+        mac = session.mac(chunk + b'\x00')
+        return _status('OK', chunk + mac if comm == 'mac' else chunk)
+
+    def _get_file_ids(self, frame, data):
+        ids = bytes(sorted(self._app.files))
+        session = self._session
+        if session is None:
+            return _status('OK', ids)
+        if session.ev2:
+            session.step()
+            return _status('OK', ids + session.response_mac(OK, ids))
+        session.mac(frame)
+        return _status('OK', ids + session.mac(ids + b'\x00'))
+
+    _HANDLERS = {
+        CMD_SELECT: _select,
+        CMD_AUTH_EV1: _authenticate,
+        CMD_AUTH_EV2_FIRST: _authenticate,
+        CMD_CHANGE_KEY: _change_key,
+        CMD_READ_DATA: _read_data,
+        CMD_GET_FILE_IDS: _get_file_ids,
+    }
+
+
+# ─── Reader operations (generators: yield frame, receive response) ───
+
+def _data(response, where, expect=OK):
+    if not response or response[0] != expect:
+        raise DesfireError(response[0] if response else 0x7E, where)
+    return response[1:]
+
+
+def _verify(expected, got, where):
+    if expected != got:
+        raise DesfireError(_STATUS['INTEGRITY_ERROR'], where)
+
+
+def select(aid: bytes):
+    _data((yield bytes([CMD_SELECT]) + aid[::-1]), 'select')
+
+
+def authenticate(key, key_no=0, ev2=False):
+    """Three-pass AES authentication; returns the session"""
+    key = key if isinstance(key, AesKey) else AesKey(key)
+    first = bytes([CMD_AUTH_EV2_FIRST, key_no, 0]) if ev2 else bytes([CMD_AUTH_EV1, key_no])
+    enc_rnd_b = _data((yield first), 'authenticate', ADDITIONAL_FRAME)
+    rnd_b = key.cbc_decrypt(enc_rnd_b)
+    rnd_a = random_block()
+    msg = key.cbc_encrypt(rnd_a + rotl(rnd_b), ZERO_IV if ev2 else enc_rnd_b)
+    answer = _data((yield bytes([CMD_ADDITIONAL_FRAME]) + msg), 'authenticate')
+    plain = key.cbc_decrypt(answer, ZERO_IV if ev2 else msg[-BLOCK:])
+    ti, rnd_a_rot = (plain[:4], plain[4:20]) if ev2 else (None, plain[:BLOCK])
+    if rnd_a_rot != rotl(rnd_a):
+        raise DesfireError(_STATUS['AUTHENTICATION_ERROR'], 'authenticate')
+    if ev2:
+        return Ev2Session(*ev2_session_keys(key, rnd_a, rnd_b), ti)
+    return Ev1Session(rnd_a, rnd_b)
+
+
+def change_key(session, key_no, new_key, version=0, old_key=None):
+    """ChangeKey; old_key=None changes the key the session authenticated with"""
+    header = bytes([CMD_CHANGE_KEY, key_no])
+    same = old_key is None
+    body = new_key if same else xor(new_key, old_key)
+    if session.ev2:
+        plain = body + bytes([version]) + (b'' if same else crc32(new_key))
+        enc = session.encrypt_command(plain)
+        response = yield header + enc + session.command_mac(CMD_CHANGE_KEY, header[1:], enc)
+        data = _data(response, 'change key')
+        if not same:
+            session.step()
+            _verify(session.response_mac(OK), data, 'change key')
+        return
+    plain = body + bytes([version])
+    plain += crc32(header + plain) + (b'' if same else crc32(new_key))
+    data = _data((yield header + session.encrypt(zero_pad(plain))), 'change key')
+    if not same:
+        _verify(session.mac(b'\x00'), data, 'change key')
+
+
+def read_data(session, file_no, offset=0, length=0, comm='plain'):
+    """ReadData in the file's communication mode; returns the plain content"""
+    header = bytes([file_no]) + offset.to_bytes(3, 'little') + length.to_bytes(3, 'little')
+    frame = bytes([CMD_READ_DATA]) + header
+    if session is None:
+        return _data((yield frame), 'read')
+    if session.ev2:
+        if comm != 'plain':
+            frame += session.command_mac(CMD_READ_DATA, header)
+        data = _data((yield frame), 'read')
+        session.step()
+        if comm == 'plain':
+            return data
+        body, mac = data[:-8], data[-8:]
+        _verify(session.response_mac(OK, body), mac, 'read')
+        return session.decrypt_response(body) if comm == 'full' else body
+    session.mac(frame)
+    data = _data((yield frame), 'read')
+    if comm == 'full':
+        return strip_crc(session.decrypt(data), b'\x00', length=length)
+    if comm == 'mac':
+        data, mac = data[:-8], data[-8:]
+        _verify(session.mac(data + b'\x00'), mac, 'read')
+    else:
+        session.mac(data + b'\x00')
+    return data
+
+
+def get_file_ids(session=None):
+    frame = bytes([CMD_GET_FILE_IDS])
+    if session is not None and not session.ev2:
+        session.mac(frame)
+    data = _data((yield frame), 'file ids')
+    if session is None:
+        return data
+    ids, mac = data[:-8], data[-8:]
+    if session.ev2:
+        session.step()
+        _verify(session.response_mac(OK, ids), mac, 'file ids')
+    else:
+        _verify(session.mac(ids + b'\x00'), mac, 'file ids')
+    return ids
+
+
+def run(op, transceive):
+    """Drive a reader operation against a transport synchronously"""
+    try:
+        frame = next(op)
+        while True:
+            frame = op.send(transceive(frame))
+    except StopIteration as done:
+        return done.value
+
+
+async def run_async(op, transceive, delay=0.0):
+    """Drive a reader operation, yielding to the event loop after every frame"""
+    try:
+        frame = next(op)
+        while True:
+            response = transceive(frame)
+            await asyncio.sleep(delay)
+            frame = op.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+# ─── Harness ───
+
+# File number used for each communication mode on provisioned cards
+FILE_NUMBERS = {'plain': 1, 'mac': 2, 'full': 3}
+FILE_SIZE = 32
+
+
+def provision(uid, aid, key=bytes(BLOCK)):
+    """A card with one application (key 0 = `key`) and a 32-byte file per comm mode"""
+    files = {no: (comm, os.urandom(FILE_SIZE)) for comm, no in FILE_NUMBERS.items()}
+    return SimulatedCard(uid, {aid: Application([key], files)})
+
+
+async def _card_flow(card, aid, new_key, ev2, comm, delay, auth_ns, flow_ns):
+    io = card.transceive
+    start = time.perf_counter_ns()
+    await run_async(select(aid), io, delay)
+    t = time.perf_counter_ns()
+    session = await run_async(authenticate(card.apps[aid].keys[0], 0, ev2), io, delay)
+    auth_ns.append(time.perf_counter_ns() - t)
+    await run_async(change_key(session, 0, new_key), io, delay)
+    t = time.perf_counter_ns()
+    session = await run_async(authenticate(new_key, 0, ev2), io, delay)
+    auth_ns.append(time.perf_counter_ns() - t)
+    data = await run_async(read_data(session, FILE_NUMBERS[comm], 0, FILE_SIZE, comm), io,
+                          delay)
+    flow_ns.append(time.perf_counter_ns() - start)
+    return data == card.apps[aid].files[FILE_NUMBERS[comm]][1] and card.apps[aid].keys[0] == new_key
+
+
+async def _run_cards(uids, keys, aid, ev2, comm, concurrency, delay):
+    auth_ns, flow_ns = [], []
+    failures = 0
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(uid, key):
+        nonlocal failures
+        async with gate:
+            try:
+                if not await _card_flow(provision(uid, aid), aid, key, ev2, comm, delay,
+                                        auth_ns, flow_ns):
+                    failures += 1
+            except (DesfireError, ValueError):
+                failures += 1
+
+    await asyncio.gather(*(one(uid, keys[i * BLOCK:(i + 1) * BLOCK])
+                           for i, uid in enumerate(uids)))
+    return auth_ns, flow_ns, failures
+
+
+def _run_chunk(args):
+    return asyncio.run(_run_cards(*args))
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return [0] * len(points)
+    return [ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+            for p in points]
+
+
+def run_harness(uids, master, aid, ev2=False, comm='full', concurrency=256, delay=0.0,
+                jobs=1):
+    """Provision and run every card; returns (auth_ns, flow_ns, failures, seconds)"""
+    if not uids:
+        return [], [], 0, 0.0
+    keys = desfire_keys.diversify_batch_bytes(master, uids, 'AES')
+    chunk = -(-len(uids) // jobs)
+    work = [(uids[i:i + chunk], keys[i * BLOCK:(i + chunk) * BLOCK], aid, ev2, comm,
+             max(1, concurrency // jobs), delay)
+            for i in range(0, len(uids), chunk)]
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [_run_chunk(job) for job in work]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_run_chunk, work))
+    elapsed = time.perf_counter() - start
+    auth_ns = [ns for r in results for ns in r[0]]
+    flow_ns = [ns for r in results for ns in r[1]]
+    return auth_ns, flow_ns, sum(r[2] for r in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated DESFire cards for throughput tests")
+    parser.add_argument('--cards', type=int, default=2000, help="simulated cards")
+    parser.add_argument('--master', default='00112233445566778899AABBCCDDEEFF',
+                        help="AES master key for the diversified keys (hex)")
+    parser.add_argument('--aid', default='010203', help="application ID (hex)")
+    parser.add_argument('--ev2', action='store_true', help="AuthenticateEV2First instead of EV1")
+    parser.add_argument('--comm', default='full', choices=COMM_MODES,
+                        help="communication mode of the file read at the end")
+    parser.add_argument('--concurrency', type=int, default=256, help="cards in flight")
+    parser.add_argument('--rf-delay', type=float, default=0.0, metavar='MS',
+                        help="simulated air time per frame")
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes")
+    args = parser.parse_args()
+
+    try:
+        if args.cards < 1:
+            raise ValueError("--cards must be at least 1")
+        master = desfire_keys.parse_master(args.master)
+        aid = bytes.fromhex(args.aid)
+        if len(aid) != 3:
+            raise ValueError("AID must be 6 hex characters (3 bytes)")
+    except ValueError as e:
+        parser.error(str(e))
+
+    uids = [b'\x04' + os.urandom(6) for _ in range(args.cards)]
+    auth_ns, flow_ns, failures, elapsed = run_harness(
+        uids, master, aid, args.ev2, args.comm, args.concurrency, args.rf_delay / 1000,
+        max(1, args.jobs))
+
+    mode = 'EV2First' if args.ev2 else 'EV1'
+    print(f"{args.cards} cards, {mode}, {args.comm} read, concurrency {args.concurrency}, "
+          f"{args.jobs} job(s): {elapsed:.2f}s, {failures} failure(s)")
+    print(f"authentications  {len(auth_ns) / elapsed:>10,.0f}/s   "
+          + "  ".join(f"p{p} {v / 1e6:.2f} ms" for p, v in
+                      zip((50, 90, 99), percentiles(auth_ns))))
+    print(f"card flows       {len(flow_ns) / elapsed:>10,.0f}/s   "
+          + "  ".join(f"p{p} {v / 1e6:.2f} ms" for p, v in
+                      zip((50, 90, 99), percentiles(flow_ns))))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+DESFire Secure Messaging - CyberNinja Edition
+AES authentication and session primitives shared by the card emulator and
+the trace decoder
+
+EV1 (AuthenticateAES, 0xAA)
+    E(K, RndB) -> E(K, RndA || RndB<<<8) -> E(K, RndA<<<8), one CBC chain
+    K_ses = RndA[0:4] || RndB[0:4] || RndA[12:16] || RndB[12:16]
+    One running IV (zero after authentication): every CMAC becomes the next
+    IV, enciphered data leaves its last cipher block. Wire MACs are the
+    first 8 CMAC bytes; enciphered data carries a CRC32 and zero padding.
+
+EV2 (AuthenticateEV2First, 0x71)
+    Same exchange with a zero IV per frame; the last PICC frame holds
+    TI || RndA<<<8 || PDcap2 || PCDcap2
+    SV1 / SV2 = A55A / 5AA5 || 0001 0080 || RndA[0:2] || RndA[2:8]^RndB[0:6]
+                || RndB[6:16] || RndA[8:16]
+    K_enc = CMAC(K, SV1), K_mac = CMAC(K, SV2)
+    IVs are E(K_enc, A55A|5AA5 || TI || CmdCtr || 0..); MACs are the odd
+    bytes of CMAC(K_mac, ...); enciphered data is 80 00.. padded.
+
+Requirements: pip install pycryptodome (or cryptography)
+"""
+
+import os
+import zlib
+
+import cipher_backends
+
+BLOCK = 16
+ZERO_IV = bytes(BLOCK)
+
+CMD_AUTH_EV1 = 0xAA
+CMD_AUTH_EV2_FIRST = 0x71
+CMD_ADDITIONAL_FRAME = 0xAF
+
+_RB = 0x87
+_MASK128 = (1 << 128) - 1
+
+
+# ─── Byte helpers ───
+
+def crc32(data: bytes) -> bytes:
+    """DESFire CRC32 (no final XOR), little-endian"""
+    return (zlib.crc32(data) ^ 0xFFFFFFFF).to_bytes(4, 'little')
+
+
+def rotl(data: bytes) -> bytes:
+    """Rotate left by one byte (RndA' / RndB')"""
+    return data[1:] + data[:1]
+
+
+def xor(a: bytes, b: bytes) -> bytes:
+    """XOR of two equal-length buffers as one big-integer operation"""
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).to_bytes(len(a), 'big')
+
+
+def pad(data: bytes) -> bytes:
+    """ISO 9797-1 method 2: 80 00.. up to the next block (always adds a byte)"""
+    return (data + b'\x80').ljust(-(-(len(data) + 1) // BLOCK) * BLOCK, b'\x00')
+
+
+def unpad(data: bytes) -> bytes:
+    trimmed = data.rstrip(b'\x00')
+    if not trimmed.endswith(b'\x80') or len(data) - len(trimmed) >= BLOCK:
+        raise ValueError("bad padding")
+    return trimmed[:-1]
+
+
+def zero_pad(data: bytes) -> bytes:
+    return data.ljust(-(-len(data) // BLOCK) * BLOCK, b'\x00')
+
+
+def strip_crc(plain: bytes, tail: bytes = b'', head: bytes = b'', length: int = None) -> bytes:
+    """EV1 enciphered data: find data || CRC32(head || data || tail) || 00..
+
+    Without a known length the longest data that verifies wins; a CRC
+    starting with the status byte also verifies one byte further on, so pass
+    the length whenever the caller knows it.
+    """
+    ends = [length] if length else range(len(plain) - 4, max(-1, len(plain) - 4 - BLOCK), -1)
+    for end in ends:
+        if plain[end + 4:].strip(b'\x00'):
+            break
+        if crc32(head + plain[:end] + tail) == plain[end:end + 4]:
+            return plain[:end]
+    raise ValueError("CRC32 mismatch")
+
+
+def cmac_subkeys(ecb):
+    """CMAC subkeys (K1, K2) for an AES ECB object"""
+    k1 = int.from_bytes(ecb.encrypt(ZERO_IV), 'big') << 1
+    if k1 >> 128:
+        k1 = (k1 & _MASK128) ^ _RB
+    k2 = k1 << 1
+    if k2 >> 128:
+        k2 = (k2 & _MASK128) ^ _RB
+    return k1.to_bytes(BLOCK, 'big'), k2.to_bytes(BLOCK, 'big')
+
+
+class AesKey:
+    """One AES key: cached ECB context, CMAC subkeys, CBC built on ECB"""
+
+    __slots__ = ('key', 'ecb', 'k1', 'k2')
+
+    def __init__(self, key: bytes):
+        if len(key) != BLOCK:
+            raise ValueError("AES keys are 16 bytes")
+        self.key = bytes(key)
+        self.ecb = cipher_backends.get_backend().ecb(self.key)
+        self.k1, self.k2 = cmac_subkeys(self.ecb)
+
+    def cbc_encrypt(self, data: bytes, iv: bytes = ZERO_IV) -> bytes:
+        out = []
+        prev = int.from_bytes(iv, 'big')
+        encrypt = self.ecb.encrypt
+        for i in range(0, len(data), BLOCK):
+            block = int.from_bytes(data[i:i + BLOCK], 'big') ^ prev
+            block = encrypt(block.to_bytes(BLOCK, 'big'))
+            out.append(block)
+            prev = int.from_bytes(block, 'big')
+        return b''.join(out)
+
+    def cbc_decrypt(self, data: bytes, iv: bytes = ZERO_IV) -> bytes:
+        # CBC decryption is parallel: one ECB call, one XOR with the shifted ciphertext
+        return xor(self.ecb.decrypt(data), iv + data[:-BLOCK])
+
+    def cmac(self, data: bytes, iv: bytes = ZERO_IV) -> bytes:
+        if data and not len(data) % BLOCK:
+            last = xor(data[-BLOCK:], self.k1)
+        else:
+            tail = len(data) - len(data) % BLOCK
+            last = xor(pad(data[tail:]), self.k2)
+            data = data[:tail] + last
+        return self.cbc_encrypt(data[:-BLOCK] + last, iv)[-BLOCK:]
+
+
+# ─── Authentication ───
+
+def random_block() -> bytes:
+    return os.urandom(BLOCK)
+
+
+def ev1_session_key(rnd_a: bytes, rnd_b: bytes) -> bytes:
+    return rnd_a[:4] + rnd_b[:4] + rnd_a[12:16] + rnd_b[12:16]
+
+
+def ev2_session_keys(key: AesKey, rnd_a: bytes, rnd_b: bytes):
+    """(K_enc, K_mac) from the card key and both random numbers"""
+    context = (b'\x00\x01\x00\x80' + rnd_a[:2] + xor(rnd_a[2:8], rnd_b[:6])
+               + rnd_b[6:16] + rnd_a[8:16])
+    return key.cmac(b'\xA5\x5A' + context), key.cmac(b'\x5A\xA5' + context)
+
+
+def ev1_recover(key: AesKey, enc_rnd_b: bytes, enc_rnd_ab: bytes):
+    """(RndA, RndB) from the first two frames of an observed EV1 exchange"""
+    rnd_b = key.cbc_decrypt(enc_rnd_b)
+    plain = key.cbc_decrypt(enc_rnd_ab, enc_rnd_b[-BLOCK:])
+    if plain[BLOCK:] != rotl(rnd_b):
+        raise ValueError("RndB' mismatch (wrong key)")
+    return plain[:BLOCK], rnd_b
+
+
+def ev2_recover(key: AesKey, enc_rnd_b: bytes, enc_rnd_ab: bytes):
+    """(RndA, RndB) from the first two frames of an observed EV2First exchange"""
+    rnd_b = key.cbc_decrypt(enc_rnd_b)
+    plain = key.cbc_decrypt(enc_rnd_ab)
+    if plain[BLOCK:] != rotl(rnd_b):
+        raise ValueError("RndB' mismatch (wrong key)")
+    return plain[:BLOCK], rnd_b
+
+
+# ─── Sessions ───
+
+class Ev1Session:
+    """EV1 AES secure messaging: one running IV for CMACs and enciphered data"""
+
+    ev2 = False
+
+    def __init__(self, rnd_a: bytes, rnd_b: bytes):
+        self.key = AesKey(ev1_session_key(rnd_a, rnd_b))
+        self.iv = ZERO_IV
+
+    def mac(self, data: bytes) -> bytes:
+        """CMAC under the running IV (which it replaces); returns the 8-byte wire MAC"""
+        self.iv = self.key.cmac(data, self.iv)
+        return self.iv[:8]
+
+    def encrypt(self, data: bytes) -> bytes:
+        out = self.key.cbc_encrypt(data, self.iv)
+        self.iv = out[-BLOCK:]
+        return out
+
+    def decrypt(self, data: bytes) -> bytes:
+        out = self.key.cbc_decrypt(data, self.iv)
+        self.iv = data[-BLOCK:]
+        return out
+
+
+class Ev2Session:
+    """EV2 secure messaging: K_enc / K_mac, transaction identifier, command counter
+
+    Command helpers use the current counter; call step() once the card has
+    executed the command, then the response helpers use the new value.
+    """
+
+    ev2 = True
+
+    def __init__(self, k_enc: bytes, k_mac: bytes, ti: bytes):
+        self.enc = AesKey(k_enc)
+        self.mac_key = AesKey(k_mac)
+        self.ti = ti
+        self.cmd_ctr = 0
+
+    def step(self):
+        self.cmd_ctr = (self.cmd_ctr + 1) & 0xFFFF
+
+    def _iv(self, label: bytes) -> bytes:
+        counter = self.cmd_ctr.to_bytes(2, 'little')
+        return self.enc.ecb.encrypt(label + self.ti + counter + bytes(8))
+
+    def _mac(self, data: bytes) -> bytes:
+        return self.mac_key.cmac(data)[1::2]
+
+    def command_mac(self, cmd: int, header: bytes = b'', data: bytes = b'') -> bytes:
+        return self._mac(bytes([cmd]) + self.cmd_ctr.to_bytes(2, 'little') + self.ti
+                         + header + data)
+
+    def response_mac(self, status: int, data: bytes = b'') -> bytes:
+        return self._mac(bytes([status]) + self.cmd_ctr.to_bytes(2, 'little') + self.ti + data)
+
+    def encrypt_command(self, data: bytes) -> bytes:
+        return self.enc.cbc_encrypt(pad(data), self._iv(b'\xA5\x5A'))
+
+    def decrypt_command(self, data: bytes) -> bytes:
+        return unpad(self.enc.cbc_decrypt(data, self._iv(b'\xA5\x5A')))
+
+    def encrypt_response(self, data: bytes) -> bytes:
+        return self.enc.cbc_encrypt(pad(data), self._iv(b'\x5A\xA5'))
+
+    def decrypt_response(self, data: bytes) -> bytes:
+        return unpad(self.enc.cbc_decrypt(data, self._iv(b'\x5A\xA5')))
\ No newline at end of file
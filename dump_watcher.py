@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Dump Folder Watcher - Kobe's Keys Edition
+Process new and appended dumps / capture logs as readers drop them
+
+    .bin                 pattern search + RBH 50-bit extraction on new bytes only
+    .eml / .json         re-decoded when changed; only new hits are reported
+    .txt / .log / .csv   new complete lines through the bulk credential parser; an
+                         unterminated last line once the file has been quiet for
+                         the poll interval, lines over 1 MB are skipped
+
+Per-file byte offsets (plus the output size) are checkpointed after every
+file, so a restart resumes exactly where it stopped: output written after
+the last checkpoint is truncated away and re-produced. An output shorter
+than its checkpoint (deleted, rotated or truncated) is refused rather than
+padded; remove the checkpoint to reprocess every file into a new output.
+
+Linux uses inotify (ctypes, no extra packages); elsewhere, or with
+--poll, the directory is polled and only files whose size/mtime changed are
+opened.
+
+Usage:
+    python dump_watcher.py /srv/dumps --kantech 8020:11485 --rbh-50bit -o hits.jsonl
+    python dump_watcher.py /srv/captures --system rbh --poll 5
+
+Requirements: none (standard library only)
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+import credential_parser
+import pm3_dumps
+
+BINARY_SUFFIXES = ('.bin',)
+WHOLE_SUFFIXES = ('.eml', '.json')
+TEXT_SUFFIXES = ('.txt', '.log', '.csv')
+
+# Bytes read per step from a growing file
+READ_SIZE = 16 << 20
+# Longest text line; longer ones are reported and skipped
+MAX_LINE = 1 << 20
+# Seconds without writes before an unterminated last line counts as complete
+QUIET = 2.0
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_Q_OVERFLOW = 0x4000
+_IN_EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    """Minimal inotify watch on one directory (Linux)"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+
+    def read(self, timeout):
+        """Names changed since the last call (None after a queue overflow)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return names
+            pos = 0
+            while pos < len(data):
+                _, mask, _, length = _IN_EVENT.unpack_from(data, pos)
+                pos += _IN_EVENT.size
+                if mask & _IN_Q_OVERFLOW:
+                    return None
+                names.add(os.fsdecode(data[pos:pos + length].rstrip(b'\0')))
+                pos += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _long_line_start(block):
+    """Start of the first line that may be over MAX_LINE bytes (-1 if none can be)
+
+    Such a line covers a whole aligned MAX_LINE / 2 window with no newline;
+    one memchr per window instead of measuring every line.
+    """
+    half = MAX_LINE // 2
+    for pos in range(0, len(block) - half + 1, half):
+        if block.find(b'\n', pos, pos + half) < 0:
+            return block.rfind(b'\n', 0, pos) + 1
+    return -1
+
+
+class DumpWatcher:
+    """Incremental processing of one directory with a JSON checkpoint"""
+
+    def __init__(self, directory, output, state_path, patterns=None, rbh_50bit=False,
+                 system='rbh', quiet=QUIET):
+        self.directory = directory
+        self.output = output
+        self.state_path = state_path
+        self.patterns = patterns or {}
+        self.rbh_50bit = rbh_50bit
+        self.system = system
+        self.quiet_ns = int(quiet * 1e9)
+        self._pending = set()
+        self.overlap = max([len(p) for p in self.patterns.values()] + [7 if rbh_50bit else 1]) - 1
+        self.out = open(output, 'ab')
+        try:
+            with open(state_path, encoding='utf-8') as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            # No checkpoint yet: keep any existing output and append to it
+            self.state = {'output_size': self.out.tell(), 'files': {}}
+        except (OSError, ValueError):
+            self.out.close()
+            raise
+        if self.out.tell() < self.state['output_size']:
+            size = self.out.tell()
+            self.out.close()
+            raise ValueError(f"{output} has {size} bytes but its checkpoint {state_path} "
+                             f"expects {self.state['output_size']}: the output was deleted, "
+                             f"rotated or truncated. Restore it, or delete the checkpoint "
+                             f"to reprocess every file")
+        # Drop results written after the last checkpoint; they are re-produced
+        self.out.truncate(self.state['output_size'])
+        self.out.seek(0, os.SEEK_END)
+        self._own = {os.path.abspath(output), os.path.abspath(state_path),
+                     os.path.abspath(state_path + '.tmp')}
+
+    def close(self):
+        self.out.close()
+
+    # ─── Checkpointing ───
+
+    def _commit(self, name, entry, records):
+        if records:
+            self.out.write(b''.join(json.dumps(r, separators=(',', ':')).encode() + b'\n'
+                                    for r in records))
+        self.out.flush()
+        os.fsync(self.out.fileno())
+        self.state['files'][name] = entry
+        self.state['output_size'] = self.out.tell()
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.state_path)
+
+    # ─── Per-file processing ───
+
+    def _kind(self, name):
+        lower = name.lower()
+        if name.startswith('.') or name == pm3_dumps.CACHE_NAME:
+            return None
+        if os.path.abspath(os.path.join(self.directory, name)) in self._own:
+            return None
+        for kind, suffixes in (('bin', BINARY_SUFFIXES), ('whole', WHOLE_SUFFIXES),
+                               ('text', TEXT_SUFFIXES)):
+            if lower.endswith(suffixes):
+                return kind
+        return None
+
+    def process(self, name):
+        """Handle whatever is new in one file; returns records written"""
+        kind = self._kind(name)
+        if kind is None:
+            return 0
+        path = os.path.join(self.directory, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        entry = self.state['files'].get(name)
+        stamp = [st.st_size, st.st_mtime_ns]
+        # Replaced or truncated files start over
+        if entry and (entry['inode'] != st.st_ino or st.st_size < entry['offset']):
+            entry = None
+        if entry and entry['stamp'] == stamp:
+            # Unchanged; only a pending text tail can have become due
+            if not (kind == 'text' and entry['offset'] < st.st_size and self._is_quiet(stamp)):
+                return 0
+        entry = dict(entry or {'inode': st.st_ino, 'offset': 0, 'line': 1, 'hits': []})
+        entry['stamp'] = stamp
+        handler = {'bin': self._process_bin, 'whole': self._process_whole,
+                   'text': self._process_text}[kind]
+        try:
+            records = handler(name, path, entry)
+        except (OSError, ValueError) as e:
+            records = [{'file': name, 'error': str(e)}]
+            entry['offset'] = st.st_size
+        if kind == 'text' and entry['offset'] < st.st_size:
+            self._pending.add(name)
+        else:
+            self._pending.discard(name)
+        self._commit(name, entry, records)
+        return len(records)
+
+    def _is_quiet(self, stamp):
+        return time.time_ns() - stamp[1] >= self.quiet_ns
+
+    def _process_bin(self, name, path, entry):
+        records = []
+        with open(path, 'rb') as f:
+            while True:
+                old = entry['offset']
+                start = max(0, old - self.overlap)
+                f.seek(start)
+                data = f.read(READ_SIZE + old - start)
+                if len(data) <= old - start:
+                    break
+                buf = pm3_dumps.DumpBuffer(path, data)
+                for hit_name, pos in pm3_dumps.search_patterns(buf, self.patterns):
+                    # Matches ending inside already-processed bytes were reported before
+                    if start + pos + len(self.patterns[hit_name]) > old:
+                        records.append({'file': name, 'offset': start + pos, 'match': hit_name})
+                if self.rbh_50bit:
+                    for pos, site, card in pm3_dumps.extract_rbh_50bit(buf):
+                        if start + pos + 7 > old:
+                            records.append({'file': name, 'offset': start + pos,
+                                            'rbh_50bit': f"{site}:{card}"})
+                buf.close()
+                entry['offset'] = start + len(data)
+        return records
+
+    def _process_whole(self, name, path, entry):
+        with pm3_dumps.load_dump(path) as buf:
+            hits = pm3_dumps.search_patterns(buf, self.patterns)
+            found = [[hit_name, pos] for hit_name, pos in hits]
+            if self.rbh_50bit:
+                found += [[f"rbh 50-bit {site}:{card}", pos]
+                          for pos, site, card in pm3_dumps.extract_rbh_50bit(buf)]
+        seen = {tuple(hit) for hit in entry['hits']}
+        entry['hits'] = found
+        entry['offset'] = entry['stamp'][0]
+        return [{'file': name, 'offset': pos, 'match': hit_name}
+                for hit_name, pos in found if (hit_name, pos) not in seen]
+
+    def _process_text(self, name, path, entry):
+        records = []
+        quiet = self._is_quiet(entry['stamp'])
+        with open(path, 'rb') as f:
+            f.seek(entry['offset'])
+            while True:
+                block = f.read(READ_SIZE)
+                if not block:
+                    break
+                if entry.get('skip'):
+                    # Rest of an overlong line
+                    cut = block.find(b'\n') + 1
+                    entry['offset'] += cut or len(block)
+                    if cut:
+                        del entry['skip']
+                        entry['line'] += 1
+                        f.seek(entry['offset'])
+                    continue
+                cut = block.rfind(b'\n') + 1
+                start = _long_line_start(block)
+                if start == 0:
+                    first = block.find(b'\n')
+                    if first >= MAX_LINE or (first < 0 and len(block) >= MAX_LINE):
+                        records.append({'file': name, 'line': entry['line'],
+                                        'error': f"line longer than {MAX_LINE} bytes, skipped"})
+                        if first < 0:
+                            entry['skip'] = True
+                            entry['offset'] += len(block)
+                        else:
+                            entry['line'] += 1
+                            entry['offset'] += first + 1
+                            f.seek(entry['offset'])
+                        continue
+                    cut = first + 1
+                elif start > 0:
+                    # Parse up to the suspect line; it is checked as the next block's first
+                    cut = start
+                if not cut:
+                    if not quiet:
+                        # Keep a partial last line for the next append
+                        break
+                    # The writer has gone quiet: the unterminated last line is complete
+                    cut = len(block)
+                text = block[:cut].decode('utf-8', errors='replace')
+                result = credential_parser.parse_text(text, self.system, entry['line'])
+                records.extend({'file': name, 'system': self.system, 'site': site, 'card': card}
+                               for site, card in zip(result.sites, result.cards))
+                records.extend({'file': name, 'line': line_no, 'error': reason, 'text': bad}
+                               for line_no, reason, bad in result.errors)
+                entry['line'] += result.lines
+                entry['offset'] += cut
+                f.seek(entry['offset'])
+        return records
+
+    # ─── Loops ───
+
+    def scan_all(self):
+        """Catch up on every file in the directory (only changed files are read)"""
+        total = 0
+        with os.scandir(self.directory) as it:
+            names = sorted(e.name for e in it if e.is_file())
+        for name in names:
+            total += self.process(name)
+        return total
+
+    def run(self, poll=None, timeout=1.0):
+        """Watch forever; `poll` seconds forces polling, else inotify when available"""
+        self.scan_all()
+        watch = None
+        if poll is None and sys.platform.startswith('linux'):
+            try:
+                watch = Inotify(self.directory)
+            except OSError as e:
+                print(f"inotify unavailable ({e}); polling", file=sys.stderr)
+        try:
+            while True:
+                if watch is None:
+                    time.sleep(poll or 2.0)
+                    self.scan_all()
+                    continue
+                names = watch.read(timeout)
+                if names is None:
+                    self.scan_all()
+                    continue
+                for name in sorted(names):
+                    self.process(name)
+                # Unterminated last lines get no further event; recheck them
+                for name in sorted(self._pending - names):
+                    self.process(name)
+        finally:
+            if watch is not None:
+                watch.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder for new dumps and capture logs")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', default='watch_results.jsonl',
+                        help="append-only JSON lines output")
+    parser.add_argument('--state', default=None,
+                        help="checkpoint file (default: OUTPUT.state.json)")
+    parser.add_argument('--kantech', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--rbh', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--rbh-50bit', action='store_true',
+                        help="extract parity-valid RBH 50-bit values from .bin/.eml/.json")
+    parser.add_argument('--system', default='rbh', choices=sorted(credential_parser.CARD_MAX),
+                        help="credential system for text capture logs")
+    parser.add_argument('--poll', type=float, default=None, metavar='SECONDS',
+                        help="poll instead of using inotify")
+    parser.add_argument('--once', action='store_true', help="catch up once and exit")
+    args = parser.parse_args()
+
+    patterns = {}
+    for text in args.kantech:
+        patterns.update(pm3_dumps.kantech_patterns(*pm3_dumps.parse_credential(text)))
+    for text in args.rbh:
+        patterns.update(pm3_dumps.rbh_patterns(*pm3_dumps.parse_credential(text)))
+
+    try:
+        watcher = DumpWatcher(args.directory, args.output,
+                              args.state or args.output + '.state.json',
+                              patterns, args.rbh_50bit, args.system, args.poll or QUIET)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if args.once:
+            start = time.perf_counter()
+            count = watcher.scan_all()
+            print(f"{count} record(s) in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        else:
+            print(f"Watching {args.directory} -> {args.output}", file=sys.stderr)
+            watcher.run(args.poll)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Approximate Credential Search - Kobe's Keys Edition
+Find Kantech / RBH byte patterns in torn or noisy dumps by Hamming distance
+
+Every byte offset is a candidate window. Windows are read as little-endian
+uint64 words through 8 aligned views; for each pattern (up to 8 bytes) the
+window is XORed with the pattern word, masked to the pattern length and
+popcounted, so a whole chunk is scored per pattern in a few NumPy passes.
+
+Matches within --max-bits differing bits are reported, closest first.
+
+Usage:
+    python fuzzy_search.py dumps/ --kantech 8020:11485 --max-bits 3
+    python fuzzy_search.py weak.bin --rbh 4000:4897846 --max-bits 4 --top 20
+
+Requirements: pip install numpy
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+
+import numpy as np
+
+import pm3_dumps
+
+CHUNK_SIZE = 16 << 20
+# Windows are 8 bytes wide; chunks overlap and the file tail is zero-padded by this much
+_WORD = 8
+
+if hasattr(np, 'bitwise_count'):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _POP8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x):
+        return _POP8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def _pattern_words(patterns):
+    """(name, length, word, mask) for every pattern, as little-endian uint64"""
+    words = []
+    for name, pattern in patterns.items():
+        if not 0 < len(pattern) <= _WORD:
+            raise ValueError(f"{name}: patterns must be 1-{_WORD} bytes")
+        word = int.from_bytes(pattern, 'little')
+        mask = (1 << (8 * len(pattern))) - 1
+        words.append((name, len(pattern), np.uint64(word), np.uint64(mask)))
+    return words
+
+
+def scan_buffer(data, patterns, max_bits, base=0, limit=None, real_len=None):
+    """Approximate matches in a buffer: [(distance, offset, name)]
+
+    Matches start before `limit` and end within `real_len` (chunk overlap
+    and tail padding are excluded).
+    """
+    arr = np.frombuffer(data, np.uint8)
+    limit = len(arr) if limit is None else limit
+    real_len = len(arr) if real_len is None else real_len
+    words = _pattern_words(patterns) if isinstance(patterns, dict) else patterns
+    found = []
+    for align in range(_WORD):
+        usable = (len(arr) - align) // _WORD * _WORD
+        if usable <= 0:
+            continue
+        view = arr[align:align + usable].view('<u8')
+        offsets = np.arange(align, align + usable, _WORD)
+        for name, length, word, mask in words:
+            distance = _popcount((view ^ word) & mask)
+            idx = np.flatnonzero(distance <= max_bits)
+            if not len(idx):
+                continue
+            pos = offsets[idx]
+            keep = (pos < limit) & (pos + length <= real_len)
+            for d, p in zip(distance[idx][keep].tolist(), pos[keep].tolist()):
+                found.append((d, base + p, name))
+    found.sort()
+    return found
+
+
+def scan_file(path, patterns, max_bits, chunk_size=CHUNK_SIZE):
+    """mmap a file and scan it chunk by chunk"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    words = _pattern_words(patterns)
+    found = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, size, chunk_size):
+            end = min(size, start + chunk_size + _WORD)
+            chunk = mm[start:end]
+            if end == size:
+                chunk += bytes(_WORD)
+            found.extend(scan_buffer(chunk, words, max_bits, start,
+                                     min(chunk_size, end - start), end - start))
+    found.sort()
+    return found
+
+
+def scan_dump(path, patterns, max_bits):
+    """.eml / .json dumps are decoded first; anything else is scanned raw"""
+    if path.lower().endswith(('.eml', '.json')):
+        with pm3_dumps.load_dump(path) as buf:
+            data = bytes(buf.view)
+        return scan_buffer(data + bytes(_WORD), patterns, max_bits, real_len=len(data),
+                           limit=len(data))
+    return scan_file(path, patterns, max_bits)
+
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                for name in names:
+                    if name != pm3_dumps.CACHE_NAME:
+                        yield os.path.join(dirpath, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hamming-distance credential search in dumps")
+    parser.add_argument('paths', nargs='+', help="dump files or directories")
+    parser.add_argument('--kantech', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--rbh', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--max-bits', type=int, default=2,
+                        help="maximum differing bits per match")
+    parser.add_argument('--top', type=int, default=20, help="matches to print per file")
+    args = parser.parse_args()
+
+    patterns = {}
+    for text in args.kantech:
+        patterns.update(pm3_dumps.kantech_patterns(*pm3_dumps.parse_credential(text)))
+    for text in args.rbh:
+        patterns.update(pm3_dumps.rbh_patterns(*pm3_dumps.parse_credential(text)))
+    if not patterns:
+        parser.error("give --kantech and/or --rbh credentials")
+
+    total = 0
+    start = time.perf_counter()
+    for path in iter_files(args.paths):
+        try:
+            found = scan_dump(path, patterns, args.max_bits)
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        total += os.path.getsize(path)
+        for distance, offset, name in found[:args.top]:
+            print(f"{path} @0x{offset:06X}: {name} ({distance} bit{'s' if distance != 1 else ''})")
+        if len(found) > args.top:
+            print(f"{path}: {len(found) - args.top} more match(es)", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed / 1e6 if elapsed else 0
+    print(f"{total / 1e6:.1f} MB in {elapsed:.2f}s ({rate:.0f} MB/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Hex Format - Kobe's Keys Edition
+Hex / byte-pattern / binary rendering shared by the calculators and batch tools
+
+Single values: a 256-entry byte table and int.to_bytes().hex(' ') instead of
+one format(x, '02X') call per byte.
+
+Batches: every value is packed into one bytes buffer with struct (one call,
+the endianness in the struct code), the whole buffer is rendered by one
+bytes.hex() call and the text is split into one string per record (binary
+strings join per-byte entries of a 256-entry table):
+
+    split_hex(pack_many('>H', sites), 2)       -> ['1F 54', '00 01', ...]
+    split_hex(pack_many('<I', cards), 4, '')   -> ['DD2C0000', ...]
+
+Usage:
+    python hex_format.py --bench 1000000
+
+Requirements: none (standard library only)
+"""
+
+import argparse
+import struct
+import sys
+import time
+
+# Byte -> two uppercase hex digits
+HEX = tuple(format(i, '02X') for i in range(256))
+# Byte -> eight binary digits
+BITS = tuple(format(i, '08b') for i in range(256))
+
+
+# ─── Single values ───
+
+def hex_upper(data) -> str:
+    """'0A1B..' for bytes (replaces hexlify(data).decode().upper())"""
+    return data.hex().upper()
+
+
+def byte_pattern(value: int, size: int, order: str = 'big') -> str:
+    """'1F 54' style pattern of the low `size` bytes of an integer"""
+    if size == 2:
+        value &= 0xFFFF
+        if order == 'big':
+            return f"{HEX[value >> 8]} {HEX[value & 0xFF]}"
+        return f"{HEX[value & 0xFF]} {HEX[value >> 8]}"
+    return (value & ((1 << (8 * size)) - 1)).to_bytes(size, order).hex(' ').upper()
+
+
+# ─── Batches ───
+
+def pack_many(code: str, values) -> bytes:
+    """One buffer of many values packed with a struct code such as '>H' or '<I'"""
+    values = values if isinstance(values, list) else list(values)
+    try:
+        return struct.pack(f"{code[0]}{len(values)}{code[1:]}", *values)
+    except struct.error as e:
+        raise ValueError(f"Value out of range for '{code}': {e}") from None
+
+
+def split_hex(data: bytes, width: int, sep: str = ' ') -> list:
+    """Render a buffer of `width`-byte records in one pass; one string per record
+
+    sep=' ' gives byte patterns ('1F 54'), sep='' plain hex ('1F54'); sep is one
+    character (bytes.hex).
+    """
+    if not data:
+        return []
+    if not sep:
+        return data.hex('\n', width).upper().split('\n')
+    # Turn the separator after every record into a line break, then split in C
+    step = width * 3
+    text = bytearray((data.hex(sep) + sep).upper().encode())
+    text[step - 1::step] = b'\n' * (len(text) // step)
+    return text.decode().split('\n')[:-1]
+
+
+def split_bin(data: bytes, width: int) -> list:
+    """Binary strings ('0001111101010100') of a buffer of `width`-byte records"""
+    records = [iter(map(BITS.__getitem__, data))] * width
+    return list(map(''.join, zip(*records)))
+
+
+def hex_column(code: str, values, sep: str = '') -> list:
+    """Plain hex (or with sep=' ', byte patterns) of many values in one pass"""
+    return split_hex(pack_many(code, values), struct.calcsize(code), sep)
+
+
+def bin_column(code: str, values) -> list:
+    return split_bin(pack_many(code, values), struct.calcsize(code))
+
+
+# ─── Benchmark ───
+
+def _format_chain_patterns(site_code, card_number):
+    """The per-byte format(x, '02X') chains the calculators used for RBH patterns"""
+    site_be = f"{format((site_code >> 8) & 0xFF, '02X')} {format(site_code & 0xFF, '02X')}"
+    site_le = f"{format(site_code & 0xFF, '02X')} {format((site_code >> 8) & 0xFF, '02X')}"
+    card_be = (f"{format((card_number >> 24) & 0xFF, '02X')} "
+               f"{format((card_number >> 16) & 0xFF, '02X')} "
+               f"{format((card_number >> 8) & 0xFF, '02X')} {format(card_number & 0xFF, '02X')}")
+    card_le = (f"{format(card_number & 0xFF, '02X')} {format((card_number >> 8) & 0xFF, '02X')} "
+               f"{format((card_number >> 16) & 0xFF, '02X')} "
+               f"{format((card_number >> 24) & 0xFF, '02X')}")
+    return site_be, site_le, card_be, card_le, site_be + " " + card_be, card_le + " " + site_le
+
+
+def _bench(count):
+    import random
+
+    import credential_codec
+
+    rng = random.Random(5)
+    sites = [rng.getrandbits(16) for _ in range(count)]
+    cards = [rng.getrandbits(32) for _ in range(count)]
+    keys = ('site_be', 'site_le', 'card_be', 'card_le', 'full_be', 'full_le')
+    print(f"{count:,} RBH records")
+
+    start = time.perf_counter()
+    chains = [_format_chain_patterns(s, c) for s, c in zip(sites, cards)]
+    chain_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [(byte_pattern(s, 2), byte_pattern(s, 2, 'little'),
+               byte_pattern(c, 4), byte_pattern(c, 4, 'little')) for s, c in zip(sites, cards)]
+    single = [(a, b, c, d, f"{a} {c}", f"{d} {b}") for a, b, c, d in single]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = credential_codec.rbh_patterns(sites, cards)
+    batch_s = time.perf_counter() - start
+    batch = list(zip(*(columns[k] for k in keys)))
+    if not chains == single == batch:
+        raise SystemExit("byte patterns differ")
+    del chains, single, batch, columns
+    rows = [("format(x, '02X') chains", chain_s), ("per value (byte table)", single_s),
+            ("batch (struct + bytes.hex)", batch_s)]
+    print("byte patterns (site/card/full, BE + LE):")
+    for label, seconds in rows:
+        print(f"  {label:28} {seconds:7.2f}s  {count / seconds:>12,.0f} records/s")
+
+    for name, values, columns in (('kantech', credential_codec.kantech_values,
+                                   credential_codec.kantech_columns),
+                                  ('rbh', credential_codec.rbh_values,
+                                   credential_codec.rbh_columns)):
+        card_list = [c & 0xFFFF for c in cards] if name == 'kantech' else cards
+        # 1M full dicts do not fit next to the columns: time, then spot-check
+        start = time.perf_counter()
+        for s, c in zip(sites, card_list):
+            values(s, c)
+        per_value_s = time.perf_counter() - start
+        start = time.perf_counter()
+        table = columns(sites, card_list)
+        batch_s = time.perf_counter() - start
+        for i in rng.sample(range(count), min(count, 10000)):
+            if {k: table[k][i] for k in table} != values(sites[i], card_list[i]):
+                raise SystemExit(f"{name}: batch columns differ from {values.__name__}")
+        del table
+        print(f"all {name} values: per value {per_value_s:6.2f}s   batch {batch_s:6.2f}s   "
+              f"({per_value_s / batch_s:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk hex / byte-pattern formatting")
+    parser.add_argument('--bench', type=int, metavar='N', default=1_000_000,
+                        help="per-value vs batch formatting on N records")
+    args = parser.parse_args()
+    _bench(args.bench)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
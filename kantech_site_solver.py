@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Kantech Site Code Solver - Kobe's Keys Edition
+Recover an unknown site code from a printed card number and dump fragments
+
+All 65,536 site codes are evaluated at once (NumPy): the candidate space of
+full_be / full_le patterns and XOR / SUM checksums is built as arrays, and
+every 4-byte window of each dump is tested against it in one vectorized
+pass. Because every candidate shares the card number in its low half, a
+window is in the candidate set exactly when that half matches, and the
+site code is read straight from the other half.
+
+A checksum is counted as present when the two bytes after a hit hold the
+candidate's XOR or SUM (same byte order as the hit).
+
+Usage:
+    python kantech_site_solver.py 11485 dump.bin [more dumps...]
+    python kantech_site_solver.py 11485 --hex "1F 54 2C DD" --xor 3389
+
+Requirements: pip install numpy
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import credential_codec
+import pm3_dumps
+
+SITE_COUNT = credential_codec.KANTECH_SITE_MAX + 1
+
+
+def candidate_space(card_number):
+    """Arrays over every site code: patterns and checksums for one card"""
+    sites = np.arange(SITE_COUNT, dtype=np.uint32)
+    value = (sites << 16) | card_number
+    return {
+        'site': sites,
+        'full_be': value.astype('>u4').view(np.uint8).reshape(-1, 4),
+        'full_le': value.astype('<u4').view(np.uint8).reshape(-1, 4),
+        'xor': (sites ^ card_number).astype(np.uint16),
+        'sum': ((sites + card_number) & 0xFFFF).astype(np.uint16),
+    }
+
+
+def _windows(arr, dtype):
+    """Every 4-byte window of a uint8 array as uint32 (4 aligned views)"""
+    out = np.empty(max(len(arr) - 3, 0), np.uint32)
+    for align in range(4):
+        usable = (len(arr) - align) // 4 * 4
+        if usable > 0:
+            out[align::4] = arr[align:align + usable].view(dtype)
+    return out
+
+
+def _pair_after(arr, offsets, dtype):
+    """The 16-bit value at offset + 4 (or -1 past the end)"""
+    pos = offsets + 4
+    ok = pos + 1 < len(arr)
+    hi, lo = (0, 1) if dtype == '>' else (1, 0)
+    value = np.full(len(offsets), -1, np.int32)
+    value[ok] = (arr[pos[ok] + hi].astype(np.int32) << 8) | arr[pos[ok] + lo]
+    return value
+
+
+def solve_buffer(data, card_number, space=None):
+    """Site-code hits in one buffer: [(site, offset, order, checksum)]
+
+    order is 'BE' or 'LE'; checksum is 'xor', 'sum' or None.
+    """
+    space = space or candidate_space(card_number)
+    arr = np.frombuffer(data, np.uint8)
+    hits = []
+    for order, dtype in (('BE', '>'), ('LE', '<')):
+        words = _windows(arr, dtype + 'u4')
+        # The candidate set is {site << 16 | card}: membership is the low half
+        offsets = np.flatnonzero((words & 0xFFFF) == card_number)
+        sites = (words[offsets] >> 16).astype(np.int64)
+        follow = _pair_after(arr, offsets, dtype)
+        is_xor = follow == space['xor'][sites]
+        is_sum = follow == space['sum'][sites]
+        for site, offset, x, s in zip(sites.tolist(), offsets.tolist(),
+                                      is_xor.tolist(), is_sum.tolist()):
+            hits.append((site, offset, order, 'xor' if x else 'sum' if s else None))
+    hits.sort(key=lambda hit: hit[1])
+    return hits
+
+
+def solve(sources, card_number, known_xor=None, known_sum=None):
+    """Rank site codes across named buffers
+
+    Returns [(site, fragments_hit, checksum_hits, [(source, offset, order, checksum)])]
+    best first. Known XOR / SUM values restrict the candidate space first.
+    """
+    space = candidate_space(card_number)
+    allowed = np.ones(SITE_COUNT, dtype=bool)
+    if known_xor is not None:
+        allowed &= space['xor'] == known_xor
+    if known_sum is not None:
+        allowed &= space['sum'] == known_sum
+
+    found = {}
+    for name, data in sources:
+        for site, offset, order, checksum in solve_buffer(data, card_number, space):
+            if allowed[site]:
+                found.setdefault(site, []).append((name, offset, order, checksum))
+    if not found and (known_xor is not None or known_sum is not None):
+        # No dump evidence: the checksums alone pin the site code
+        for site in np.flatnonzero(allowed).tolist():
+            found[site] = []
+
+    ranked = []
+    for site, hits in found.items():
+        fragments = len({hit[0] for hit in hits})
+        checksums = sum(1 for hit in hits if hit[3])
+        ranked.append((site, fragments, checksums, hits))
+    ranked.sort(key=lambda r: (-r[1], -r[2], -len(r[3]), r[0]))
+    return ranked
+
+
+def load_source(path):
+    """Dump bytes via pm3_dumps for .bin/.eml/.json, raw bytes otherwise"""
+    try:
+        with pm3_dumps.load_dump(path) as buf:
+            return bytes(buf.view)
+    except ValueError:
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def _bench():
+    rng = np.random.default_rng(37)
+    data = bytearray(rng.integers(0, 256, 1 << 20, dtype=np.uint8).tobytes())
+    card, site = 11485, 8020
+    be, le = credential_codec.kantech_bytes(site, card)
+    data[1000:1006] = be + (site ^ card).to_bytes(2, 'big')
+    data[500000:500004] = le
+    start = time.perf_counter()
+    ranked = solve([('random 1MB', bytes(data))], card)
+    elapsed = time.perf_counter() - start
+    print(f"1 MB sweep of 65,536 site codes: {elapsed * 1000:.1f} ms, "
+          f"best site {ranked[0][0]} ({len(ranked)} candidates)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve an unknown Kantech site code")
+    parser.add_argument('card', type=int, nargs='?', help="printed card number (0-65535)")
+    parser.add_argument('dumps', nargs='*', help="dump files (.bin/.eml/.json or raw)")
+    parser.add_argument('--hex', action='append', default=[], metavar='BYTES',
+                        help="hex fragment, repeatable")
+    parser.add_argument('--xor', type=lambda v: int(v, 16), help="known XOR checksum (hex)")
+    parser.add_argument('--sum', type=lambda v: int(v, 16), help="known SUM checksum (hex)")
+    parser.add_argument('--top', type=int, default=10, help="candidates to print")
+    parser.add_argument('--bench', action='store_true', help="time a 1 MB sweep")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench()
+        return 0
+    if args.card is None or not 0 <= args.card <= credential_codec.KANTECH_CARD_MAX:
+        parser.error("card number must be 0-65535")
+
+    sources = []
+    for i, fragment in enumerate(args.hex, 1):
+        try:
+            sources.append((f"hex#{i}", bytes.fromhex(fragment.replace(':', ' '))))
+        except ValueError:
+            parser.error(f"bad hex fragment: {fragment}")
+    for path in args.dumps:
+        try:
+            sources.append((os.path.basename(path), load_source(path)))
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}", file=sys.stderr)
+    if not sources and args.xor is None and args.sum is None:
+        parser.error("give dumps, --hex fragments or a known --xor / --sum")
+
+    start = time.perf_counter()
+    ranked = solve(sources, args.card, args.xor, args.sum)
+    elapsed = time.perf_counter() - start
+
+    for site, fragments, checksums, hits in ranked[:args.top]:
+        combined = credential_codec.kantech_combined_32(site, args.card)
+        print(f"site {site:5d} (0x{site:04X})  combined {combined:08X}  "
+              f"{fragments}/{len(sources)} fragment(s)  {len(hits)} hit(s)  "
+              f"{checksums} with checksum")
+        for name, offset, order, checksum in hits[:5]:
+            extra = f" +{checksum.upper()}" if checksum else ""
+            print(f"    {name} @0x{offset:06X} {order}{extra}")
+    print(f"{len(ranked)} candidate site(s), {sum(len(d) for _, d in sources)} bytes "
+          f"in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0 if ranked else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
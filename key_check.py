@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Key Check Values - CyberNinja Edition
+Batch KCVs for diversified fleets, matched against vendor / HSM KCV lists
+
+KCV conventions (desfire_keys.kcv):
+    AES      E(K, 00 x 16) (zero) or E(K, 01 x 16) (ones, GlobalPlatform)
+    DES/3DES E(K, 00 x 8)
+    The first 3 bytes are kept unless --length says otherwise.
+
+The fleet is read in blocks; each block's card keys come from one
+diversify_batch_bytes call. AES KCVs are then computed for the whole block
+at once: a T-table AES in NumPy runs the key schedule and the ten rounds
+column-wise over every key, so no cipher object is built per card.
+DES-family keys fall back to one backend cipher per key.
+
+Expected KCV lists hold 'UID,KCV' lines (per-card check) or bare 'KCV'
+lines (any listed value is accepted); both go into hash indexes, so each
+card costs one dictionary / set lookup. Listed KCVs longer than --length
+are compared on their first --length bytes; shorter ones are rejected.
+
+Usage:
+    python key_check.py --master <hex> [--type 2K3DES] [--method ones]
+    python key_check.py fleet.txt --master <hex> -o kcvs.csv
+    python key_check.py fleet.txt --master <hex> --expected vendor.csv -o mismatches.csv
+    python key_check.py --bench 1000000
+
+Requirements: pip install numpy pycryptodome (or cryptography)
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import cipher_backends
+import desfire_keys
+from pm3_dictionary import read_fleet
+
+# Keys per NumPy pass (bounds the temporaries to a few MB)
+CHUNK_KEYS = 1 << 16
+
+
+# ─── AES over many keys ───
+
+def _aes_tables():
+    """S-box and the four encryption T-tables as uint32 arrays"""
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p walks GF(2^8) by multiplying with 3, q by dividing by 3 (q = p^-1)
+        p ^= ((p << 1) ^ (0x1B if p & 0x80 else 0)) & 0xFF
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        x = q
+        for shift in range(1, 5):
+            x ^= ((q << shift) | (q >> (8 - shift))) & 0xFF
+        sbox[p] = x ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    s = np.array(sbox, dtype=np.uint32)
+    s2 = ((s << 1) ^ np.where(s & 0x80, 0x1B, 0).astype(np.uint32)) & 0xFF
+    t0 = (s2 << 24) | (s << 16) | (s << 8) | (s2 ^ s)
+    tables = [t0]
+    for _ in range(3):
+        t = tables[-1]
+        tables.append((t >> 8) | (t << 24))
+    return s, tables
+
+
+_SBOX, _TE = _aes_tables()
+_RCON = (0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36)
+_FF = np.uint32(0xFF)
+
+
+def _sub_rot(t):
+    """SubWord(RotWord(t)) for a column of key words"""
+    s = _SBOX
+    return ((s[(t >> 16) & _FF] << 24) | (s[(t >> 8) & _FF] << 16)
+            | (s[t & _FF] << 8) | s[t >> 24])
+
+
+def aes_encrypt_many(keys: bytes, block: bytes) -> bytes:
+    """E(K_i, block) for every AES-128 key in a concatenated buffer"""
+    w = np.frombuffer(keys, dtype='>u4').astype(np.uint32).reshape(-1, 4)
+    k0, k1, k2, k3 = (w[:, i].copy() for i in range(4))
+    p = np.frombuffer(block, dtype='>u4').astype(np.uint32)
+    s0, s1, s2, s3 = k0 ^ p[0], k1 ^ p[1], k2 ^ p[2], k3 ^ p[3]
+    te0, te1, te2, te3 = _TE
+    for r in range(10):
+        # Round key r + 1, expanded in step with the rounds
+        k0 ^= _sub_rot(k3) ^ np.uint32(_RCON[r] << 24)
+        k1 ^= k0
+        k2 ^= k1
+        k3 ^= k2
+        if r < 9:
+            s0, s1, s2, s3 = (
+                te0[s0 >> 24] ^ te1[(s1 >> 16) & _FF] ^ te2[(s2 >> 8) & _FF] ^ te3[s3 & _FF] ^ k0,
+                te0[s1 >> 24] ^ te1[(s2 >> 16) & _FF] ^ te2[(s3 >> 8) & _FF] ^ te3[s0 & _FF] ^ k1,
+                te0[s2 >> 24] ^ te1[(s3 >> 16) & _FF] ^ te2[(s0 >> 8) & _FF] ^ te3[s1 & _FF] ^ k2,
+                te0[s3 >> 24] ^ te1[(s0 >> 16) & _FF] ^ te2[(s1 >> 8) & _FF] ^ te3[s2 & _FF] ^ k3,
+            )
+    s = _SBOX
+    cols = [s0, s1, s2, s3]
+    out = np.empty((len(s0), 4), dtype='>u4')
+    for c, k in enumerate((k0, k1, k2, k3)):
+        out[:, c] = ((s[cols[c] >> 24] << 24) | (s[(cols[(c + 1) % 4] >> 16) & _FF] << 16)
+                     | (s[(cols[(c + 2) % 4] >> 8) & _FF] << 8)
+                     | s[cols[(c + 3) % 4] & _FF]) ^ k
+    return out.tobytes()
+
+
+# ─── Batch KCVs ───
+
+def kcv_batch(keys: bytes, key_type: str = 'AES', method: str = 'zero',
+              length: int = desfire_keys.KCV_LENGTH) -> bytes:
+    """KCVs for concatenated keys (as returned by diversify_batch_bytes), `length` bytes each"""
+    block = desfire_keys.kcv_block(key_type, method)
+    key_len = desfire_keys.key_length(key_type)
+    if not 0 < length <= len(block):
+        raise ValueError(f"KCV length must be 1-{len(block)} bytes")
+    if len(keys) % key_len:
+        raise ValueError(f"Key buffer is not a whole number of {key_type} keys")
+    if key_type != 'AES':
+        des_ecb = cipher_backends.get_backend().des_ecb
+        return b''.join([des_ecb(keys[i:i + key_len]).encrypt(block)[:length]
+                         for i in range(0, len(keys), key_len)])
+    step = CHUNK_KEYS * key_len
+    parts = []
+    for i in range(0, len(keys), step):
+        enc = aes_encrypt_many(keys[i:i + step], block)
+        parts.append(np.frombuffer(enc, np.uint8).reshape(-1, 16)[:, :length].tobytes())
+    return b''.join(parts)
+
+
+def fleet_kcvs(master: bytes, uids, key_type: str = 'AES', key_version: int = None,
+               method: str = 'zero', length: int = desfire_keys.KCV_LENGTH) -> bytes:
+    """KCVs of the diversified keys of a UID batch (one diversification call)"""
+    keys = desfire_keys.diversify_batch_bytes(master, uids, key_type, key_version)
+    return kcv_batch(keys, key_type, method, length)
+
+
+# ─── Matching ───
+
+def read_expected(lines, length: int = desfire_keys.KCV_LENGTH):
+    """(by_uid, pool) hash indexes from 'UID,KCV' and bare 'KCV' lines
+
+    KCVs are cut to their first `length` bytes; shorter ones raise ValueError.
+    """
+    by_uid = {}
+    pool = set()
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith('#') or text.lower().startswith('uid'):
+            continue
+        uid_hex, sep, kcv_hex = text.partition(',')
+        try:
+            uid = bytes.fromhex(uid_hex) if sep else None
+            kcv = bytes.fromhex(kcv_hex.split(',')[0] if sep else uid_hex)
+        except ValueError:
+            raise ValueError(f"line {line_no}: bad hex: {text}") from None
+        if len(kcv) < length:
+            raise ValueError(f"line {line_no}: KCV {kcv.hex().upper()} is shorter than "
+                             f"{length} bytes: {text}")
+        if sep:
+            by_uid[uid] = kcv[:length]
+        else:
+            pool.add(kcv[:length])
+    return by_uid, pool
+
+
+def find_mismatches(uids, kcvs: bytes, by_uid: dict, pool: set, length: int):
+    """Yield (uid, kcv, expected) for cards whose KCV is not the listed one
+
+    Cards listed by UID must match their own KCV; other cards must have a KCV
+    in the bare list (expected is None for those). Unlisted cards pass when
+    there is no bare list.
+    """
+    get = by_uid.get
+    for i, uid in enumerate(uids):
+        value = kcvs[i * length:(i + 1) * length]
+        expected = get(uid)
+        if expected is not None:
+            if expected != value:
+                yield uid, value, expected
+        elif pool and value not in pool:
+            yield uid, value, None
+
+
+def check_fleet(fleet, master, key_type, key_version, method, length, by_uid, pool, out):
+    """Stream uid,kcv[,expected] rows; returns (cards, rows written)
+
+    Without an expected list every card is written; with one, only mismatches.
+    """
+    checking = bool(by_uid or pool)
+    out.write("uid,kcv,expected\n" if checking else "uid,kcv\n")
+    cards = rows = 0
+    for uids, _ in fleet:
+        kcvs = fleet_kcvs(master, uids, key_type, key_version, method, length)
+        cards += len(uids)
+        if checking:
+            lines = [f"{uid.hex().upper()},{kcv.hex().upper()},"
+                     f"{expected.hex().upper() if expected else ''}\n"
+                     for uid, kcv, expected in find_mismatches(uids, kcvs, by_uid, pool, length)]
+        else:
+            text = kcvs.hex().upper()
+            width = length * 2
+            lines = [f"{uid.hex().upper()},{text[i * width:(i + 1) * width]}\n"
+                     for i, uid in enumerate(uids)]
+        out.write(''.join(lines))
+        rows += len(lines)
+    return cards, rows
+
+
+def _bench(count):
+    import os
+
+    master = bytes(range(1, 17))
+    uids = [os.urandom(7) for _ in range(count)]
+    cipher_backends.get_backend()
+    print(f"Backend: {cipher_backends.get_backend().name}, {count} UIDs")
+    start = time.perf_counter()
+    kcvs = fleet_kcvs(master, uids)
+    batch_s = time.perf_counter() - start
+    sample = min(count, 20000)
+    start = time.perf_counter()
+    single = b''.join(desfire_keys.kcv(bytes.fromhex(desfire_keys.diversify_key(
+        master.hex(), uid.hex())), 'AES') for uid in uids[:sample])
+    single_s = time.perf_counter() - start
+    if single != kcvs[:len(single)]:
+        raise SystemExit("batch and per-card KCVs differ")
+    print(f"AES KCV   batch {count / batch_s:>12,.0f} cards/s   "
+          f"per-card {sample / single_s:>12,.0f} cards/s")
+
+    # Vendor list with every 1000th card wrong
+    by_uid = {uid: kcvs[i * 3:(i + 1) * 3] for i, uid in enumerate(uids)}
+    for uid in uids[::1000]:
+        by_uid[uid] = b'\x00\x00\x00'
+    start = time.perf_counter()
+    found = sum(1 for _ in find_mismatches(uids, kcvs, by_uid, set(), 3))
+    match_s = time.perf_counter() - start
+    print(f"match     {count / match_s:>12,.0f} cards/s   ({found} mismatches)")
+
+    keys = desfire_keys.diversify_batch_bytes(bytes(range(1, 17)), uids[:sample], '2K3DES')
+    start = time.perf_counter()
+    kcv_batch(keys, '2K3DES')
+    des_s = time.perf_counter() - start
+    print(f"2K3DES KCV      {sample / des_s:>12,.0f} cards/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key check values for master and diversified keys")
+    parser.add_argument('fleet', nargs='?', help="file with one UID (optionally ',SITE') per line")
+    parser.add_argument('--master', help="master key hex")
+    parser.add_argument('--type', default='AES', choices=list(desfire_keys.KEY_TYPES))
+    parser.add_argument('--version', type=lambda v: int(v, 0), default=None,
+                        help="key version in the derived DES keys' parity bits")
+    parser.add_argument('--method', default='zero', choices=desfire_keys.KCV_METHODS,
+                        help="check block: zero (00..) or ones (01.., AES GlobalPlatform)")
+    parser.add_argument('--length', type=int, default=desfire_keys.KCV_LENGTH,
+                        help="KCV bytes")
+    parser.add_argument('--expected', help="'UID,KCV' or 'KCV' lines to match against")
+    parser.add_argument('-o', '--output', help="CSV output (default: stdout)")
+    parser.add_argument('--bench', type=int, metavar='N', help="time batch KCVs for N UIDs")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    if not args.master:
+        parser.error("--master required")
+
+    try:
+        master = desfire_keys.parse_master(args.master, args.type)
+        master_kcv = desfire_keys.kcv(master, args.type, args.method, args.length)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Master KCV ({args.type}, {args.method}): {master_kcv.hex().upper()}", file=sys.stderr)
+    if not args.fleet:
+        return 0
+
+    by_uid, pool = {}, set()
+    start = time.perf_counter()
+    out = open(args.output, 'w', encoding='ascii', newline='') if args.output else sys.stdout
+    try:
+        if args.expected:
+            with open(args.expected, encoding='utf-8') as f:
+                by_uid, pool = read_expected(f, args.length)
+            if not by_uid and not pool:
+                raise ValueError(f"{args.expected}: no expected KCVs")
+        cards, rows = check_fleet(read_fleet(args.fleet), master, args.type, args.version,
+                                  args.method, args.length, by_uid, pool, out)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            out.close()
+    elapsed = time.perf_counter() - start
+    rate = cards / elapsed if elapsed else 0
+    summary = f"{rows} mismatch(es) in " if args.expected else ""
+    print(f"{summary}{cards} cards in {elapsed:.2f}s ({rate:,.0f} cards/s)", file=sys.stderr)
+    return 1 if args.expected and rows else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Master Key Rotation Planner - CyberNinja Edition
+Per-card old/new diversified keys and Proxmark3 changekey commands
+
+The fleet list is read once. For each batch of UIDs the old key
+(to authenticate) and the new key (to write) are derived in the same pass,
+each with its own cached cipher, and the plan is streamed to:
+
+    plan.csv   uid,site,old_key,new_key
+    plan.cmd   one `hf mfdes changekey` per card (run with `pm3 -s plan.cmd`)
+
+Batches are spread over worker processes; output order matches the input.
+
+Usage:
+    python key_rotation.py fleet.txt --old-master <hex> --new-master <hex> \\
+        --csv plan.csv --script plan.cmd [--aid 010203 --keyno 0] [--jobs 8]
+
+Requirements: pip install pycryptodome (or cryptography)
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import desfire_keys
+from hex_format import split_hex
+from pm3_dictionary import NO_SITE, read_fleet
+
+# UIDs per work unit
+BATCH_UIDS = 1 << 16
+CSV_HEADER = "uid,site,old_key,new_key\n"
+
+
+def changekey_command(aid, keyno, old_type, old_key, new_type, new_key, new_version=None):
+    """`hf mfdes changekey` authenticating with the old key and writing the new one"""
+    old_algo = desfire_keys.PM3_KEY_TYPES[old_type]
+    new_algo = desfire_keys.PM3_KEY_TYPES[new_type]
+    cmd = (f"hf mfdes changekey --aid {aid} -n {keyno} -t {old_algo} -k {old_key} "
+           f"--oldalgo {old_algo} --oldkey {old_key} "
+           f"--newkeyno {keyno} --newalgo {new_algo} --newkey {new_key}")
+    if new_version is not None:
+        cmd += f" --newver {new_version:02X}"
+    return cmd
+
+
+class RotationPlan:
+    """Old and new master keys plus the PM3 target (picklable for workers)"""
+
+    def __init__(self, old_master, new_master, old_type='AES', new_type='AES',
+                 old_version=None, new_version=None, aid='000000', keyno=0):
+        self.old_master = desfire_keys.parse_master(old_master, old_type)
+        self.new_master = desfire_keys.parse_master(new_master, new_type)
+        self.old_type = old_type
+        self.new_type = new_type
+        self.old_version = old_version
+        self.new_version = new_version
+        self.aid = aid.upper()
+        self.keyno = keyno
+
+    def derive(self, uids):
+        """(old_keys_hex, new_keys_hex) for a batch of raw UIDs"""
+        old = desfire_keys.diversify_batch_bytes(self.old_master, uids, self.old_type,
+                                                 self.old_version)
+        new = desfire_keys.diversify_batch_bytes(self.new_master, uids, self.new_type,
+                                                 self.new_version)
+        return (split_hex(old, desfire_keys.key_length(self.old_type), ''),
+                split_hex(new, desfire_keys.key_length(self.new_type), ''))
+
+    def render(self, uids, sites):
+        """CSV rows and PM3 script lines for one batch"""
+        old_keys, new_keys = self.derive(uids)
+        uid_hex = [uid.hex().upper() for uid in uids]
+        csv_rows = []
+        script = []
+        for uid, site, old, new in zip(uid_hex, sites, old_keys, new_keys):
+            csv_rows.append(f"{uid},{'' if site == NO_SITE else site},{old},{new}\n")
+            script.append(f"# {uid}\n")
+            script.append(changekey_command(self.aid, self.keyno, self.old_type, old,
+                                            self.new_type, new, self.new_version) + "\n")
+        return ''.join(csv_rows), ''.join(script)
+
+
+def _render_job(args):
+    plan, uids, sites = args
+    return len(uids), plan.render(uids, sites)
+
+
+def _batches(fleet, size):
+    for uids, sites in fleet:
+        for i in range(0, len(uids), size):
+            yield uids[i:i + size], sites[i:i + size]
+
+
+def plan_rotation(fleet, plan, csv_out, script_out, jobs=None, batch=BATCH_UIDS):
+    """Stream the plan for a fleet of (uids, sites) batches; returns cards planned
+
+    At most 2 x jobs batches are in flight, so memory stays bounded.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    csv_out.write(CSV_HEADER)
+    script_out.write(f"# Key rotation: AID {plan.aid} key {plan.keyno}, "
+                     f"{plan.old_type} -> {plan.new_type}\n")
+    work = ((plan, uids, sites) for uids, sites in _batches(fleet, batch))
+    total = 0
+
+    def emit(result):
+        nonlocal total
+        count, (csv_text, script_text) = result
+        csv_out.write(csv_text)
+        script_out.write(script_text)
+        total += count
+
+    if jobs == 1:
+        for job in work:
+            emit(_render_job(job))
+        return total
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for job in work:
+            pending.append(pool.submit(_render_job, job))
+            if len(pending) >= jobs * 2:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a DESFire master key rotation")
+    parser.add_argument('fleet', help="file with one UID (optionally ',SITE') per line")
+    parser.add_argument('--old-master', required=True, help="current master key hex")
+    parser.add_argument('--new-master', required=True, help="new master key hex")
+    key_types = list(desfire_keys.KEY_TYPES)
+    parser.add_argument('--old-type', default='AES', choices=key_types)
+    parser.add_argument('--new-type', default='AES', choices=key_types)
+    version = lambda v: int(v, 0)
+    parser.add_argument('--old-version', type=version, default=None,
+                        help="key version in the current DES keys' parity bits")
+    parser.add_argument('--new-version', type=version, default=None,
+                        help="key version to write with the new keys")
+    parser.add_argument('--aid', default='000000', help="application ID (hex)")
+    parser.add_argument('--keyno', type=int, default=0)
+    parser.add_argument('--csv', default='rotation_plan.csv')
+    parser.add_argument('--script', default='rotation_plan.cmd')
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    try:
+        plan = RotationPlan(args.old_master, args.new_master, args.old_type, args.new_type,
+                            args.old_version, args.new_version, args.aid, args.keyno)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    try:
+        with open(args.csv, 'w', encoding='ascii', newline='') as csv_out, \
+                open(args.script, 'w', encoding='ascii', newline='\n') as script_out:
+            total = plan_rotation(read_fleet(args.fleet), plan, csv_out, script_out, args.jobs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed else 0
+    print(f"{total} cards planned -> {args.csv}, {args.script} in {elapsed:.2f}s "
+          f"({rate:,.0f} cards/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Derived Key Store - CyberNinja Edition
+Compact UID -> derived key cache for key management
+
+Records are fixed width (UID length || UID zero-padded to uid_len || key,
+24 bytes for 7-byte UIDs and AES keys) packed into one bytearray or a
+memory-mapped file, sorted by UID. The length byte keeps a 4-byte UID apart
+from a 7-byte UID that starts with the same bytes followed by zeros.
+A sparse index holds every 64th UID; a lookup bisects the index and then
+runs one find() over that 64-record block in place (no copy, no per-record
+Python work).
+
+Appends land in an unsorted tail and are merged in on the next lookup, so
+bulk loads pay for one sort instead of one insert per card.
+
+File layout: 16-byte header ('KKS2', uid_len, key_len, count) + records.
+
+Usage:
+    python key_store.py --bench 1000000      # memory + lookups vs dict of hex
+
+Requirements: none (standard library only; pycryptodome for derive())
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_right
+from itertools import compress, islice
+from operator import eq, itemgetter
+
+import desfire_keys
+
+MAGIC = b'KKS2'
+# Records without a UID length byte; ambiguous for short UIDs
+OLD_MAGIC = b'KKS1'
+_HEADER = struct.Struct('<4sBBxxQ')
+
+# Records per sparse-index entry
+INDEX_STRIDE = 64
+
+
+class KeyStore:
+    """UID -> key records sorted by UID; later writes for a UID win"""
+
+    def __init__(self, uid_len=7, key_len=16):
+        self.uid_len = uid_len
+        self.key_len = key_len
+        # Length byte + padded UID: the sort / search field of a record
+        self.field_len = 1 + uid_len
+        self.record_size = self.field_len + key_len
+        self._data = bytearray()
+        self._base = 0
+        self._size = 0
+        self._tail = bytearray()
+        self._mmap = None
+        self._index = []
+
+    # ─── Persistence ───
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a saved store read-only (appends stay in memory until save)"""
+        with open(path, 'rb') as f:
+            magic, uid_len, key_len, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic == OLD_MAGIC:
+                raise ValueError(f"{path}: KKS1 key store without UID lengths; re-derive it")
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a key store")
+            store = cls(uid_len, key_len)
+            if count:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                size = count * store.record_size
+                if len(mapped) < _HEADER.size + size:
+                    mapped.close()
+                    raise ValueError(f"{path}: truncated key store")
+                store._mmap = store._data = mapped
+                store._base = _HEADER.size
+                store._size = size
+        store._build_index()
+        return store
+
+    def save(self, path):
+        self._compact()
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, self.uid_len, self.key_len, len(self)))
+            f.write(self._records_bytes())
+        os.replace(tmp, path)
+
+    def _records_bytes(self):
+        return self._data[self._base:self._base + self._size]
+
+    def _set_data(self, data):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._data = data
+        self._base = 0
+        self._size = len(data)
+
+    def close(self):
+        """Copy mapped records into memory and release the file"""
+        if self._mmap is not None:
+            self._set_data(bytearray(self._records_bytes()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Writes ───
+
+    def _raw_uid(self, uid):
+        if isinstance(uid, str):
+            uid = bytes.fromhex(uid.replace(" ", ""))
+        if len(uid) > self.uid_len:
+            raise ValueError(f"UID too long (>{self.uid_len} bytes)")
+        return bytes(uid)
+
+    def _uid(self, uid):
+        """Record field of a UID: length byte || UID zero-padded to uid_len"""
+        if type(uid) is bytes and len(uid) == self.uid_len:
+            return bytes((self.uid_len,)) + uid
+        uid = self._raw_uid(uid)
+        return bytes((len(uid),)) + uid.ljust(self.uid_len, b'\x00')
+
+    def add(self, uid, key):
+        if len(key) != self.key_len:
+            raise ValueError(f"Key must be {self.key_len} bytes")
+        self._tail += self._uid(uid)
+        self._tail += key
+
+    def add_batch(self, uids, keys):
+        """Bulk append; `keys` is the concatenated key blob (diversify_batch_bytes)"""
+        uids = [self._uid(uid) for uid in uids]
+        if len(keys) != len(uids) * self.key_len:
+            raise ValueError("Key blob length does not match the UID count")
+        k = self.key_len
+        self._tail += b''.join([uid + keys[i * k:(i + 1) * k] for i, uid in enumerate(uids)])
+
+    def derive(self, master_key, uids, key_type='AES', key_version=None):
+        """Derive and add the keys for many UIDs in one cipher call"""
+        uids = [self._raw_uid(uid) for uid in uids]
+        self.add_batch(uids, desfire_keys.diversify_batch_bytes(
+            master_key, uids, key_type, key_version))
+
+    def merge(self, other):
+        """Add every record of another store; its keys win on equal UIDs"""
+        if (other.uid_len, other.key_len) != (self.uid_len, self.key_len):
+            raise ValueError("Key stores have different record layouts")
+        other._compact()
+        self._tail += other._records_bytes()
+
+    # ─── Sorting / index ───
+
+    def _records(self, buf, start=0, size=None):
+        w = self.record_size
+        end = start + (len(buf) if size is None else size)
+        return [bytes(buf[i:i + w]) for i in range(start, end, w)]
+
+    def _compact(self):
+        """Sort the tail into the main records (stable: later records win)"""
+        if not self._tail:
+            return
+        records = self._records(self._data, self._base, self._size) + self._records(self._tail)
+        uid_of = itemgetter(slice(0, self.field_len))
+        records.sort(key=uid_of)
+        uids = list(map(uid_of, records))
+        # Drop every record whose successor has the same UID
+        stale = list(compress(range(len(uids) - 1), map(eq, uids, islice(uids, 1, None))))
+        for i in reversed(stale):
+            del records[i]
+        self._set_data(bytearray(b''.join(records)))
+        self._tail = bytearray()
+        self._build_index()
+
+    def _build_index(self):
+        step = self.record_size * INDEX_STRIDE
+        n = self.field_len
+        data = self._data
+        base = self._base
+        self._index = [bytes(data[i:i + n]) for i in range(base, base + self._size, step)]
+
+    # ─── Lookups ───
+
+    def __len__(self):
+        return (self._size + len(self._tail)) // self.record_size
+
+    def get(self, uid, default=None):
+        """Derived key bytes for a UID (bytes or hex), or `default`"""
+        uid = self._uid(uid)
+        if self._tail:
+            self._compact()
+        block = bisect_right(self._index, uid) - 1
+        if block < 0:
+            return default
+        data = self._data
+        w = self.record_size
+        start = self._base + block * INDEX_STRIDE * w
+        end = min(start + INDEX_STRIDE * w, self._base + self._size)
+        pos = data.find(uid, start, end)
+        # A hit straddling two records is not a UID; keep looking
+        while pos >= 0 and (pos - start) % w:
+            pos = data.find(uid, pos + 1, end)
+        if pos < 0:
+            return default
+        return bytes(data[pos + self.field_len:pos + w])
+
+    def get_many(self, uids):
+        """Keys for many UIDs in input order (None where missing)"""
+        return [self.get(uid) for uid in uids]
+
+    def __contains__(self, uid):
+        return self.get(uid) is not None
+
+    def __iter__(self):
+        """(uid, key) pairs in UID order"""
+        self._compact()
+        data = self._data
+        w = self.record_size
+        n = self.field_len
+        for off in range(self._base, self._base + self._size, w):
+            yield bytes(data[off + 1:off + 1 + data[off]]), bytes(data[off + n:off + w])
+
+    def memory_bytes(self):
+        """Approximate bytes held by records, tail and sparse index"""
+        index = sys.getsizeof(self._index) + sum(sys.getsizeof(u) for u in self._index)
+        return self._size + len(self._tail) + index
+
+
+def _bench(count):
+    import random
+    import time
+    import tracemalloc
+
+    master = bytes(range(1, 17))
+    uids = [os.urandom(7) for _ in range(count)]
+    keys = desfire_keys.diversify_batch_bytes(master, uids)
+    probes = [uids[random.randrange(count)] for _ in range(200000)]
+    hex_probes = [u.hex().upper() for u in probes]
+
+    # Baseline: {uid_hex: key_hex}, the shape self.results uses per card
+    tracemalloc.start()
+    start = time.perf_counter()
+    table = {u.hex().upper(): keys[i * 16:(i + 1) * 16].hex().upper()
+             for i, u in enumerate(uids)}
+    build_dict = time.perf_counter() - start
+    dict_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for u in hex_probes:
+        table[u]
+    dict_rate = len(probes) / (time.perf_counter() - start)
+    del table
+
+    start = time.perf_counter()
+    store = KeyStore()
+    store.add_batch(uids, keys)
+    store._compact()
+    build_store = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for u in probes:
+        store.get(u)
+    store_rate = len(probes) / (time.perf_counter() - start)
+
+    print(f"{count} records")
+    print(f"dict of hex   {dict_mem / count:6.1f} B/record  build {build_dict:6.2f}s  "
+          f"{dict_rate:>12,.0f} lookups/s")
+    print(f"KeyStore      {store.memory_bytes() / count:6.1f} B/record  build {build_store:6.2f}s  "
+          f"{store_rate:>12,.0f} lookups/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact derived key store")
+    parser.add_argument('--bench', type=int, metavar='N', default=1000000,
+                        help="compare N records against a dict of hex strings")
+    _bench(parser.parse_args().bench)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Stage Timing Instrumentation - Kobe's Keys Edition
+Opt-in timers and counters for the calculator tools
+
+Enable with KOBE_PERF=1, or press Ctrl+Shift+P in any GUI to toggle.
+On exit (or when toggled off) results are written to:
+    KOBE_PERF_OUT=stats.json     histograms per stage
+    KOBE_PERF_TRACE=trace.json   Chrome trace (chrome://tracing / Perfetto)
+
+When disabled every hook is a single flag check.
+
+Requirements: none (standard library only)
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+# Max individual events kept for the Chrome trace (oldest dropped first)
+TRACE_LIMIT = 100_000
+
+
+class _State:
+    enabled = os.environ.get("KOBE_PERF", "").strip() not in ("", "0")
+    lock = threading.Lock()
+    stages = {}
+    counters = {}
+    events = deque(maxlen=TRACE_LIMIT)
+    origin_ns = time.perf_counter_ns()
+
+
+class _Histogram:
+    """Log2 histogram of durations in nanoseconds"""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = {}
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        bucket = ns.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, pct):
+        """Upper bound (ns) of the bucket holding the given percentile"""
+        if not self.count:
+            return 0
+        target = self.count * pct / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(1 << bucket, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1e6,
+            "mean_us": (self.total / self.count / 1e3) if self.count else 0.0,
+            "min_us": (self.min or 0) / 1e3,
+            "max_us": self.max / 1e3,
+            "p50_us": self.percentile(50) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            # Bucket key is the upper bound in ns (2**n)
+            "buckets": {str(1 << b): n for b, n in sorted(self.buckets.items())},
+        }
+
+
+def _record(name, start_ns, end_ns):
+    with _State.lock:
+        hist = _State.stages.get(name)
+        if hist is None:
+            hist = _State.stages[name] = _Histogram()
+        hist.add(end_ns - start_ns)
+        _State.events.append((name, start_ns, end_ns, threading.get_ident()))
+
+
+class _NullStage:
+    """Shared do-nothing context used while instrumentation is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+def is_enabled():
+    return _State.enabled
+
+
+def enable(flag=True):
+    """Turn instrumentation on or off at runtime"""
+    _State.enabled = bool(flag)
+
+
+def stage(name):
+    """Context manager timing one stage: `with stage("kantech.parse"): ...`"""
+    if not _State.enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def timed(name):
+    """Decorator timing every call of a function as stage `name`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Increment a named counter"""
+    if not _State.enabled:
+        return
+    with _State.lock:
+        _State.counters[name] = _State.counters.get(name, 0) + n
+
+
+def reset():
+    with _State.lock:
+        _State.stages.clear()
+        _State.counters.clear()
+        _State.events.clear()
+        _State.origin_ns = time.perf_counter_ns()
+
+
+def snapshot():
+    """Return stage histograms and counters as a plain dict"""
+    with _State.lock:
+        return {
+            "stages": {name: h.as_dict() for name, h in sorted(_State.stages.items())},
+            "counters": dict(sorted(_State.counters.items())),
+        }
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def export_chrome_trace(path):
+    """Write recorded events in Chrome trace-event format"""
+    pid = os.getpid()
+    with _State.lock:
+        origin = _State.origin_ns
+        events = [
+            {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - origin) / 1e3,
+                "dur": (end - start) / 1e3,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, end, tid in _State.events
+        ]
+        for name, value in _State.counters.items():
+            events.append({"name": name, "ph": "C", "ts": 0, "pid": pid,
+                           "args": {"value": value}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def report(stream=None):
+    """Print a one-line-per-stage summary"""
+    stream = stream or sys.stderr
+    snap = snapshot()
+    for name, h in snap["stages"].items():
+        stream.write(
+            f"{name:<28} n={h['count']:<7} mean={h['mean_us']:>10.1f}us "
+            f"p50<={h['p50_us']:>10.1f}us p99<={h['p99_us']:>10.1f}us "
+            f"max={h['max_us']:>10.1f}us\n"
+        )
+    for name, value in snap["counters"].items():
+        stream.write(f"{name:<28} count={value}\n")
+
+
+def flush():
+    """Export to the paths configured by KOBE_PERF_OUT / KOBE_PERF_TRACE"""
+    out = os.environ.get("KOBE_PERF_OUT")
+    trace = os.environ.get("KOBE_PERF_TRACE")
+    if out:
+        export_json(out)
+    if trace:
+        export_chrome_trace(trace)
+
+
+def install_toggle(window, tool_name):
+    """Bind the hidden Ctrl+Shift+P debug toggle on a Tk window"""
+    def toggle(_event=None):
+        if _State.enabled:
+            print(f"[perf] {tool_name} instrumentation OFF", file=sys.stderr)
+            report()
+            flush()
+            enable(False)
+        else:
+            reset()
+            enable(True)
+            print(f"[perf] {tool_name} instrumentation ON", file=sys.stderr)
+
+    # Tk reports Shift+P as the uppercase keysym
+    window.bind("<Control-P>", toggle)
+    window.bind("<Control-Shift-P>", toggle)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _State.stages or _State.counters:
+        flush()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Plugin Registry - Kobe's Keys Edition
+Credential formats and key diversifiers registered by metadata, imported on use
+
+Kinds:
+    format        callable(site, card) -> dict of representations
+                  (like credential_codec.kantech_values)
+    diversifier   callable(master_hex, uid_hex, **options) -> key hex
+                  (like desfire_keys.diversify_key)
+
+Sources, all read without importing a plugin module:
+    built-in      the Kantech / RBH formats and the ECB / AN10922 diversifiers
+    entry points  groups 'kobes_keys.formats' and 'kobes_keys.diversifiers'
+                  (name = module:attribute in the package metadata), read
+                  from the entry_points.txt of every distribution on sys.path;
+                  importing importlib.metadata alone would cost ~45 ms
+    directories   plugins/ next to this file and KOBE_PLUGIN_PATH entries;
+                  each *.py declares a literal PLUGIN dict that is read with
+                  ast, so its imports (NumPy, pycryptodome, ...) only run when
+                  the plugin is first used:
+
+        PLUGIN = {'name': 'hid-26', 'kind': 'format', 'entry': 'h10301_values',
+                  'title': 'HID H10301 26-bit', 'requires': ['numpy']}
+
+Usage:
+    python plugins.py list
+    python plugins.py run kantech 8020 11485
+    python plugins.py run an10922 <master hex> <uid hex>
+    python plugins.py --bench 50
+
+Requirements: none (each plugin lists its own)
+"""
+
+import argparse
+import ast
+import importlib
+import importlib.util
+import os
+import sys
+import time
+
+KINDS = ('format', 'diversifier')
+ENTRY_POINT_GROUPS = {
+    'kobes_keys.formats': 'format',
+    'kobes_keys.diversifiers': 'diversifier',
+}
+PLUGIN_PATH_ENV = 'KOBE_PLUGIN_PATH'
+DEFAULT_PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+
+BUILTINS = (
+    ('kantech', 'format', 'credential_codec:kantech_values', 'Kantech 16-bit site / card', ()),
+    ('rbh', 'format', 'credential_codec:rbh_values', 'RBH 50-bit', ()),
+    ('desfire-ecb', 'diversifier', 'desfire_keys:diversify_key',
+     'DESFire CBC (UID || 00..)', ('pycryptodome',)),
+    ('an10922', 'diversifier', 'salto_keys:derive_key', 'AN10922 CMAC (Salto, PM3 --kdf 1)',
+     ('pycryptodome',)),
+)
+
+
+class Plugin:
+    """One registered plugin: metadata now, the callable on first load()"""
+
+    __slots__ = ('name', 'kind', 'target', 'title', 'requires', 'source', '_path', '_loaded')
+
+    def __init__(self, name, kind, target, title='', requires=(), source='built-in', path=None):
+        if kind not in KINDS:
+            raise ValueError(f"{name}: unknown plugin kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.title = title
+        self.requires = tuple(requires)
+        self.source = source
+        self._path = path
+        self._loaded = None
+
+    @property
+    def loaded(self):
+        return self._loaded is not None
+
+    def load(self):
+        if self._loaded is None:
+            module_name, _, attribute = self.target.partition(':')
+            if self._path is not None:
+                module = _import_file(module_name, self._path)
+            else:
+                module = importlib.import_module(module_name)
+            try:
+                self._loaded = getattr(module, attribute)
+            except AttributeError:
+                raise ValueError(f"{self.name}: {module_name} has no {attribute}") from None
+        return self._loaded
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"Plugin({self.name!r}, {self.kind!r}, {self.target!r})"
+
+
+def _import_file(module_name, path):
+    module = sys.modules.get(module_name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+    return module
+
+
+# ─── Discovery ───
+
+def read_manifest(path):
+    """The literal PLUGIN dict of a plugin file, or None (nothing is executed)"""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id == 'PLUGIN'):
+            try:
+                manifest = ast.literal_eval(node.value)
+            except ValueError:
+                raise ValueError(f"{path}: PLUGIN must be a literal dict") from None
+            if not isinstance(manifest, dict):
+                raise ValueError(f"{path}: PLUGIN must be a literal dict")
+            return manifest
+    return None
+
+
+def entry_points(groups):
+    """(group, name, module:attribute, distribution) from installed metadata"""
+    seen = set()
+    for directory in sys.path:
+        try:
+            names = os.listdir(directory or '.')
+        except OSError:
+            continue
+        for name in names:
+            if not name.endswith(('.dist-info', '.egg-info')):
+                continue
+            dist = name.rsplit('.', 1)[0].split('-')[0]
+            if dist in seen:
+                continue
+            try:
+                with open(os.path.join(directory, name, 'entry_points.txt'),
+                          encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            seen.add(dist)
+            group = None
+            for line in lines:
+                line = line.strip()
+                if line.startswith('['):
+                    group = line.strip('[]').strip()
+                elif group in groups and '=' in line and not line.startswith(('#', ';')):
+                    ep_name, _, value = line.partition('=')
+                    yield group, ep_name.strip(), value.split('[')[0].strip(), dist
+
+
+def plugin_dirs():
+    dirs = [DEFAULT_PLUGIN_DIR]
+    dirs.extend(p for p in os.environ.get(PLUGIN_PATH_ENV, '').split(os.pathsep) if p)
+    return dirs
+
+
+class Registry:
+    """Plugins by name; later sources override earlier ones"""
+
+    def __init__(self):
+        self.plugins = {}
+        self.errors = []
+
+    def add(self, plugin):
+        self.plugins[plugin.name] = plugin
+        return plugin
+
+    def discover(self, dirs=None, use_entry_points=True):
+        for name, kind, target, title, requires in BUILTINS:
+            self.add(Plugin(name, kind, target, title, requires))
+        if use_entry_points:
+            for group, name, target, dist in entry_points(ENTRY_POINT_GROUPS):
+                self.add(Plugin(name, ENTRY_POINT_GROUPS[group], target,
+                                source=f"entry point ({dist})"))
+        for directory in plugin_dirs() if dirs is None else dirs:
+            self.scan(directory)
+        return self
+
+    def scan(self, directory):
+        """Register every plugin file of a directory (bad manifests are collected)"""
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return
+        for filename in names:
+            if not filename.endswith('.py') or filename.startswith('_'):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                manifest = read_manifest(path)
+                if manifest is None:
+                    continue
+                module_name = f"kobe_plugins.{filename[:-3]}"
+                self.add(Plugin(manifest['name'], manifest['kind'],
+                                f"{module_name}:{manifest['entry']}",
+                                manifest.get('title', ''), manifest.get('requires', ()),
+                                source=path, path=path))
+            except (OSError, SyntaxError, KeyError, ValueError) as e:
+                self.errors.append(f"{path}: {e}")
+
+    def get(self, name, kind=None):
+        plugin = self.plugins.get(name)
+        if plugin is None or (kind is not None and plugin.kind != kind):
+            raise ValueError(f"Unknown {kind or 'plugin'}: {name}")
+        return plugin
+
+    def names(self, kind=None):
+        return sorted(name for name, p in self.plugins.items() if kind is None or p.kind == kind)
+
+
+_default = None
+
+
+def registry():
+    """The process-wide registry, discovered on first use"""
+    global _default
+    if _default is None:
+        _default = Registry().discover()
+    return _default
+
+
+# ─── Startup benchmark ───
+
+_DUMMY = '''import numpy
+
+# Import-time work a real format would do (lookup tables)
+_HEX = [format(i, '04X') for i in range(4096)]
+
+PLUGIN = {{'name': 'dummy-{n}', 'kind': 'format', 'entry': 'values',
+          'title': 'Dummy format {n}', 'requires': ['numpy']}}
+
+
+def values(site, card):
+    return {{'combined': format((site << 16) | card, '08X')}}
+'''
+
+
+def _time_python(code, runs=5):
+    import subprocess
+
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _bench(count):
+    import tempfile
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as root:
+        empty = os.path.join(root, 'empty')
+        full = os.path.join(root, 'full')
+        os.mkdir(empty)
+        os.mkdir(full)
+        for n in range(count):
+            with open(os.path.join(full, f"dummy_{n}.py"), 'w', encoding='utf-8') as f:
+                f.write(_DUMMY.format(n=n))
+        setup = f"import sys; sys.path.insert(0, {here!r}); import plugins; "
+        base = _time_python(f"import sys; sys.path.insert(0, {here!r})")
+        rows = [
+            ("interpreter only", base),
+            ("discover, no plugins",
+             _time_python(setup + f"plugins.Registry().discover([{empty!r}])")),
+            (f"discover, {count} plugins",
+             _time_python(setup + f"plugins.Registry().discover([{full!r}])")),
+            ("discover + first use of one",
+             _time_python(setup + f"r = plugins.Registry().discover([{full!r}]); "
+                                  f"r.get('dummy-0')(1, 2)")),
+            (f"eager import of all {count}",
+             _time_python(setup + f"r = plugins.Registry().discover([{full!r}]); "
+                                  f"[r.get(n).load() for n in r.names('format')]")),
+        ]
+    for label, seconds in rows:
+        print(f"{label:32} {seconds * 1000:8.1f} ms   (+{(seconds - base) * 1000:6.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Credential format / key diversifier plugins")
+    parser.add_argument('command', nargs='?', choices=('list', 'run'), default='list')
+    parser.add_argument('name', nargs='?', help="plugin to run")
+    parser.add_argument('args', nargs='*', help="site card (format) or master uid (diversifier)")
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help="startup time with N dummy plugins, lazy vs eager")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return 0
+
+    reg = registry()
+    for error in reg.errors:
+        print(f"skipped {error}", file=sys.stderr)
+    if args.command == 'list':
+        for kind in KINDS:
+            print(f"{kind}s:")
+            for name in reg.names(kind):
+                p = reg.get(name)
+                requires = f"  [{', '.join(p.requires)}]" if p.requires else ""
+                print(f"  {name:16} {p.title or p.target}  ({p.source}){requires}")
+        return 0
+
+    if not args.name:
+        parser.error("plugin name required")
+    try:
+        plugin = reg.get(args.name)
+        if plugin.kind == 'format':
+            if len(args.args) != 2:
+                parser.error("format plugins take: site card")
+            result = plugin(int(args.args[0]), int(args.args[1]))
+        else:
+            if len(args.args) != 2:
+                parser.error("diversifier plugins take: master uid")
+            result = {'key': plugin(*args.args)}
+    except ImportError as e:
+        print(f"{args.name}: missing dependency: {e.name or e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for key, value in result.items():
+        print(f"{key:16} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+HID H10301 26-bit - Kobe's Keys Edition
+Format plugin: [P even][Facility (8-bit)][Card (16-bit)][P odd]
+
+Even parity covers the first 12 data bits, odd parity the last 12.
+"""
+
+PLUGIN = {
+    'name': 'hid-h10301',
+    'kind': 'format',
+    'entry': 'h10301_values',
+    'title': 'HID H10301 26-bit',
+}
+
+FACILITY_MAX = 0xFF
+CARD_MAX = 0xFFFF
+
+
+def h10301_values(site_code, card_number):
+    """Compute the H10301 representations (site_code = facility code)"""
+    if not 0 <= site_code <= FACILITY_MAX:
+        raise ValueError("Facility Code must be 0-255 (8-bit)")
+    if not 0 <= card_number <= CARD_MAX:
+        raise ValueError("Card Number must be 0-65535 (16-bit)")
+    data = (site_code << 16) | card_number
+    p_even = bin(data >> 12).count('1') & 1
+    p_odd = (bin(data & 0xFFF).count('1') & 1) ^ 1
+    full = (p_even << 25) | (data << 1) | p_odd
+
+    results = {}
+    results['site_hex'] = format(site_code, '02X')
+    results['card_hex'] = format(card_number, '04X')
+    results['data_24bit_hex'] = format(data, '06X')
+    results['full_26bit_bin'] = format(full, '026b')
+    results['full_26bit_hex'] = format(full, '07X')
+    results['full_26bit_dec'] = str(full)
+    return results
\ No newline at end of file
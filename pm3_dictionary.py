@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Proxmark3 Key Dictionary Exporter - CyberNinja Edition
+Derive every card key of a fleet and write a deduplicated .dic file
+
+Fleet file: one UID per line, optionally followed by a site label
+    040C6FFA1D2090
+    04A1B2C3D4E5F6,4000
+
+Keys are derived in runs, each run is sorted and deduplicated in memory and
+spilled to a temp file as fixed-width records; the runs are then merged
+(heapq) so the full key set never has to fit in RAM. The .dic is written
+while the merge streams.
+
+Order:
+    key        sorted by key value (default)
+    frequency  keys shared by most UIDs first (clones, duplicate UIDs)
+    site       lowest site label first, most shared first within a site
+
+Usage:
+    python pm3_dictionary.py fleet.txt --master 0102...0F10 -o fleet.dic
+    python pm3_dictionary.py fleet.txt --master <48 hex> --key-type 3K3DES --order frequency
+
+Requirements: pip install pycryptodome (or cryptography)
+"""
+
+import argparse
+import heapq
+import os
+import re
+import sys
+import tempfile
+import time
+from itertools import islice
+
+import desfire_keys
+from hex_format import split_hex
+
+# Records held in memory before a run is spilled to disk
+RUN_RECORDS = 1 << 20
+# Run files merged at once; more runs are merged in several passes
+MAX_FAN_IN = 64
+
+ORDERS = ('key', 'frequency', 'site')
+
+# Site value read_fleet reports for UIDs listed without a site
+NO_SITE = 0xFFFFFFFF
+_ONE = (1).to_bytes(4, 'big')
+
+# One match per line: (uid, site); blank and comment lines match with no uid
+_FLEET = re.compile(
+    r'^[ \t]*(?:([0-9A-Fa-f]+)(?:[ \t]*[,; \t][ \t]*(\d+))?|#.*|)[ \t]*\r?$', re.M)
+
+
+def _check_fleet_lines(path, lines, first_line):
+    """Raise ValueError naming the first line of a block that does not parse"""
+    for line_no, line in enumerate(lines, first_line):
+        match = _FLEET.fullmatch(line.rstrip('\n'))
+        if match is None or len(match.group(1) or '') % 2 or \
+                int(match.group(2) or 0) >= NO_SITE:
+            raise ValueError(f"{path}:{line_no}: bad fleet line: {line.strip()}")
+
+
+def read_fleet(path, batch=RUN_RECORDS):
+    """Yield (uids, sites) lists of about `batch` rows from 'UID[,SITE]' lines
+
+    Each block of lines is parsed with one regex pass.
+    """
+    uids = []
+    sites = []
+    line_no = 1
+    with open(path, encoding='utf-8') as f:
+        while True:
+            lines = f.readlines(1 << 22)
+            if not lines:
+                break
+            text = ''.join(lines)
+            matches = _FLEET.findall(text)
+            if text.endswith('\n'):
+                matches.pop()
+            try:
+                if len(matches) != len(lines):
+                    raise ValueError
+                rows = [m for m in matches if m[0]]
+                uids.extend([bytes.fromhex(uid) for uid, _ in rows])
+                sites.extend([int(site) if site else NO_SITE for _, site in rows])
+                if sites and max(sites) > NO_SITE:
+                    raise ValueError
+            except ValueError:
+                _check_fleet_lines(path, lines, line_no)
+                raise
+            line_no += len(lines)
+            if len(uids) >= batch:
+                yield uids, sites
+                uids = []
+                sites = []
+    if uids:
+        yield uids, sites
+
+
+class ExternalSorter:
+    """Sort fixed-width byte records through sorted run files
+
+    `combine`, if given, collapses records with equal keys inside a sorted
+    stream; it is applied to every run and again during the merge.
+    """
+
+    def __init__(self, record_size, tmp_dir, run_records=RUN_RECORDS, combine=None):
+        self.record_size = record_size
+        self.tmp_dir = tmp_dir
+        self.run_records = run_records
+        self.combine = combine or iter
+        self.runs = []
+        self._pending = []
+        self._names = 0
+
+    def add(self, records):
+        self._pending.extend(records)
+        if len(self._pending) >= self.run_records:
+            self._spill()
+
+    def _run_path(self):
+        self._names += 1
+        return os.path.join(self.tmp_dir, f"run{id(self):x}_{self._names:05d}.bin")
+
+    def _write_run(self, records):
+        path = self._run_path()
+        with open(path, 'wb') as f:
+            batch = list(islice(records, 65536))
+            while batch:
+                f.write(b''.join(batch))
+                batch = list(islice(records, 65536))
+        return path
+
+    def _spill(self):
+        self._pending.sort()
+        self.runs.append(self._write_run(self.combine(self._pending)))
+        self._pending = []
+
+    def _read_run(self, path):
+        size = self.record_size
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(size * 16384)
+                if not block:
+                    break
+                yield from (block[i:i + size] for i in range(0, len(block), size))
+        os.unlink(path)
+
+    def __iter__(self):
+        """Sorted (and combined) records; run files are removed as they drain"""
+        if not self.runs:
+            self._pending.sort()
+            records, self._pending = self._pending, []
+            yield from self.combine(records)
+            return
+        if self._pending:
+            self._spill()
+        runs, self.runs = self.runs, []
+        while len(runs) > MAX_FAN_IN:
+            group, runs = runs[:MAX_FAN_IN], runs[MAX_FAN_IN:]
+            merged = heapq.merge(*(self._read_run(p) for p in group))
+            runs.append(self._write_run(self.combine(merged)))
+        yield from self.combine(heapq.merge(*(self._read_run(p) for p in runs)))
+
+
+def combine_counts(key_len):
+    """Combiner for key||site||count records: counts add up, lowest site wins"""
+    head = key_len + 4
+
+    def combine(records):
+        records = iter(records)
+        first = next(records, None)
+        if first is None:
+            return
+        key = first[:key_len]
+        group = first
+        total = None
+        for rec in records:
+            if rec[:key_len] != key:
+                if total is None:
+                    yield group
+                else:
+                    yield group[:head] + min(total, NO_SITE).to_bytes(4, 'big')
+                    total = None
+                key = rec[:key_len]
+                group = rec
+                continue
+            # Sorted records: the first of a group already has the lowest site
+            if total is None:
+                total = int.from_bytes(group[head:], 'big')
+            total += int.from_bytes(rec[head:], 'big')
+        if total is None:
+            yield group
+        else:
+            yield group[:head] + min(total, NO_SITE).to_bytes(4, 'big')
+    return combine
+
+
+def derive_records(fleet, masters, key_type='AES', key_version=None):
+    """Yield lists of key||site||count records, one cipher call per batch and master
+
+    `fleet` yields (uids, sites) batches as read_fleet does.
+    """
+    key_len = desfire_keys.key_length(key_type)
+    for uids, sites in fleet:
+        tails = [site.to_bytes(4, 'big') + _ONE for site in sites]
+        for master in masters:
+            blob = desfire_keys.diversify_batch_bytes(master, uids, key_type, key_version)
+            yield [blob[i * key_len:(i + 1) * key_len] + tail for i, tail in enumerate(tails)]
+
+
+def unique_keys(fleet, masters, key_type='AES', key_version=None, order='key',
+                tmp_dir=None, run_records=RUN_RECORDS, stats=False):
+    """Yield each distinct derived key once, in the given order
+
+    With `stats`, yields (key, count, site) instead; `site` is None for UIDs
+    listed without a site label.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order: {order}")
+    key_len = desfire_keys.key_length(key_type)
+    with tempfile.TemporaryDirectory(prefix='pm3dic_', dir=tmp_dir) as tmp:
+        dedup = ExternalSorter(key_len + 8, tmp, run_records, combine_counts(key_len))
+        for records in derive_records(fleet, masters, key_type, key_version):
+            dedup.add(records)
+
+        if order == 'key':
+            if not stats:
+                yield from (rec[:key_len] for rec in dedup)
+                return
+            for rec in dedup:
+                site = int.from_bytes(rec[key_len:key_len + 4], 'big')
+                yield (rec[:key_len], int.from_bytes(rec[key_len + 4:], 'big'),
+                       None if site == NO_SITE else site)
+            return
+
+        # Re-sort the distinct keys on a big-endian prefix; ~count sorts
+        # the most shared keys first
+        ranked = ExternalSorter(key_len + 8, tmp, run_records)
+        batch = []
+        for rec in dedup:
+            site = rec[key_len:key_len + 4]
+            rank = (NO_SITE - int.from_bytes(rec[key_len + 4:], 'big')).to_bytes(4, 'big')
+            prefix = rank + site if order == 'frequency' else site + rank
+            batch.append(prefix + rec[:key_len])
+            if len(batch) >= 65536:
+                ranked.add(batch)
+                batch = []
+        ranked.add(batch)
+        if not stats:
+            yield from (rec[8:] for rec in ranked)
+            return
+        for rec in ranked:
+            if order == 'frequency':
+                rank, site = rec[:4], rec[4:8]
+            else:
+                site, rank = rec[:4], rec[4:8]
+            count = NO_SITE - int.from_bytes(rank, 'big')
+            site = int.from_bytes(site, 'big')
+            yield rec[8:], count, None if site == NO_SITE else site
+
+
+def write_dic(path, keys, header=None):
+    """Stream keys (bytes, one length) to a PM3 dictionary, one uppercase hex key per line"""
+    written = 0
+    with open(path, 'w', encoding='ascii', newline='\n') as out:
+        if header:
+            out.write(f"# {header}\n")
+        while True:
+            batch = list(islice(keys, 65536))
+            if not batch:
+                break
+            width = len(batch[0])
+            data = b''.join(batch)
+            if len(data) != width * len(batch):
+                raise ValueError("Dictionary keys must all have the same length")
+            batch = split_hex(data, width, '')
+            out.write('\n'.join(batch))
+            out.write('\n')
+            written += len(batch)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a deduplicated PM3 DESFire key dictionary")
+    parser.add_argument('fleet', help="file with one UID (optionally ',SITE') per line")
+    parser.add_argument('--master', action='append', required=True,
+                        help="master key hex, repeatable")
+    parser.add_argument('--key-type', default='AES', choices=list(desfire_keys.KEY_TYPES))
+    parser.add_argument('--key-version', type=lambda v: int(v, 0), default=None,
+                        help="DES key version for the parity bits (e.g. 0x01)")
+    parser.add_argument('--order', default='key', choices=ORDERS)
+    parser.add_argument('-o', '--output', default='fleet_keys.dic')
+    parser.add_argument('--run-records', type=int, default=RUN_RECORDS,
+                        help="records sorted in memory per run")
+    parser.add_argument('--tmp', default=None, help="directory for run files")
+    args = parser.parse_args()
+
+    try:
+        masters = [desfire_keys.parse_master(m, args.key_type) for m in args.master]
+    except ValueError as e:
+        parser.error(str(e))
+
+    uid_count = 0
+
+    def counted(fleet):
+        nonlocal uid_count
+        for uids, sites in fleet:
+            uid_count += len(uids)
+            yield uids, sites
+
+    start = time.perf_counter()
+    try:
+        fleet = counted(read_fleet(args.fleet, args.run_records))
+        keys = unique_keys(fleet, masters, args.key_type, args.key_version,
+                           args.order, args.tmp, args.run_records)
+        written = write_dic(args.output, keys,
+                            f"DESFire {args.key_type} diversified keys ({args.order} order)")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    derived = uid_count * len(masters)
+    print(f"{uid_count} UIDs x {len(masters)} master(s): {derived} derived, "
+          f"{written} unique -> {args.output} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Proxmark3 Dump Loader - Kobe's Keys Edition
+Load .bin / .eml / .json dumps and search them for Kantech / RBH credentials
+
+    .bin   raw dump, memory-mapped (no copy)
+    .eml   one hex block per line, decoded in a single bytes.fromhex pass
+    .json  PM3 JSON: "blocks" (MIFARE Classic) or any "...data" hex fields
+           (DESFire file dumps), concatenated in file order
+
+Usage:
+    python pm3_dumps.py dumps/ --kantech 8020:11485 --rbh 4000:4897846
+    python pm3_dumps.py dumps/ --rbh-50bit --jobs 8
+
+Unchanged files (same size and mtime) are skipped using a cache file
+stored next to the scanned directory (.pm3scan_cache.json).
+
+Requirements: none (standard library only)
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import credential_codec
+
+DUMP_SUFFIXES = ('.bin', '.eml', '.json')
+CACHE_NAME = '.pm3scan_cache.json'
+
+# Offsets whose first byte could start a 7-byte big-endian 50-bit value
+_RBH_START = re.compile(rb'(?=[\x00-\x03][\x00-\xff]{6})')
+
+
+class DumpBuffer:
+    """Read-only view of a dump's bytes; use as a context manager"""
+
+    def __init__(self, path, data, mapped=None, kind='raw'):
+        self.path = path
+        self.kind = kind
+        self._data = data
+        self._mmap = mapped
+        self.view = memoryview(data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def find(self, pattern, start=0):
+        return self._data.find(pattern, start)
+
+    def close(self):
+        self.view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_bin(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return DumpBuffer(path, b'', kind='bin')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return DumpBuffer(path, mapped, mapped, kind='bin')
+
+
+def load_eml(path):
+    with open(path, encoding='ascii', errors='replace') as f:
+        text = f.read()
+    # Unknown sector data is written as '--' by some PM3 versions
+    return DumpBuffer(path, bytes.fromhex(text.replace('-', '0')), kind='eml')
+
+
+def _json_hex_fields(node, out):
+    """Collect hex strings under keys ending in 'data', in document order"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, str) and key.lower().endswith('data'):
+                out.append(value)
+            else:
+                _json_hex_fields(value, out)
+    elif isinstance(node, list):
+        for value in node:
+            _json_hex_fields(value, out)
+
+
+def load_json(path):
+    with open(path, encoding='utf-8') as f:
+        doc = json.load(f)
+    blocks = doc.get('blocks') if isinstance(doc, dict) else None
+    if isinstance(blocks, dict):
+        parts = [blocks[k] for k in sorted(blocks, key=int)]
+        kind = 'json-mfc'
+    else:
+        parts = []
+        _json_hex_fields(doc, parts)
+        kind = 'json-desfire'
+    data = bytes.fromhex(''.join(parts).replace(' ', '').replace('-', '0'))
+    return DumpBuffer(path, data, kind=kind)
+
+
+LOADERS = {'.bin': load_bin, '.eml': load_eml, '.json': load_json}
+
+
+def load_dump(path):
+    """Open a dump by extension; returns a DumpBuffer"""
+    suffix = os.path.splitext(path)[1].lower()
+    loader = LOADERS.get(suffix)
+    if loader is None:
+        raise ValueError(f"Unsupported dump type: {suffix}")
+    return loader(path)
+
+
+# ─── Pattern search ───
+
+def kantech_patterns(site_code, card_number):
+    be, le = credential_codec.kantech_bytes(site_code, card_number)
+    tag = f"kantech {site_code}:{card_number}"
+    return {f"{tag} BE": be, f"{tag} LE": le}
+
+
+def rbh_patterns(site_code, card_number):
+    be, le = credential_codec.rbh_bytes(site_code, card_number)
+    raw50 = credential_codec.rbh_50bit(site_code, card_number).to_bytes(7, 'big')
+    tag = f"rbh {site_code}:{card_number}"
+    return {f"{tag} BE": be, f"{tag} LE": le, f"{tag} 50-bit": raw50}
+
+
+def search_patterns(buf, patterns):
+    """Return [(name, offset)] for every occurrence of every pattern"""
+    hits = []
+    for name, pattern in patterns.items():
+        pos = buf.find(pattern)
+        while pos >= 0:
+            hits.append((name, pos))
+            pos = buf.find(pattern, pos + 1)
+    hits.sort(key=lambda hit: hit[1])
+    return hits
+
+
+def extract_rbh_50bit(buf, require_parity=True):
+    """Find plausible 7-byte big-endian RBH 50-bit values in a dump
+
+    Returns [(offset, site, card)]; zero site/card values are ignored.
+    """
+    data = buf.view
+    found = []
+    for match in _RBH_START.finditer(data):
+        pos = match.start()
+        value = int.from_bytes(data[pos:pos + 7], 'big')
+        site, card, p1, p2 = credential_codec.rbh_decode_50bit(value)
+        if not site or not card:
+            continue
+        if require_parity and credential_codec.rbh_50bit(site, card) != value:
+            continue
+        found.append((pos, site, card))
+    return found
+
+
+def scan_file(path, patterns, rbh_50bit=False):
+    """Load one dump and run the configured searches; returns a result dict"""
+    try:
+        with load_dump(path) as buf:
+            result = {'size': len(buf), 'kind': buf.kind,
+                      'hits': search_patterns(buf, patterns)}
+            if rbh_50bit:
+                result['rbh_50bit'] = extract_rbh_50bit(buf)
+    except (OSError, ValueError) as e:
+        result = {'error': str(e)}
+    return result
+
+
+def _scan_job(args):
+    path, patterns, rbh_50bit = args
+    return path, scan_file(path, patterns, rbh_50bit)
+
+
+# ─── Directory scanning ───
+
+def find_dumps(root):
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(DUMP_SUFFIXES) and name != CACHE_NAME:
+                yield os.path.join(dirpath, name)
+
+
+def _signature(patterns, rbh_50bit):
+    """Cache key for the search settings"""
+    return json.dumps([sorted((k, v.hex()) for k, v in patterns.items()), rbh_50bit])
+
+
+def scan_directory(root, patterns, rbh_50bit=False, jobs=None, cache_path=None):
+    """Scan every dump under root; returns ({path: result}, files_read)
+
+    Files whose size and mtime match the cache are not re-read.
+    """
+    cache_path = cache_path or os.path.join(root, CACHE_NAME)
+    signature = _signature(patterns, rbh_50bit)
+    cache = {}
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('signature') == signature:
+            cache = stored.get('files', {})
+    except (OSError, ValueError):
+        pass
+
+    results = {}
+    todo = []
+    stamps = {}
+    for path in find_dumps(root):
+        st = os.stat(path)
+        stamps[path] = [st.st_size, st.st_mtime_ns]
+        entry = cache.get(path)
+        if entry and entry['stamp'] == stamps[path]:
+            results[path] = entry['result']
+        else:
+            todo.append((path, patterns, rbh_50bit))
+
+    if len(todo) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunk = max(1, len(todo) // ((jobs or os.cpu_count() or 1) * 8))
+            for path, result in pool.map(_scan_job, todo, chunksize=chunk):
+                results[path] = result
+    else:
+        for job in todo:
+            path, result = _scan_job(job)
+            results[path] = result
+
+    files = {path: {'stamp': stamps[path], 'result': results[path]} for path in results}
+    tmp = cache_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'signature': signature, 'files': files}, f)
+    os.replace(tmp, cache_path)
+    return results, len(todo)
+
+
+def parse_credential(text):
+    site, _, card = text.replace('-', ':').partition(':')
+    return int(site), int(card)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search Proxmark3 dumps for credentials")
+    parser.add_argument('paths', nargs='+', help="dump files or directories")
+    parser.add_argument('--kantech', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--rbh', action='append', default=[], metavar='SITE:CARD')
+    parser.add_argument('--rbh-50bit', action='store_true',
+                        help="extract parity-valid RBH 50-bit values")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes")
+    args = parser.parse_args()
+
+    patterns = {}
+    for text in args.kantech:
+        patterns.update(kantech_patterns(*parse_credential(text)))
+    for text in args.rbh:
+        patterns.update(rbh_patterns(*parse_credential(text)))
+    if not patterns and not args.rbh_50bit:
+        parser.error("give --kantech / --rbh credentials or --rbh-50bit")
+
+    start = time.perf_counter()
+    results = {}
+    scanned = 0
+    for path in args.paths:
+        if os.path.isdir(path):
+            found, count = scan_directory(path, patterns, args.rbh_50bit, args.jobs)
+            results.update(found)
+            scanned += count
+        else:
+            results[path] = scan_file(path, patterns, args.rbh_50bit)
+            scanned += 1
+    elapsed = time.perf_counter() - start
+
+    for path in sorted(results):
+        result = results[path]
+        if 'error' in result:
+            print(f"{path}: ERROR {result['error']}", file=sys.stderr)
+            continue
+        for name, offset in result['hits']:
+            print(f"{path} @0x{offset:06X}: {name}")
+        for offset, site, card in result.get('rbh_50bit', []):
+            print(f"{path} @0x{offset:06X}: rbh 50-bit {site}:{card}")
+    print(f"{len(results)} dumps ({scanned} read, {len(results) - scanned} cached) "
+          f"in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
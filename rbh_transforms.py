@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+RBH Capture Transform Search - Kobe's Keys Edition
+Find the bit order / encoding that turns sniffer captures into RBH credentials
+
+Each capture is held right-aligned in a byte-padded container (e.g. 56 bits
+for a 50-bit frame). Every combination of
+
+    order    none | byteswap | bitrev (whole container) | bitrev-bytes
+    invert   yes / no
+    frame    50-bit [P1][Site][Card][P2] or 48-bit [Site][Card] (parity
+             stripped), at every bit offset inside the container
+
+is applied to the whole corpus at once (NumPy, 256-entry bit-reversal
+table, XOR-folding parity), decoded with the RBH layout and scored by
+parity validity and by how much of the corpus shares the same site code.
+
+Usage:
+    python rbh_transforms.py captures.txt            # rank transforms
+    python rbh_transforms.py captures.txt --apply 1  # decode with the best one
+
+Requirements: pip install numpy
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import credential_codec
+
+ORDERS = ('none', 'byteswap', 'bitrev', 'bitrev-bytes')
+FRAMES = {'50-bit': 50, '48-bit': 48}
+
+# Parity validity expected from random data (two independent parity bits)
+CHANCE_PARITY = 0.25
+
+_REV8 = np.array([int(f'{i:08b}'[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+Transform = namedtuple('Transform', 'order invert frame shift')
+Score = namedtuple('Score', 'transform score parity site_share site distinct')
+
+
+def load_captures(lines):
+    """Hex capture lines -> (uint64 array, container bits)"""
+    values = []
+    width = 0
+    for line in lines:
+        text = line.strip().replace(' ', '').replace(':', '')
+        if not text or text.startswith('#'):
+            continue
+        if text[:2].lower() == '0x':
+            text = text[2:]
+        values.append(int(text, 16))
+        width = max(width, len(text) * 4)
+    if width > 64:
+        raise ValueError("captures wider than 64 bits are not supported")
+    return np.array(values, dtype=np.uint64), max(56, (width + 7) // 8 * 8)
+
+
+def _reverse_bytes_bits(x):
+    """Reverse the bit order inside every byte (LUT over the byte view)"""
+    return _REV8[x.view(np.uint8)].view(np.uint64)
+
+
+def apply_order(x, order, bits):
+    """Reorder a right-aligned `bits`-wide container"""
+    if order == 'none':
+        return x
+    drop = np.uint64(64 - bits)
+    if order == 'byteswap':
+        return x.byteswap() >> drop
+    if order == 'bitrev':
+        return _reverse_bytes_bits(x).byteswap() >> drop
+    if order == 'bitrev-bytes':
+        return _reverse_bytes_bits(x)
+    raise ValueError(f"Unknown order: {order}")
+
+
+def _parity(x):
+    """Even-parity bit of every uint64 (XOR folding)"""
+    for s in (32, 16, 8, 4, 2, 1):
+        x = x ^ (x >> np.uint64(s))
+    return x & np.uint64(1)
+
+
+def decode(x, frame, shift):
+    """(site, card, parity_ok or None) arrays for one frame position"""
+    x = x >> np.uint64(shift)
+    if frame == '48-bit':
+        return ((x >> np.uint64(32)) & np.uint64(0xFFFF),
+                x & np.uint64(0xFFFFFFFF), None)
+    site = (x >> np.uint64(33)) & np.uint64(0xFFFF)
+    card = (x >> np.uint64(1)) & np.uint64(0xFFFFFFFF)
+    ok = ((_parity(site) == ((x >> np.uint64(49)) & np.uint64(1))) &
+          (_parity(card) == (x & np.uint64(1))))
+    return site, card, ok
+
+
+def transforms(bits):
+    for order in ORDERS:
+        for invert in (False, True):
+            for frame, length in FRAMES.items():
+                for shift in range(bits - length + 1):
+                    yield Transform(order, invert, frame, shift)
+
+
+def transformed(values, transform, bits):
+    x = apply_order(values, transform.order, bits)
+    if transform.invert:
+        x = x ^ np.uint64((1 << bits) - 1)
+    return x
+
+
+def rank(values, bits):
+    """Score every transform on the corpus; best first"""
+    scores = []
+    mask = np.uint64((1 << bits) - 1)
+    for order in ORDERS:
+        reordered = apply_order(values, order, bits)
+        for invert in (False, True):
+            x = reordered ^ mask if invert else reordered
+            for frame, length in FRAMES.items():
+                for shift in range(bits - length + 1):
+                    site, card, ok = decode(x, frame, shift)
+                    counts = np.bincount(site.astype(np.int64), minlength=1)
+                    top = int(counts.argmax())
+                    share = counts[top] / len(values)
+                    parity = float(ok.mean()) if ok is not None else None
+                    score = share + (CHANCE_PARITY if parity is None else parity)
+                    scores.append(Score(Transform(order, invert, frame, shift), score, parity,
+                                        share, top, int(np.count_nonzero(counts))))
+    scores.sort(key=lambda s: -s.score)
+    return scores
+
+
+def describe(transform):
+    parts = [transform.order]
+    if transform.invert:
+        parts.append('inverted')
+    parts.append(f"{transform.frame} @bit {transform.shift}")
+    return ', '.join(parts)
+
+
+def _bench(count=100000):
+    """Synthetic corpus: byte-swapped, inverted 50-bit captures from 3 sites"""
+    rng = np.random.default_rng(38)
+    sites = rng.choice([4000, 4001, 812], count, p=[0.7, 0.2, 0.1])
+    cards = rng.integers(0, 1 << 32, count)
+    raw = np.array([credential_codec.rbh_50bit(int(s), int(c)) for s, c in zip(sites, cards)],
+                   dtype=np.uint64)
+    bits = 56
+    captured = (raw << np.uint64(3)).byteswap() >> np.uint64(64 - bits)
+    captured ^= np.uint64((1 << bits) - 1)
+    start = time.perf_counter()
+    best = rank(captured, bits)[0]
+    elapsed = time.perf_counter() - start
+    print(f"{count} captures, {len(list(transforms(bits)))} transforms in {elapsed:.2f}s")
+    print(f"best: {describe(best.transform)} parity {best.parity:.1%} "
+          f"site {best.site} ({best.site_share:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank bit-order transforms for RBH captures")
+    parser.add_argument('captures', nargs='?', help="file with one hex capture per line")
+    parser.add_argument('--top', type=int, default=10, help="transforms to print")
+    parser.add_argument('--apply', type=int, metavar='RANK',
+                        help="decode the corpus with the transform at this rank (1 = best)")
+    parser.add_argument('--bench', action='store_true', help="rank 100k synthetic captures")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench()
+        return 0
+    if not args.captures:
+        parser.error("captures file required")
+
+    with open(args.captures, encoding='utf-8') as f:
+        try:
+            values, bits = load_captures(f)
+        except ValueError as e:
+            parser.error(str(e))
+    if not len(values):
+        parser.error("no captures found")
+
+    start = time.perf_counter()
+    ranked = rank(values, bits)
+    elapsed = time.perf_counter() - start
+
+    if args.apply:
+        best = ranked[args.apply - 1]
+        site, card, ok = decode(transformed(values, best.transform, bits),
+                                best.transform.frame, best.transform.shift)
+        print(f"# {describe(best.transform)}")
+        flags = ok.tolist() if ok is not None else [None] * len(values)
+        for s, c, good in zip(site.tolist(), card.tolist(), flags):
+            print(f"{s}:{c}" + ("" if good is not False else "  # parity error"))
+        return 0
+
+    for n, s in enumerate(ranked[:args.top], 1):
+        parity = "  n/a " if s.parity is None else f"{s.parity:6.1%}"
+        print(f"{n:3d}. {describe(s.transform):38} parity {parity}  "
+              f"site {s.site:5d} {s.site_share:6.1%}  ({s.distinct} sites)")
+    print(f"{len(values)} captures, {len(ranked)} transforms ({bits}-bit container) "
+          f"in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
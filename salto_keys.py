@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Salto DESFire Key Engine - Kobe's Keys Edition
+GUI-free AN10922 key derivation and file decoding for Salto DESFire cards
+
+Card layout (Salto cheat sheet):
+    AID    F4B1xx (common Salto format), F5xxxx (variant)
+    File   01, 32 bytes, free access (rawrights EEEE)
+    Keys   AES-128, AN10922 diversification (PM3 --kdf 1 -i <input>)
+
+AN10922 (AES-128):
+    input   = UID [|| AID LSB-first] [|| system identifier]   (1-31 bytes)
+    M       = 01 || input, padded 80 00.. to 32 bytes (XOR K2) or exactly 32 (XOR K1)
+    K_card  = CMAC(K_master, M)
+
+AN10922 (2K3DES / 3K3DES, 8-byte CMAC blocks):
+    input   = as above, 1-15 bytes
+    D_i     = C_i || input, padded 80 00.. to 16 bytes (XOR K2) or exactly 16 (XOR K1)
+    K_card  = CMAC(K_master, D_1) || CMAC(K_master, D_2) [|| CMAC(K_master, D_3)]
+              C = 21, 22 (2K3DES) or 31, 32, 33 (3K3DES)
+
+Batches run the two CMAC blocks as two bulk ECB calls over the whole card
+list with one cached cipher and the subkeys computed once per master key.
+
+Card lists hold one UID per line, optionally followed by a comma and the
+hex payload read from the data file (plain communication; enciphered reads
+need the session key of the authentication, not the card key).
+
+Usage:
+    python salto_keys.py cards.txt --master <hex> [--aid F4B101 --with-aid] -o keys.csv
+    python salto_keys.py --bench 100000
+
+Requirements: pip install pycryptodome (or cryptography)
+"""
+
+import argparse
+import sys
+import time
+from binascii import unhexlify
+from functools import lru_cache
+
+import cipher_backends
+import desfire_keys
+import desfire_session
+from hex_format import hex_upper
+
+# Application IDs seen on Salto cards
+SALTO_AIDS = {
+    'F4B1xx': 'Common Salto format',
+    'F5xxxx': 'Salto format variant',
+}
+DEFAULT_AID = 'F4B100'
+DATA_FILE = 0x01
+DATA_FILE_SIZE = 0x20
+
+BLOCK = 16
+# AN10922 diversification input excludes the 0x01 constant
+MAX_INPUT = 2 * BLOCK - 1
+
+# TDEA: one 8-byte CMAC per constant, each over constant || input (<= 16 bytes)
+DES_BLOCK = 8
+TDEA_CONSTANTS = {'2K3DES': (0x21, 0x22), '3K3DES': (0x31, 0x32, 0x33)}
+MAX_TDEA_INPUT = 2 * DES_BLOCK - 1
+KEY_TYPES = ('AES',) + tuple(TDEA_CONSTANTS)
+
+# NXP AN10922 worked examples: (key type, master, diversification input, key).
+# The TDEA keys are printed with key version 55 in the parity bits of their
+# first DES key, so TDEA keys are compared without parity bits.
+AN10922_VECTORS = (
+    ('AES', '00112233445566778899AABBCCDDEEFF', '04782E21801D803042F54E585020416275',
+     'A8DD63A3B89D54B37CA802473FDA9175'),
+    ('2K3DES', '00112233445566778899AABBCCDDEEFF', '04782E21801D803042F54E58502041',
+     '16F9587D9E8910C96B9648D006107DD7'),
+    ('3K3DES', '00112233445566778899AABBCCDDEEFF0102030405060708',
+     '04782E21801D803042F54E5850', '2E0DD03774D3FA9B5705AB0BDA91CA0B55B8E07FCDBF10EC'),
+)
+
+
+def parse_aid(aid_hex: str) -> bytes:
+    """3-byte AID as written in PM3 commands (MSB first)"""
+    aid_hex = aid_hex.strip().replace(" ", "")
+    if len(aid_hex) != 6:
+        raise ValueError("AID must be 6 hex characters (3 bytes)")
+    return unhexlify(aid_hex)
+
+
+def _max_input(key_type: str) -> int:
+    if key_type == 'AES':
+        return MAX_INPUT
+    if key_type in TDEA_CONSTANTS:
+        return MAX_TDEA_INPUT
+    raise ValueError(f"AN10922 diversification supports {', '.join(KEY_TYPES)}, "
+                     f"not {key_type}")
+
+
+def an10922_input(uid: bytes, aid: bytes = None, system_id: bytes = b'',
+                  key_type: str = 'AES') -> bytes:
+    """Diversification input (PM3 -i): UID [|| AID LSB-first] [|| system identifier]"""
+    data = uid + (aid[::-1] if aid else b'') + system_id
+    limit = _max_input(key_type)
+    if not 0 < len(data) <= limit:
+        raise ValueError(f"Diversification input must be 1-{limit} bytes")
+    return data
+
+
+@lru_cache(maxsize=64)
+def _subkeys(backend_name: str, master_key: bytes):
+    """CMAC subkeys (K1, K2) for one master key"""
+    return desfire_session.cmac_subkeys(desfire_keys.ecb_cipher(master_key))
+
+
+@lru_cache(maxsize=64)
+def _tdea_subkeys(backend_name: str, master_key: bytes):
+    """64-bit CMAC subkeys (K1, K2) for one 2K3DES / 3K3DES master key"""
+    ecb = desfire_keys.ecb_cipher(master_key, '3K3DES' if len(master_key) == 24 else '2K3DES')
+    subkeys = []
+    k = int.from_bytes(ecb.encrypt(bytes(DES_BLOCK)), 'big')
+    for _ in range(2):
+        k <<= 1
+        if k >> 64:
+            k = (k & 0xFFFFFFFFFFFFFFFF) ^ 0x1B
+        subkeys.append(k.to_bytes(DES_BLOCK, 'big'))
+    return tuple(subkeys)
+
+
+def _derive_keys_tdea(master_key: bytes, inputs, key_type: str) -> bytes:
+    k1, k2 = _tdea_subkeys(cipher_backends.get_backend().name, master_key)
+    ecb = desfire_keys.ecb_cipher(master_key, key_type)
+    parts = []
+    for constant in TDEA_CONSTANTS[key_type]:
+        first, second, masks = [], [], []
+        for data in inputs:
+            m = bytes((constant,)) + data
+            if len(m) < 2 * DES_BLOCK:
+                m = (m + b'\x80').ljust(2 * DES_BLOCK, b'\x00')
+                masks.append(k2)
+            else:
+                masks.append(k1)
+            first.append(m[:DES_BLOCK])
+            second.append(m[DES_BLOCK:])
+        chained = ecb.encrypt(b''.join(first))
+        last = desfire_session.xor(b''.join(second), b''.join(masks))
+        parts.append(ecb.encrypt(desfire_session.xor(chained, last)))
+    # Interleave the 8-byte CMACs into one key per card
+    out = bytearray(len(parts) * len(parts[0]))
+    words = memoryview(out).cast('Q')
+    for i, part in enumerate(parts):
+        words[i::len(parts)] = memoryview(part).cast('Q')
+    return bytes(out)
+
+
+def derive_keys(master_key: bytes, uids, aid: bytes = None, system_id: bytes = b'',
+                key_type: str = 'AES') -> bytes:
+    """AN10922 keys for many raw UIDs; returns the keys concatenated (key length each)"""
+    length = desfire_keys.key_length(key_type)
+    limit = _max_input(key_type)
+    if len(master_key) != length:
+        raise ValueError(f"Master key must be {length * 2} hex characters "
+                         f"({length} bytes {key_type})")
+    master_key = bytes(master_key)
+    if key_type != 'AES':
+        suffix = (aid[::-1] if aid else b'') + system_id
+        inputs = [uid + suffix for uid in uids]
+        if not inputs:
+            return b''
+        if not 0 < min(map(len, inputs)) or max(map(len, inputs)) > limit:
+            raise ValueError(f"Diversification input must be 1-{limit} bytes")
+        return _derive_keys_tdea(master_key, inputs, key_type)
+    k1, k2 = _subkeys(cipher_backends.get_backend().name, master_key)
+    suffix = (aid[::-1] if aid else b'') + system_id
+    first, second, masks = [], [], []
+    for uid in uids:
+        m = b'\x01' + uid + suffix
+        if not 1 < len(m) <= 2 * BLOCK:
+            raise ValueError(f"Diversification input must be 1-{MAX_INPUT} bytes")
+        if len(m) < 2 * BLOCK:
+            m = (m + b'\x80').ljust(2 * BLOCK, b'\x00')
+            masks.append(k2)
+        else:
+            masks.append(k1)
+        first.append(m[:BLOCK])
+        second.append(m[BLOCK:])
+    if not masks:
+        return b''
+    ecb = desfire_keys.ecb_cipher(master_key)
+    # CBC-MAC over two blocks, every card at once: E(E(M1) ^ M2 ^ K)
+    chained = ecb.encrypt(b''.join(first))
+    last = desfire_session.xor(b''.join(second), b''.join(masks))
+    return ecb.encrypt(desfire_session.xor(chained, last))
+
+
+def derive_key(master_hex: str, uid_hex: str, aid_hex: str = None,
+               system_id_hex: str = '', key_type: str = 'AES') -> str:
+    """AN10922 card key for one hex UID; returns uppercase hex"""
+    master = desfire_keys.parse_master(master_hex, key_type)
+    uid = unhexlify(uid_hex.strip().replace(" ", ""))
+    aid = parse_aid(aid_hex) if aid_hex else None
+    system_id = unhexlify(system_id_hex.strip().replace(" ", ""))
+    an10922_input(uid, aid, system_id, key_type)
+    return hex_upper(derive_keys(master, [uid], aid, system_id, key_type))
+
+
+def check_vectors() -> list:
+    """Problems with AN10922 derivation (empty when the NXP examples match)"""
+    problems = []
+    for key_type, master, data, expected in AN10922_VECTORS:
+        derived = derive_keys(bytes.fromhex(master), [bytes.fromhex(data)], key_type=key_type)
+        expected = bytes.fromhex(expected)
+        if key_type != 'AES':
+            derived = bytes(b & 0xFE for b in derived)
+            expected = bytes(b & 0xFE for b in expected)
+        if derived != expected:
+            problems.append(f"AN10922 {key_type} key {derived.hex().upper()} != "
+                            f"{expected.hex().upper()}")
+    return problems
+
+
+# ─── File payloads ───
+
+def read_cards(lines):
+    """(uids, payloads) from UID[,payload] lines"""
+    uids, payloads = [], []
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+        uid_hex, _, payload_hex = text.partition(',')
+        try:
+            uid = unhexlify(uid_hex.strip().replace(" ", ""))
+            payload = unhexlify(payload_hex.strip().replace(" ", ""))
+        except ValueError:
+            raise ValueError(f"line {line_no}: bad hex: {text}") from None
+        if not uid:
+            raise ValueError(f"line {line_no}: empty UID: {text}")
+        uids.append(uid)
+        payloads.append(payload)
+    return uids, payloads
+
+
+def write_csv(out, uids, keys, payloads):
+    """uid,key,data rows for a derived batch"""
+    out.write("uid,key,data\n")
+    key_text = keys.hex().upper()
+    width = BLOCK * 2
+    out.write(''.join(f"{uid.hex().upper()},{key_text[i * width:(i + 1) * width]},"
+                      f"{data.hex().upper()}\n"
+                      for i, (uid, data) in enumerate(zip(uids, payloads))))
+
+
+# ─── Proxmark3 ───
+
+def pm3_commands(aid_hex: str, master_hex: str, key_hex: str, kdf_input_hex: str) -> dict:
+    """Cheat-sheet commands for one card, with and without on-reader KDF"""
+    aid = aid_hex.upper()
+    return {
+        'check': f"hf mfdes chk -f mfdes_default_keys --aid {aid} --kdf 1 -i {kdf_input_hex}",
+        'auth_kdf': f"hf mfdes auth --aid {aid} -n 0 -t aes -k {master_hex} "
+                    f"--kdf 1 -i {kdf_input_hex}",
+        'auth': f"hf mfdes auth --aid {aid} -n 0 -t aes -k {key_hex}",
+        'dump': f"hf mfdes dump --aid {aid} -t aes -k {key_hex}",
+        'read': f"hf mfdes read --aid {aid} --fid {DATA_FILE:02X} -t aes -k {key_hex}",
+    }
+
+
+def _bench(count):
+    import os
+
+    master = bytes(range(1, 17))
+    uids = [os.urandom(7) for _ in range(count)]
+    aid = parse_aid(DEFAULT_AID)
+    print(f"Backend: {cipher_backends.get_backend().name}, {count} UIDs")
+    start = time.perf_counter()
+    batch = derive_keys(master, uids, aid)
+    batch_s = time.perf_counter() - start
+    start = time.perf_counter()
+    single = b''.join(unhexlify(derive_key(master.hex(), uid.hex(), DEFAULT_AID))
+                      for uid in uids)
+    single_s = time.perf_counter() - start
+    if batch != single:
+        raise SystemExit("batch and per-card keys differ")
+    print(f"derive   batch {count / batch_s:>12,.0f} keys/s   "
+          f"per-card {count / single_s:>12,.0f} keys/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Salto DESFire AN10922 batch calculator")
+    parser.add_argument('cards', nargs='?', help="file with UID[,payload hex] per line")
+    parser.add_argument('--master', help="AES master key (32 hex)")
+    parser.add_argument('--aid', default=DEFAULT_AID, help="application ID (hex, MSB first)")
+    parser.add_argument('--with-aid', action='store_true',
+                        help="include the AID in the diversification input")
+    parser.add_argument('--system-id', default='', help="system identifier (hex)")
+    parser.add_argument('-o', '--output', help="CSV output (default: stdout)")
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help="time batch vs per-card derivation for N UIDs")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    if not args.cards or not args.master:
+        parser.error("card list and --master required")
+
+    try:
+        master = desfire_keys.parse_master(args.master)
+        aid = parse_aid(args.aid) if args.with_aid else None
+        system_id = unhexlify(args.system_id.replace(" ", ""))
+        with open(args.cards, encoding='utf-8') as f:
+            uids, payloads = read_cards(f)
+        # Backend selection benchmarks on first use; keep it out of the timing
+        cipher_backends.get_backend()
+        start = time.perf_counter()
+        keys = derive_keys(master, uids, aid, system_id)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    out = open(args.output, 'w', encoding='ascii', newline='') if args.output else sys.stdout
+    try:
+        write_csv(out, uids, keys, payloads)
+    finally:
+        if args.output:
+            out.close()
+    rate = len(uids) / elapsed if elapsed else 0
+    print(f"{len(uids)} cards in {elapsed:.2f}s ({rate:,.0f} cards/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
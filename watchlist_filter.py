@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Watchlist Filter - Kobe's Keys Edition
+Bloom filter over known-credential values for high-rate stream monitoring
+
+Holds the integer forms CredentialInventory.find_value() matches (Kantech
+combined_32 / combined_48, RBH combined_48 / 50-bit value), so a negative
+answer is final and only positives (plus ~1% false positives at the
+default 10 bits per entry) go on to the exact inventory lookup.
+
+Split-block layout: 256-bit blocks of eight 32-bit words. A value's hash
+picks one block and sets / tests one bit in each of its words, so a lookup
+touches a single 32-byte block. Batches are hashed and probed with NumPy;
+30M entries take ~38 MB.
+
+File layout: 24-byte header ('KKBF', entries, blocks) + the words,
+memory-mapped read-only on open (no load time, shared page cache).
+
+Usage:
+    python watchlist_filter.py build watchlist.db -o watchlist.bloom [--system rbh]
+    python watchlist_filter.py build --values revoked.txt -o watchlist.bloom
+    python watchlist_filter.py check watchlist.bloom sniffed.txt [--inventory watchlist.db]
+    python watchlist_filter.py --bench 30000000
+
+Requirements: pip install numpy
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from credential_inventory import CredentialInventory
+
+MAGIC = b'KKBF'
+_HEADER = struct.Struct('<4sxxxxQQ')
+
+BITS_PER_ENTRY = 10
+BLOCK_WORDS = 8
+# Values per NumPy pass
+CHUNK = 1 << 20
+
+# Per-word multipliers (the Parquet split-block Bloom filter salts)
+_SALTS = (0x47B6137B, 0x44974D91, 0x8824AD5B, 0xA2B7289D,
+          0x705495C7, 0x2DF1424B, 0x9EFC4947, 0x5C6BFB31)
+_SALT_ARRAY = np.array(_SALTS, dtype=np.uint32)
+_MASK64 = (1 << 64) - 1
+
+
+# ─── Hashing ───
+
+def _mix(x):
+    """MurmurHash3 64-bit finalizer over a uint64 array"""
+    x = x ^ (x >> np.uint64(33))
+    x = x * np.uint64(0xFF51AFD7ED558CCD)
+    x = x ^ (x >> np.uint64(33))
+    x = x * np.uint64(0xC4CEB9FE1A85EC53)
+    return x ^ (x >> np.uint64(33))
+
+
+def _mix_int(x):
+    x ^= x >> 33
+    x = (x * 0xFF51AFD7ED558CCD) & _MASK64
+    x ^= x >> 33
+    x = (x * 0xC4CEB9FE1A85EC53) & _MASK64
+    return x ^ (x >> 33)
+
+
+class BloomFilter:
+    """Split-block Bloom filter over uint64 values"""
+
+    def __init__(self, blocks, count=0, words=None, mapped=None):
+        self.blocks = blocks
+        self.count = count
+        if words is None:
+            words = np.zeros(blocks * BLOCK_WORDS, dtype=np.uint32)
+        self.words = words
+        self._mmap = mapped
+
+    @classmethod
+    def with_capacity(cls, entries, bits_per_entry=BITS_PER_ENTRY):
+        return cls(max(1, -(-entries * bits_per_entry // (BLOCK_WORDS * 32))))
+
+    @classmethod
+    def build(cls, values, bits_per_entry=BITS_PER_ENTRY):
+        values = np.asarray(values, dtype=np.uint64)
+        bloom = cls.with_capacity(len(values), bits_per_entry)
+        bloom.add_many(values)
+        return bloom
+
+    def _probe(self, values):
+        """(block, bit masks (n, 8)) for a uint64 array"""
+        h = _mix(values)
+        block = ((h >> np.uint64(32)) * np.uint64(self.blocks)) >> np.uint64(32)
+        low = h.astype(np.uint32)
+        bits = (low[:, None] * _SALT_ARRAY) >> np.uint32(27)
+        return block.astype(np.intp), np.left_shift(np.uint32(1), bits)
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.uint64)
+        if self._mmap is not None:
+            raise ValueError("filter is memory-mapped read-only")
+        for i in range(0, len(values), CHUNK):
+            block, masks = self._probe(values[i:i + CHUNK])
+            index = block[:, None] * BLOCK_WORDS + np.arange(BLOCK_WORDS)
+            # Several values can land in one block: OR through ufunc.at, not fancy |=
+            np.bitwise_or.at(self.words, index.ravel(), masks.ravel())
+        self.count += len(values)
+
+    def contains_many(self, values):
+        """Boolean array: True = maybe listed, False = certainly not"""
+        values = np.asarray(values, dtype=np.uint64)
+        out = np.empty(len(values), dtype=bool)
+        words = self.words.reshape(-1, BLOCK_WORDS)
+        for i in range(0, len(values), CHUNK):
+            block, masks = self._probe(values[i:i + CHUNK])
+            out[i:i + CHUNK] = ((words[block] & masks) == masks).all(axis=1)
+        return out
+
+    def __contains__(self, value):
+        h = _mix_int(value & _MASK64)
+        block = ((h >> 32) * self.blocks) >> 32
+        low = h & 0xFFFFFFFF
+        words = self.words
+        base = block * BLOCK_WORDS
+        for i, salt in enumerate(_SALTS):
+            if not (int(words[base + i]) >> (((low * salt) & 0xFFFFFFFF) >> 27)) & 1:
+                return False
+        return True
+
+    @property
+    def nbytes(self):
+        return self.blocks * BLOCK_WORDS * 4
+
+    def fill_ratio(self):
+        return float(np.unpackbits(self.words.view(np.uint8)).mean())
+
+    # ─── Persistence ───
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, self.count, self.blocks))
+            f.write(self.words.astype('<u4', copy=False).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a saved filter read-only"""
+        with open(path, 'rb') as f:
+            magic, count, blocks = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a watchlist filter")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size + blocks * BLOCK_WORDS * 4:
+            mapped.close()
+            raise ValueError(f"{path}: truncated watchlist filter")
+        words = np.frombuffer(mapped, dtype='<u4', count=blocks * BLOCK_WORDS,
+                              offset=_HEADER.size)
+        return cls(blocks, count, words, mapped)
+
+    def close(self):
+        if self._mmap is not None:
+            self.words = None
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ─── Sources and checks ───
+
+def inventory_values(inventory, system=None):
+    """Every integer form find_value() matches, as a uint64 array"""
+    values = []
+    append = values.append
+    for _, _, _, _, combined_32, combined_48, full_50bit_hex in inventory.iter_encodings(system):
+        if combined_32 is not None:
+            append(combined_32)
+        append(combined_48)
+        if full_50bit_hex is not None:
+            append(int(full_50bit_hex, 16))
+    return np.unique(np.array(values, dtype=np.uint64))
+
+
+def read_values(lines):
+    """Integers from hex (optionally 0x-prefixed) tokens, first token per line"""
+    values = []
+    for lineno, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+        try:
+            value = int(text.split()[0].replace(',', ''), 16)
+            if value < 0 or value >> 64:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"line {lineno}: expected a 64-bit hex value: {text}") from None
+        values.append(value)
+    return np.array(values, dtype=np.uint64)
+
+
+def check(bloom, values, inventory=None):
+    """(value, hits) for values passing the filter; with an inventory only confirmed ones"""
+    values = np.asarray(values, dtype=np.uint64)
+    for value in values[bloom.contains_many(values)].tolist():
+        if inventory is None:
+            yield value, None
+        else:
+            hits = inventory.find_value(value)
+            if hits:
+                yield value, hits
+
+
+def _bench(count):
+    rng = np.random.default_rng(7)
+    values = rng.integers(0, 1 << 50, count, dtype=np.uint64)
+    start = time.perf_counter()
+    bloom = BloomFilter.build(values)
+    build_s = time.perf_counter() - start
+    print(f"{count:,} entries: {bloom.nbytes / 1e6:.1f} MB, built in {build_s:.2f}s "
+          f"({count / build_s:,.0f} entries/s), fill {bloom.fill_ratio():.3f}")
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'bench.bloom')
+        bloom.save(path)
+        start = time.perf_counter()
+        mapped = BloomFilter.open(path)
+        open_ms = (time.perf_counter() - start) * 1000
+        probes = rng.integers(0, 1 << 50, 2_000_000, dtype=np.uint64) | np.uint64(1 << 51)
+        start = time.perf_counter()
+        false_positive = mapped.contains_many(probes).mean()
+        batch_s = time.perf_counter() - start
+        members = values[:2_000_000]
+        if not mapped.contains_many(members).all():
+            raise SystemExit("false negative")
+        sample = probes[:200_000].tolist()
+        start = time.perf_counter()
+        hits = sum(1 for v in sample if v in mapped)
+        scalar_s = time.perf_counter() - start
+        if not all(v in mapped for v in members[:1000].tolist()):
+            raise SystemExit("false negative (scalar)")
+        mapped.close()
+    print(f"mmap open {open_ms:.2f} ms; false positives {false_positive:.4%}")
+    print(f"lookups   batch {len(probes) / batch_s:>12,.0f}/s   "
+          f"scalar {len(sample) / scalar_s:>10,.0f}/s ({hits} maybe)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bloom filter for watchlisted credentials")
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help="build / probe a filter of N random 50-bit values")
+    sub = parser.add_subparsers(dest='command')
+
+    build = sub.add_parser('build', help="build a filter from an inventory or a value list")
+    build.add_argument('inventory', nargs='?', help="credential inventory database")
+    build.add_argument('--system', choices=('kantech', 'rbh'))
+    build.add_argument('--values', help="file with one hex value per line")
+    build.add_argument('--bits', type=int, default=BITS_PER_ENTRY, help="bits per entry")
+    build.add_argument('-o', '--output', required=True)
+
+    chk = sub.add_parser('check', help="report watchlisted values in a capture")
+    chk.add_argument('filter')
+    chk.add_argument('values', nargs='?', help="hex values, one per line (default: stdin)")
+    chk.add_argument('--inventory', help="confirm hits against this inventory")
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.bench)
+        return 0
+    if args.command is None:
+        parser.error("build, check or --bench required")
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        if not args.inventory and not args.values:
+            parser.error("inventory or --values required")
+        try:
+            parts = []
+            if args.inventory:
+                with CredentialInventory(args.inventory) as inventory:
+                    parts.append(inventory_values(inventory, args.system))
+            if args.values:
+                with open(args.values, encoding='utf-8') as f:
+                    parts.append(read_values(f))
+            values = np.unique(np.concatenate(parts))
+            bloom = BloomFilter.build(values, args.bits)
+            bloom.save(args.output)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{len(values)} values -> {args.output} ({bloom.nbytes / 1e6:.1f} MB) in "
+              f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return 0
+
+    inventory = None
+    try:
+        bloom = BloomFilter.open(args.filter)
+        if args.inventory:
+            inventory = CredentialInventory(args.inventory)
+        if args.values:
+            with open(args.values, encoding='utf-8') as f:
+                values = read_values(f)
+        else:
+            values = read_values(sys.stdin)
+        found = 0
+        for value, hits in check(bloom, values, inventory):
+            found += 1
+            if hits is None:
+                print(f"{value:X}\tmaybe")
+            else:
+                print(f"{value:X}\t" + " | ".join(
+                    f"{h['system']} {h['site']}:{h['card']} {h['label'] or ''}".rstrip()
+                    for h in hits))
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if inventory is not None:
+            inventory.close()
+    print(f"{found} of {len(values)} values watchlisted in "
+          f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file